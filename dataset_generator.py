@@ -1,27 +1,70 @@
 # -*- coding: utf-8 -*-
 import json
 from pathlib import Path
+from typing import List
 
 import typer
 from tqdm import tqdm
 
+from datasetgen import benchmark
+from datasetgen.cache import DatasetCache
+from datasetgen.formats import dataset_files, format_of
 from datasetgen.generator import Generator
+from datasetgen.profiler import Profiler
+from datasetgen.progress import ProgressInfo, Throttle
+from datasetgen.shard import merge_shards, parse_shard
+from datasetgen.trace import TRACE_COLUMNS, write_trace
 from datasetgen.ui import start_app
 
 app = typer.Typer(name="dataset-generator", add_completion=False)
 
 
 @app.command()
-def ui(dest_folder: str = "dataset", debug: bool = typer.Option(False, "--debug")):
+def ui(dest_folder: str = "dataset", debug: bool = typer.Option(False, "--debug"),
+       max_sessions: int = typer.Option(
+           16, help="Max. number of browser sessions in memory"),
+       idle_timeout: float = typer.Option(
+           3600., help="Seconds before an idle browser session is removed")):
     cur_dest_folder = Path(".").parent.resolve().joinpath(dest_folder)
     start_app(
         debug=debug,
         dest_folder=cur_dest_folder,
+        max_sessions=max_sessions,
+        idle_timeout=idle_timeout,
     )
 
 
 @app.command()
-def gen(config: str, dest_folder: str = "dataset", num_days: int = -1):
+def gen(config: str, dest_folder: str = "dataset", num_days: int = -1,
+        workers: int = typer.Option(
+            1, help="Number of processes, -1 to use all the CPUs"),
+        stream: bool = typer.Option(
+            False, "--stream",
+            help="Save each day as soon as it is generated"),
+        resume: bool = typer.Option(
+            False, "--resume",
+            help="Continue an interrupted --stream generation"),
+        window: int = typer.Option(
+            -1, help="Max. days in memory with --stream and more workers"),
+        output_format: str = typer.Option(
+            None, help="Output file format: csv, parquet or feather"),
+        compression: str = typer.Option(
+            None, help="Compression of the output format"),
+        cache_dir: str = typer.Option(
+            None, help="Folder of the generated datasets cache"),
+        cache_size: float = typer.Option(
+            10., help="Max. size of the datasets cache in GB"),
+        profile: bool = typer.Option(
+            False, "--profile", help="Print the time spent in each stage"),
+        profile_json: str = typer.Option(
+            None, help="Save the --profile records as JSON"),
+        profile_trace: str = typer.Option(
+            None, help="Save the --profile records as a Chrome trace"),
+        shard: str = typer.Option(
+            None, help="Generate only the shard i/N of the days (with --stream)")):
+    cur_shard = parse_shard(shard) if shard is not None else None
+    if cur_shard is not None and cache_dir is not None:
+        raise Exception("ERROR: --cache-dir cannot be used with --shard...")
     with open(Path(config)) as config_file:
         sim_config = json.load(config_file)
     if dest_folder != "dataset":
@@ -34,17 +77,159 @@ def gen(config: str, dest_folder: str = "dataset", num_days: int = -1):
         num_days=num_days,
         dest_folder=cur_dest_folder,
     )
-    with tqdm(desc="Prepare dataset days", total=100, ascii=True) as pbar:
-        prev_perc = 0.
-        for cur_perc in generator.prepare(**sim_config['function']):
-            pbar.update(int(cur_perc - prev_perc))
-            prev_perc = cur_perc
-
-    for _ in tqdm(generator.save(),
-                  desc="Save dataset",
-                  total=int(generator.num_days),
-                  ascii=True):
-        pass
+    if output_format is not None:
+        generator.output_format = output_format
+    if compression is not None:
+        generator.compression = compression
+
+    cache = None
+    if cache_dir is not None:
+        cache = DatasetCache(Path(cache_dir), int(cache_size * 1024**3))
+        cache_key = generator.dataset_key(**sim_config['function'])
+        if cache.restore(cache_key, generator.dest_folder):
+            print(f"Dataset restored from cache: {cache_key}")
+            return
+
+    cur_profiler = None
+    if profile or profile_json or profile_trace:
+        cur_profiler = Profiler().start()
+    try:
+        _gen(generator, sim_config, workers,
+             stream or resume or cur_shard is not None, window, resume,
+             cur_shard)
+    finally:
+        if cur_profiler is not None:
+            cur_profiler.stop()
+    if cur_profiler is not None:
+        print(cur_profiler.format_table())
+        if profile_json:
+            print(f"Profile: {cur_profiler.save_json(Path(profile_json))}")
+        if profile_trace:
+            print(
+                f"Chrome trace: {cur_profiler.save_chrome_trace(Path(profile_trace))}")
+
+    if cache is not None:
+        cache.store(cache_key, generator.dest_folder, [
+            file_path for _, file_path in dataset_files(generator.dest_folder)
+        ])
+
+
+class _ProgressBar(object):
+
+    """A tqdm bar updated by the generator progress callbacks."""
+
+    def __init__(self, desc: str, interval: float = 0.1):
+        self._pbar = tqdm(desc=desc, unit="day", ascii=True)
+        self.callback = Throttle(self._update, interval=interval)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self._pbar.close()
+
+    def _update(self, info: 'ProgressInfo'):
+        self._pbar.total = info.total
+        self._pbar.n = info.done
+        self._pbar.refresh()
+
+
+def _gen(generator: 'Generator', sim_config: dict, workers: int,
+         stream: bool, window: int, resume: bool, shard: tuple = None):
+    if stream:
+        with _ProgressBar("Generate dataset days") as pbar:
+            for _ in generator.stream(**sim_config['function'],
+                                      workers=workers, window=window,
+                                      resume=resume, progress=pbar.callback,
+                                      shard=shard):
+                pass
+        return
+
+    with _ProgressBar("Prepare dataset days") as pbar:
+        for _ in generator.prepare(**sim_config['function'],
+                                   workers=workers, progress=pbar.callback):
+            pass
+
+    with _ProgressBar("Save dataset") as pbar:
+        for _ in generator.save(progress=pbar.callback):
+            pass
+
+
+@app.command()
+def merge(shard_folders: List[str],
+          dest_folder: str = typer.Option(
+              "dataset", help="Folder of the merged dataset"),
+          stats_json: str = typer.Option(
+              None, help="Save the stats summary as JSON")):
+    """Merge the folders of a sharded generation (gen --shard) into one dataset."""
+    cur_dest_folder = Path(".").parent.resolve().joinpath(dest_folder)
+    manifest = merge_shards(
+        [Path(folder) for folder in shard_folders], cur_dest_folder)
+    print(f"Merged {len(manifest.days)} days in {cur_dest_folder}")
+
+    generator = Generator(dest_folder=cur_dest_folder)
+    generator.open_data(cur_dest_folder, columns=['Filename', 'Size'])
+    summary = generator.stats.summary()
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+    if stats_json:
+        with open(Path(stats_json), "w") as stats_file:
+            json.dump(summary, stats_file, indent=2)
+        print(f"Stats: {stats_json}")
+
+
+@app.command()
+def trace(dataset_folder: str, output: str = "trace.bin",
+          columns: str = typer.Option(
+              ",".join(TRACE_COLUMNS), help="Comma separated record columns")):
+    """Export a dataset as a binary trace for the cache simulators."""
+    trace_columns = columns.split(",")
+    files = dataset_files(Path(dataset_folder))
+    days = (
+        (date, format_of(file_path).read(file_path, columns=trace_columns))
+        for date, file_path in tqdm(files, desc="Export trace", ascii=True)
+    )
+    header = write_trace(days, Path(output), trace_columns)
+    print(f"Trace header: {header}")
+
+
+@app.command()
+def bench(scales: str = typer.Option(
+              "small", help="Comma separated scales: small, medium, large"),
+          configs: str = typer.Option(
+              "configs", help="Folder of the configurations to benchmark"),
+          output: str = typer.Option(
+              "benchmark.json", help="Output JSON file"),
+          baseline: str = typer.Option(
+              None, help="Results of a previous run to compare with"),
+          threshold: float = typer.Option(
+              0.1, help="Relative slowdown or memory increase that is a regression"),
+          name_filter: str = typer.Option(
+              "", "--filter", help="Run only the benchmarks matching this"),
+          repeat: int = typer.Option(1, help="Timed runs of each benchmark"),
+          memory: bool = typer.Option(
+              True, help="Measure the peak memory")):
+    """Benchmark the generation pipeline."""
+    config_files = sorted(Path(configs).glob("*.json")) \
+        if Path(configs).is_dir() else []
+    results = []
+    for result in benchmark.run(scales.split(","), config_files,
+                                name_filter, repeat, memory):
+        print(f"{result['name']} ({result['scale']}): "
+              f"{result['req_per_sec']:.0f} req/s")
+        results.append(result)
+    benchmark.save_results(results, Path(output))
+
+    comparison = None
+    if baseline is not None:
+        comparison = benchmark.compare(
+            results, benchmark.load_results(Path(baseline)), threshold)
+    print(benchmark.format_table(results, comparison))
+    print(f"Results: {output}")
+
+    if comparison and any(cur['regression'] for cur in comparison):
+        print("Performance regression detected")
+        raise typer.Exit(code=1)
 
 
 if __name__ == "__main__":
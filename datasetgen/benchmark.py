@@ -0,0 +1,392 @@
+import datetime
+import inspect
+import json
+import platform
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path, PurePath
+from typing import Callable, Generator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import functions, utils
+from .formats import FORMATS, get_format
+from .generator import Generator as DatasetGenerator
+
+_BENCHMARK_VERSION = 1
+
+# Number of days, requests per day and files of each scale
+SCALES = {
+    'small': {'num_days': 2, 'num_req_x_day': 10_000, 'num_files': 10_000},
+    'medium': {'num_days': 7, 'num_req_x_day': 100_000, 'num_files': 100_000},
+    'large': {'num_days': 30, 'num_req_x_day': 1_000_000,
+              'num_files': 1_000_000},
+}
+
+# Arguments of the built-in functions, the number of files is set by the scale
+_FUNCTION_KWARGS = {
+    'RandomGenerator': {
+        'min_file_size': 100,
+        'max_file_size': 24000,
+        'size_generator_function': "gen_random_sizes",
+    },
+    'HighFrequencyDataset': {
+        'min_file_size': 100,
+        'max_file_size': 24000,
+        'lambda_less_req_files': 1.0,
+        'lambda_more_req_files': 10.0,
+        'perc_more_req_files': 10.0,
+        'perc_files_x_day': 1.0,
+        'size_generator_function': "gen_random_sizes",
+    },
+    'RecencyFocusedDataset': {
+        'min_file_size': 100,
+        'max_file_size': 24000,
+        'perc_files_x_day': 10.0,
+        'size_generator_function': "gen_random_sizes",
+    },
+    'SizeFocusedDataset': {
+        'min_file_size': 100,
+        'max_file_size': 500,
+        'noise_min_file_size': 1024,
+        'noise_max_file_size': 4096,
+        'perc_noise': 10.0,
+        'perc_files_x_day': 10.0,
+        'size_generator_function': "gen_random_sizes",
+    },
+}
+
+# Size generators of utils used by gen_random_files
+_SIZE_GENERATORS = ('gen_random_sizes', 'gen_in_range_random_sizes')
+
+
+def builtin_functions() -> List[str]:
+    """Returns the names of the generator functions in `functions`.
+
+    :return: the GenFunction subclasses
+    :rtype: List[str]
+    """
+    return [
+        name for name, obj in inspect.getmembers(functions, inspect.isclass)
+        if issubclass(obj, functions.GenFunction) and
+        obj is not functions.GenFunction and
+        obj.__module__ == functions.__name__
+    ]
+
+
+def measure(task: Callable, repeat: int = 1,
+            memory: bool = True) -> Tuple[float, int, int]:
+    """Measures the run time and the peak memory of a task.
+
+    The time is the best of `repeat` runs. The peak memory is measured
+    with `tracemalloc` (NumPy and pandas buffers included) in a further
+    run, so the tracing does not change the timings.
+
+    :param task: the function to measure, it returns the number of
+        processed requests
+    :type task: Callable
+    :param repeat: number of timed runs, defaults to 1
+    :type repeat: int, optional
+    :param memory: measure the peak memory, defaults to True
+    :type memory: bool, optional
+    :return: the run time in seconds, the number of requests and the peak
+        memory in bytes (-1 if not measured)
+    :rtype: Tuple[float, int, int]
+    """
+    best = float("inf")
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        requests = task()
+        best = min(best, time.perf_counter() - start)
+
+    peak = -1
+    if memory:
+        tracemalloc.start()
+        try:
+            task()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return best, requests, peak
+
+
+def _make_generator(scale: dict, config: dict = None,
+                    dest_folder: 'PurePath' = Path(".")) -> 'DatasetGenerator':
+    config = dict(config) if config is not None else {}
+    config['num_days'] = scale['num_days']
+    if config.get('num_req_x_day', 0) != -1:
+        config['num_req_x_day'] = scale['num_req_x_day']
+    return DatasetGenerator(config=config, dest_folder=Path(dest_folder))
+
+
+def _prepare(generator: 'DatasetGenerator', function_name: str,
+             kwargs: dict) -> int:
+    generator.clean()
+    for _ in generator.prepare(function_name, kwargs):
+        pass
+    return sum(len(day) for day in generator.days)
+
+
+def _benchmarks(scale: dict, work_dir: 'Path',
+                configs: List['PurePath']) -> Generator[
+                    Tuple[str, Callable[[], Callable]], None, None]:
+    """Yields the benchmark tasks of a scale.
+
+    Each benchmark is a setup function that builds the fixtures and
+    returns the task to measure, so the fixtures are built only for the
+    selected benchmarks and they are not timed.
+
+    :param scale: the scale settings
+    :type scale: dict
+    :param work_dir: folder for the saved datasets
+    :type work_dir: Path
+    :param configs: the configuration files
+    :type configs: List[PurePath]
+    :yield: the name and the setup of each benchmark
+    :rtype: Tuple[str, Callable[[], Callable]]
+    """
+    for function_name in builtin_functions():
+        kwargs = {
+            **_FUNCTION_KWARGS.get(function_name, {}),
+            'num_files': scale['num_files'],
+        }
+
+        def function_setup(function_name=function_name, kwargs=kwargs):
+            generator = _make_generator(scale)
+            return lambda: _prepare(generator, function_name, kwargs)
+        yield f"function/{function_name}", function_setup
+
+    for config_path in configs:
+        def config_setup(config_path=config_path):
+            with open(config_path) as config_file:
+                config = json.load(config_file)
+            generator = _make_generator(scale, config)
+            return lambda: _prepare(generator, **config['function'])
+        yield f"config/{Path(config_path).stem}", config_setup
+
+    for size_generator in _SIZE_GENERATORS:
+        def size_setup(size_generator=size_generator):
+            return lambda: len(utils.gen_random_files(
+                scale['num_files'], 100, 24000, size_generator,
+                rng=np.random.default_rng(0)))
+        yield f"utils/{size_generator}", size_setup
+
+    # The dataset shared by the stats, save and open_data benchmarks
+    prepared = {}
+
+    def dataset() -> 'DatasetGenerator':
+        if 'generator' not in prepared:
+            generator = _make_generator(scale)
+            _prepare(generator, 'RandomGenerator', {
+                **_FUNCTION_KWARGS['RandomGenerator'],
+                'num_files': scale['num_files'],
+            })
+            prepared['generator'] = generator
+        return prepared['generator']
+
+    def stats_setup():
+        generator = dataset()
+        tot_requests = sum(len(day) for day in generator.days)
+
+        def stats():
+            # Merge again the days' aggregates at each run
+            generator.reset_stats().stats
+            return tot_requests
+        return stats
+    yield "stats", stats_setup
+
+    for format_name in FORMATS:
+        try:
+            get_format(format_name)
+        except Exception:
+            continue
+
+        def save_setup(format_name=format_name):
+            generator = dataset()
+            tot_requests = sum(len(day) for day in generator.days)
+
+            def save():
+                generator.output_format = format_name
+                generator.dest_folder = work_dir.joinpath(
+                    f"save_{format_name}")
+                for _ in generator.save():
+                    pass
+                return tot_requests
+            return save
+
+        def open_data_setup(format_name=format_name):
+            generator = dataset()
+            generator.output_format = format_name
+            generator.dest_folder = work_dir.joinpath(f"open_{format_name}")
+            for _ in generator.save():
+                pass
+            dest_folder = generator.dest_folder
+
+            def open_data():
+                loader = DatasetGenerator()
+                loader.open_data(dest_folder)
+                return sum(len(day) for day in loader.days)
+            return open_data
+
+        yield f"save/{format_name}", save_setup
+        yield f"open_data/{format_name}", open_data_setup
+
+
+def run(scales: List[str] = ('small',),
+        configs: List['PurePath'] = (),
+        name_filter: str = "",
+        repeat: int = 1,
+        memory: bool = True) -> Generator[dict, None, None]:
+    """Runs the benchmark suite.
+
+    :param scales: the scales to run (see SCALES), defaults to ('small',)
+    :type scales: List[str], optional
+    :param configs: the configuration files to benchmark, defaults to ()
+    :type configs: List[PurePath], optional
+    :param name_filter: run only the benchmarks whose name contains this
+        string, defaults to ""
+    :type name_filter: str, optional
+    :param repeat: number of timed runs of each benchmark, defaults to 1
+    :type repeat: int, optional
+    :param memory: measure the peak memory, defaults to True
+    :type memory: bool, optional
+    :raises Exception: a benchmark processed no requests
+    :yield: the result of each benchmark
+    :rtype: dict
+    """
+    for scale_name in scales:
+        assert scale_name in SCALES, f"ERROR: unknown scale '{scale_name}'"
+        with tempfile.TemporaryDirectory() as work_dir:
+            for name, setup in _benchmarks(
+                SCALES[scale_name], Path(work_dir), configs
+            ):
+                if name_filter not in name:
+                    continue
+                seconds, requests, peak = measure(setup(), repeat, memory)
+                if requests <= 0:
+                    raise Exception(
+                        f"ERROR: benchmark {name} ({scale_name}) processed no requests...")
+                yield {
+                    'name': name,
+                    'scale': scale_name,
+                    'seconds': seconds,
+                    'requests': requests,
+                    'req_per_sec': requests / seconds if seconds > 0 else 0.,
+                    'peak_mem': peak,
+                }
+
+
+def save_results(results: List[dict], file_path: 'PurePath') -> 'Path':
+    """Writes the benchmark results as JSON.
+
+    :param results: the benchmark results
+    :type results: List[dict]
+    :param file_path: the output file
+    :type file_path: PurePath
+    :return: the output file
+    :rtype: Path
+    """
+    file_path = Path(file_path)
+    with open(file_path, "w") as out_file:
+        json.dump({
+            'version': _BENCHMARK_VERSION,
+            'date': datetime.datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'results': list(results),
+        }, out_file, indent=2)
+    return file_path
+
+
+def load_results(file_path: 'PurePath') -> List[dict]:
+    """Reads the benchmark results of a previous run.
+
+    :param file_path: the results file
+    :type file_path: PurePath
+    :raises Exception: the results version is not supported
+    :return: the benchmark results
+    :rtype: List[dict]
+    """
+    with open(file_path) as in_file:
+        data = json.load(in_file)
+    if data['version'] != _BENCHMARK_VERSION:
+        raise Exception(
+            f"ERROR: benchmark version {data['version']} is not supported...")
+    return data['results']
+
+
+def compare(results: List[dict], baseline: List[dict],
+            threshold: float = 0.1) -> List[dict]:
+    """Compares the results with a baseline.
+
+    A benchmark regresses when its requests/sec are lower than the
+    baseline ones, or its peak memory is higher, by more than the
+    threshold. A benchmark without requests in one of the runs is not
+    comparable and it is reported as a regression.
+
+    :param results: the current results
+    :type results: List[dict]
+    :param baseline: the baseline results
+    :type baseline: List[dict]
+    :param threshold: the relative tolerance, defaults to 0.1 (10%)
+    :type threshold: float, optional
+    :return: the comparison of each benchmark in both runs, with the
+        speed and memory ratios and the regression flag
+    :rtype: List[dict]
+    """
+    base = {(res['name'], res['scale']): res for res in baseline}
+    comparison = []
+    for res in results:
+        ref = base.get((res['name'], res['scale']))
+        if ref is None:
+            continue
+        comparable = ref['req_per_sec'] > 0 and res['req_per_sec'] > 0
+        speed = res['req_per_sec'] / ref['req_per_sec'] if comparable else 0.
+        memory = res['peak_mem'] / ref['peak_mem'] \
+            if ref['peak_mem'] > 0 and res['peak_mem'] >= 0 else 1.
+        comparison.append({
+            'name': res['name'],
+            'scale': res['scale'],
+            'speed': speed,
+            'memory': memory,
+            'regression': not comparable or speed < 1. - threshold or
+            memory > 1. + threshold,
+        })
+    return comparison
+
+
+def format_table(results: List[dict],
+                 comparison: List[dict] = None) -> str:
+    """Returns the results as a text table.
+
+    :param results: the benchmark results
+    :type results: List[dict]
+    :param comparison: the comparison with a baseline, defaults to None
+    :type comparison: List[dict], optional
+    :return: the table
+    :rtype: str
+    """
+    cmp_map = {
+        (cur['name'], cur['scale']): cur for cur in (comparison or [])
+    }
+    lines = [
+        f"{'benchmark':<40} {'scale':<7} {'time (s)':>10} "
+        f"{'req/s':>12} {'peak (MB)':>10} {'vs base':>16}"
+    ]
+    for res in results:
+        cur_cmp = cmp_map.get((res['name'], res['scale']))
+        vs_base = ""
+        if cur_cmp is not None:
+            vs_base = f"x{cur_cmp['speed']:.2f} m{cur_cmp['memory']:.2f}"
+            if cur_cmp['regression']:
+                vs_base += " !"
+        peak = res['peak_mem'] / 1024**2 if res['peak_mem'] >= 0 else -1
+        lines.append(
+            f"{res['name']:<40} {res['scale']:<7} {res['seconds']:>10.3f} "
+            f"{res['req_per_sec']:>12.0f} {peak:>10.1f} {vs_base:>16}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,221 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+from pathlib import Path, PurePath
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from . import functions, utils
+from .formats import dataset_files
+
+# File that marks a complete cache entry and records its last use
+_ENTRY_INFO = "entry.json"
+
+
+def source_version() -> str:
+    """Returns the checksum of the code that determines the dataset files.
+
+    It covers the source of the `generator` module (day random streams
+    and columns), the `functions` and `utils` modules (file catalogs,
+    size generators and fake CPU work) and the `formats` module
+    (serialization and compression), together with the NumPy and pandas
+    versions, so a change of any of them invalidates the cached datasets.
+
+    :return: the hex digest
+    :rtype: str
+    """
+    # Imported here because the generator module uses the cache keys
+    from . import formats, generator
+
+    digest = hashlib.sha256()
+    for module in (generator, formats, functions, utils):
+        digest.update(inspect.getsource(module).encode())
+    digest.update(f"numpy={np.__version__},pandas={pd.__version__}".encode())
+    return digest.hexdigest()
+
+
+def dataset_key(config: dict) -> str:
+    """Returns the cache key of a dataset.
+
+    :param config: the resolved configuration, seed and number of days
+        included
+    :type config: dict
+    :return: the hex digest
+    :rtype: str
+    """
+    return hashlib.sha256(json.dumps(
+        {'config': config, 'source': source_version()},
+        sort_keys=True, default=str
+    ).encode()).hexdigest()
+
+
+def link_or_copy(src: 'Path', dest: 'Path'):
+    """Hard-links a file atomically, or copies it across file systems.
+
+    :param src: the source file
+    :type src: Path
+    :param dest: the destination file
+    :type dest: Path
+    """
+    tmp_path = dest.with_name(f".{dest.name}.{os.getpid()}.link.tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copy2(src, tmp_path)
+    os.replace(tmp_path, dest)
+
+
+class DatasetCache(object):
+
+    """A local content-addressed cache of generated datasets.
+
+    Each entry is a folder named after the dataset key (see `dataset_key`)
+    with the day files. The files are hard-linked, when possible, so an
+    entry does not use more space than the dataset it was stored from.
+    When the total size exceeds the limit, the least recently used entries
+    are removed.
+    """
+
+    def __init__(self, cache_dir: 'PurePath', max_size: int = 10 * 1024**3):
+        """Initialize the cache.
+
+        :param cache_dir: the cache folder
+        :type cache_dir: PurePath
+        :param max_size: maximum total size in bytes, defaults to 10 GiB
+        :type max_size: int, optional
+        """
+        self._cache_dir = Path(cache_dir)
+        self._max_size = max_size
+        Path.mkdir(self._cache_dir, parents=True, exist_ok=True)
+
+    @property
+    def cache_dir(self) -> 'Path':
+        return self._cache_dir
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    def _entries(self) -> List['Path']:
+        return [
+            entry for entry in self._cache_dir.iterdir()
+            if entry.joinpath(_ENTRY_INFO).exists()
+        ]
+
+    @staticmethod
+    def _entry_size(entry: 'Path') -> int:
+        return sum(file_.stat().st_size for file_ in entry.iterdir())
+
+    @staticmethod
+    def _touch(entry: 'Path'):
+        info_path = entry.joinpath(_ENTRY_INFO)
+        with open(info_path) as info_file:
+            info = json.load(info_file)
+        info['last_used'] = time.time()
+        tmp_path = entry.joinpath(f".{_ENTRY_INFO}.tmp")
+        with open(tmp_path, "w") as info_file:
+            json.dump(info, info_file, indent=2)
+        os.replace(tmp_path, info_path)
+
+    @staticmethod
+    def _last_used(entry: 'Path') -> float:
+        with open(entry.joinpath(_ENTRY_INFO)) as info_file:
+            return json.load(info_file)['last_used']
+
+    @property
+    def size(self) -> int:
+        """Total size in bytes of the cached datasets."""
+        return sum(self._entry_size(entry) for entry in self._entries())
+
+    def __contains__(self, key: str) -> bool:
+        return self._cache_dir.joinpath(key, _ENTRY_INFO).exists()
+
+    def restore(self, key: str, dest_folder: 'PurePath') -> bool:
+        """Links a cached dataset into a folder.
+
+        The day files of the folder that are not in the cached dataset
+        are removed.
+
+        :param key: the dataset key
+        :type key: str
+        :param dest_folder: the destination folder
+        :type dest_folder: PurePath
+        :return: True on a cache hit
+        :rtype: bool
+        """
+        if key not in self:
+            return False
+        entry = self._cache_dir.joinpath(key)
+        dest_folder = Path(dest_folder)
+        Path.mkdir(dest_folder, parents=True, exist_ok=True)
+
+        restored = set()
+        for file_ in entry.iterdir():
+            if file_.name == _ENTRY_INFO:
+                continue
+            link_or_copy(file_, dest_folder.joinpath(file_.name))
+            restored.add(file_.name)
+        for _, file_ in dataset_files(dest_folder):
+            if file_.name not in restored:
+                file_.unlink()
+        self._touch(entry)
+        return True
+
+    def store(self, key: str, folder: 'PurePath', files: List['PurePath']):
+        """Adds a dataset to the cache and evicts the old entries.
+
+        :param key: the dataset key
+        :type key: str
+        :param folder: the dataset folder
+        :type folder: PurePath
+        :param files: the files of the dataset in the folder
+        :type files: List[PurePath]
+        :return: self
+        :rtype: DatasetCache
+        """
+        entry = self._cache_dir.joinpath(key)
+        if key in self:
+            self._touch(entry)
+            return self
+
+        tmp_entry = self._cache_dir.joinpath(f".{key}.{os.getpid()}.tmp")
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+        Path.mkdir(tmp_entry)
+        for file_ in files:
+            file_ = Path(folder).joinpath(Path(file_).name)
+            link_or_copy(file_, tmp_entry.joinpath(file_.name))
+        with open(tmp_entry.joinpath(_ENTRY_INFO), "w") as info_file:
+            json.dump({
+                'key': key,
+                'files': [Path(file_).name for file_ in files],
+                'last_used': time.time(),
+            }, info_file, indent=2)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp_entry, entry)
+
+        return self.evict()
+
+    def evict(self):
+        """Removes the least recently used entries over the size limit.
+
+        :return: self
+        :rtype: DatasetCache
+        """
+        entries = sorted(
+            (self._last_used(entry), self._entry_size(entry), entry)
+            for entry in self._entries()
+        )
+        tot_size = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if tot_size <= self._max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            tot_size -= size
+        return self
@@ -0,0 +1,184 @@
+import gzip
+import io
+import tarfile
+import tempfile
+import time
+import zipfile
+from typing import Generator, Iterable
+
+import pandas as pd
+
+from .formats import cast_columns, check_pyarrow
+
+# Rows serialized at once in the archive members
+_CSV_CHUNK_ROWS = 100_000
+# Max. size of a tar member kept in memory before spilling it on disk
+_SPOOL_SIZE = 64 * 1024**2
+# Deflate level of the zip and tar.gz archives (the zlib default, the
+# tarfile gzip default of 9 is much slower for a small size gain)
+_COMPRESS_LEVEL = 6
+
+
+class _StreamSink(io.RawIOBase):
+
+    """A write-only file that keeps the written bytes until drained.
+
+    The archive writers write into the sink and the exporters yield its
+    content after each chunk, so only the last chunk is in memory.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        """Returns and forgets the bytes written since the last call.
+
+        :return: the written bytes
+        :rtype: bytes
+        """
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _csv_chunks(df: 'pd.DataFrame') -> Generator[bytes, None, None]:
+    for start in range(0, max(len(df), 1), _CSV_CHUNK_ROWS):
+        yield df.iloc[start:start + _CSV_CHUNK_ROWS].to_csv(
+            index=False, header=start == 0).encode()
+
+
+def _member_name(date) -> str:
+    return f"dataset_{date}.csv"
+
+
+def iter_zip(days: Iterable) -> Generator[bytes, None, None]:
+    """Streams the days as a zip archive of csv files.
+
+    Each member is deflated while the day is serialized in chunks.
+
+    :param days: the date and dataframe of each day (see
+        `DatasetView.iter_days`)
+    :type days: Iterable[Tuple[datetime.date, pd.DataFrame]]
+    :yield: the archive bytes
+    :rtype: bytes
+    """
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED,
+                         compresslevel=_COMPRESS_LEVEL) as archive:
+        for date, df in days:
+            with archive.open(_member_name(date), mode="w",
+                              force_zip64=True) as member:
+                for data in _csv_chunks(df):
+                    member.write(data)
+                    yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+
+def iter_tar(days: Iterable) -> Generator[bytes, None, None]:
+    """Streams the days as a gzip compressed tar archive of csv files.
+
+    A tar header needs the member size, so each day is serialized first
+    in a temporary file, kept in memory up to _SPOOL_SIZE bytes. The
+    archive is compressed with the same level of the zip export.
+
+    :param days: the date and dataframe of each day (see
+        `DatasetView.iter_days`)
+    :type days: Iterable[Tuple[datetime.date, pd.DataFrame]]
+    :yield: the archive bytes
+    :rtype: bytes
+    """
+    sink = _StreamSink()
+    with gzip.GzipFile(fileobj=sink, mode="wb",
+                       compresslevel=_COMPRESS_LEVEL) as compressed, \
+            tarfile.open(fileobj=compressed, mode="w|") as archive:
+        for date, df in days:
+            with tempfile.SpooledTemporaryFile(_SPOOL_SIZE) as member:
+                for data in _csv_chunks(df):
+                    member.write(data)
+                info = tarfile.TarInfo(_member_name(date))
+                info.size = member.tell()
+                info.mtime = int(time.time())
+                member.seek(0)
+                archive.addfile(info, member)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def iter_parquet(days: Iterable,
+                 compression: str = "zstd") -> Generator[bytes, None, None]:
+    """Streams the days as a single Parquet file.
+
+    Each day is a row group, compressed when it is written.
+
+    :param days: the date and dataframe of each day (see
+        `DatasetView.iter_days`)
+    :type days: Iterable[Tuple[datetime.date, pd.DataFrame]]
+    :param compression: the Parquet compression, defaults to "zstd"
+    :type compression: str, optional
+    :yield: the file bytes
+    :rtype: bytes
+    """
+    check_pyarrow("parquet")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _StreamSink()
+    writer = None
+    try:
+        for _, df in days:
+            table = pa.Table.from_pandas(cast_columns(df), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(
+                    sink, table.schema,
+                    compression=compression if compression != "none" else None,
+                )
+            writer.write_table(table)
+            yield sink.drain()
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.drain()
+
+
+# Available exports: function, file extension and media type
+EXPORTS = {
+    'zip': (iter_zip, "zip", "application/zip"),
+    'tar': (iter_tar, "tar.gz", "application/gzip"),
+    'parquet': (iter_parquet, "parquet", "application/vnd.apache.parquet"),
+}
+
+
+def iter_export(view, kind: str = "zip") -> Generator[bytes, None, None]:
+    """Streams a dataset as an archive or as a single file.
+
+    Only one day at a time is loaded from the view and the empty chunks
+    are skipped.
+
+    :param view: the dataset to export
+    :type view: DatasetView
+    :param kind: the export kind (see EXPORTS), defaults to "zip"
+    :type kind: str, optional
+    :raises Exception: the export kind does not exist
+    :yield: the export bytes
+    :rtype: bytes
+    """
+    if kind not in EXPORTS:
+        raise Exception(f"ERROR: export {kind} does not exist...")
+    exporter, _, _ = EXPORTS[kind]
+    for data in exporter(view.iter_days()):
+        if data:
+            yield data
@@ -0,0 +1,295 @@
+import datetime
+import gzip
+from pathlib import Path, PurePath
+from typing import List, Tuple
+
+import pandas as pd
+
+from . import profiler
+from .utils import COLUMNS
+
+# Rows serialized at once by the csv format
+_CSV_CHUNK_ROWS = 100_000
+
+
+def check_pyarrow(format_name: str):
+    """Checks that pyarrow is installed.
+
+    :param format_name: name of the format that needs pyarrow
+    :type format_name: str
+    :raises Exception: pyarrow is not installed
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise Exception(
+            f"ERROR: the {format_name} format requires pyarrow, install it with 'pip install pyarrow'...")
+
+
+def cast_columns(df: 'pd.DataFrame') -> 'pd.DataFrame':
+    """Casts the dataframe columns using the COLUMNS types.
+
+    :param df: the dataframe to cast
+    :type df: pd.DataFrame
+    :return: the typed dataframe
+    :rtype: pd.DataFrame
+    """
+    return df.astype({
+        column: type_
+        for column, type_ in COLUMNS.items()
+        if column in df.columns
+    })
+
+
+class OutputFormat(object):
+
+    """Base class of the dataset file formats."""
+
+    name = ""
+    extension = ""
+    compressions = ("none",)
+
+    def __init__(self, compression: str = None):
+        """Initialize the format.
+
+        :param compression: the compression to use, defaults to None
+            (the first of the supported compressions)
+        :type compression: str, optional
+        :raises Exception: the compression is not supported
+        """
+        if compression is None:
+            compression = self.compressions[0]
+        if compression not in self.compressions:
+            raise Exception(
+                f"ERROR: compression {compression} is not supported by the {self.name} format...")
+        self._compression = compression
+
+    def __repr__(self):
+        return f"{self.name}[{self._compression}]"
+
+    @property
+    def compression(self) -> str:
+        return self._compression
+
+    def write(self, df: 'pd.DataFrame', file_path: 'PurePath'):
+        """Writes a dataframe into a file.
+
+        :param df: the dataframe to write
+        :type df: pd.DataFrame
+        :param file_path: the output file path
+        :type file_path: PurePath
+        """
+        raise NotImplementedError
+
+    def read(self, file_path: 'PurePath',
+             columns: List[str] = None) -> 'pd.DataFrame':
+        """Reads a dataframe from a file.
+
+        :param file_path: the input file path
+        :type file_path: PurePath
+        :param columns: columns to read, defaults to None (all)
+        :type columns: List[str], optional
+        :return: the dataframe typed with COLUMNS
+        :rtype: pd.DataFrame
+        """
+        raise NotImplementedError
+
+
+class CSVFormat(OutputFormat):
+
+    """Text csv format, compressed with gzip as default."""
+
+    name = "csv"
+    compressions = ("gzip", "none")
+
+    @property
+    def extension(self) -> str:
+        return "csv.gz" if self._compression == "gzip" else "csv"
+
+    def write(self, df: 'pd.DataFrame', file_path: 'PurePath'):
+        # The rows are serialized and compressed in chunks, as separate
+        # profiler stages. The gzip header has no name and no time, so
+        # the same day is always the same file
+        with open(file_path, "wb") as raw_file:
+            out_file = raw_file
+            if self._compression == "gzip":
+                out_file = gzip.GzipFile(
+                    filename="", mode="wb", fileobj=raw_file, mtime=0)
+            try:
+                for start in range(0, max(len(df), 1), _CSV_CHUNK_ROWS):
+                    chunk = df.iloc[start:start + _CSV_CHUNK_ROWS]
+                    with profiler.stage('serialize', len(chunk)):
+                        data = chunk.to_csv(
+                            index=False, header=start == 0).encode()
+                    with profiler.stage('compress', len(chunk)):
+                        out_file.write(data)
+            finally:
+                if out_file is not raw_file:
+                    out_file.close()
+
+    def read(self, file_path: 'PurePath',
+             columns: List[str] = None) -> 'pd.DataFrame':
+        try:
+            return pd.read_csv(
+                file_path, usecols=columns,
+                dtype={
+                    column: type_ for column, type_ in COLUMNS.items()
+                    if columns is None or column in columns
+                }
+            )
+        except ValueError:
+            # Old datasets have empty values in the unused integer columns:
+            # only those columns are left untyped, any other error (e.g.
+            # malformed values or unknown columns) is raised
+            df = pd.read_csv(file_path, usecols=columns)
+            with_nan = set(df.columns[df.isna().any()])
+            if not with_nan:
+                raise
+            return df.astype({
+                column: type_ for column, type_ in COLUMNS.items()
+                if column in df.columns and column not in with_nan
+            })
+
+
+class ParquetFormat(OutputFormat):
+
+    """Apache Parquet format, compressed with zstd as default."""
+
+    name = "parquet"
+    extension = "parquet"
+    compressions = ("zstd", "snappy", "gzip", "lz4", "brotli", "none")
+
+    def write(self, df: 'pd.DataFrame', file_path: 'PurePath'):
+        check_pyarrow(self.name)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        with profiler.stage('serialize', len(df)):
+            table = pa.Table.from_pandas(cast_columns(df), preserve_index=False)
+        # Encoding and compression of the column pages
+        with profiler.stage('compress', len(df)):
+            pq.write_table(
+                table, file_path,
+                compression=self._compression if self._compression != "none" else None,
+            )
+
+    def read(self, file_path: 'PurePath',
+             columns: List[str] = None) -> 'pd.DataFrame':
+        check_pyarrow(self.name)
+        return pd.read_parquet(file_path, engine="pyarrow", columns=columns)
+
+
+class FeatherFormat(OutputFormat):
+
+    """Apache Arrow IPC (Feather v2) format, compressed with zstd as default."""
+
+    name = "feather"
+    extension = "feather"
+    compressions = ("zstd", "lz4", "none")
+
+    def __init__(self, compression: str = None):
+        # "uncompressed" is the pyarrow name, accepted as an alias of "none"
+        if compression == "uncompressed":
+            compression = "none"
+        super().__init__(compression)
+
+    def write(self, df: 'pd.DataFrame', file_path: 'PurePath'):
+        check_pyarrow(self.name)
+        import pyarrow as pa
+        from pyarrow import feather
+
+        with profiler.stage('serialize', len(df)):
+            table = pa.Table.from_pandas(cast_columns(df), preserve_index=False)
+        with profiler.stage('compress', len(df)):
+            feather.write_feather(
+                table, file_path,
+                compression=self._compression
+                if self._compression != "none" else "uncompressed",
+            )
+
+    def read(self, file_path: 'PurePath',
+             columns: List[str] = None) -> 'pd.DataFrame':
+        check_pyarrow(self.name)
+        return pd.read_feather(file_path, columns=columns)
+
+
+# Available dataset formats
+FORMATS = {
+    CSVFormat.name: CSVFormat,
+    ParquetFormat.name: ParquetFormat,
+    FeatherFormat.name: FeatherFormat,
+}
+
+
+def get_format(name: str = "csv", compression: str = None) -> 'OutputFormat':
+    """Returns a dataset format object.
+
+    :param name: name of the format, defaults to "csv"
+    :type name: str, optional
+    :param compression: the compression to use, defaults to None
+    :type compression: str, optional
+    :raises Exception: format not exists
+    :return: the format object
+    :rtype: OutputFormat
+    """
+    if name not in FORMATS:
+        raise Exception(
+            f"ERROR: Output format {name} does not exist...")
+    return FORMATS[name](compression)
+
+
+def format_of(file_path: 'PurePath') -> 'OutputFormat':
+    """Returns the format of a dataset file from its extension.
+
+    :param file_path: the dataset file
+    :type file_path: PurePath
+    :raises Exception: the file has an unknown format
+    :return: the format object
+    :rtype: OutputFormat
+    """
+    suffixes = Path(file_path).suffixes
+    if suffixes[-2:] == [".csv", ".gz"]:
+        return CSVFormat("gzip")
+    elif suffixes[-1:] == [".csv"]:
+        return CSVFormat("none")
+    elif suffixes[-1:] == [".parquet"]:
+        return ParquetFormat()
+    elif suffixes[-1:] == [".feather"]:
+        return FeatherFormat()
+    raise Exception(
+        f"ERROR: unknown format of file {file_path}...")
+
+
+def dataset_files(folder: 'PurePath') -> List[Tuple['datetime.date', 'Path']]:
+    """Returns the dataset files of a folder in date order.
+
+    The day files are named dataset_<date>.<extension>, the files with an
+    unknown format are skipped.
+
+    :param folder: the dataset folder
+    :type folder: PurePath
+    :return: the date and path of each day file
+    :rtype: List[Tuple[datetime.date, Path]]
+    """
+    files = []
+    for file_path in Path(folder).resolve().glob("dataset_*"):
+        try:
+            format_of(file_path)
+            date = dataset_file_date(file_path)
+        except Exception:
+            continue
+        files.append((date, file_path))
+    return sorted(files)
+
+
+def dataset_file_date(file_path: 'PurePath') -> 'datetime.date':
+    """Returns the date of a dataset day file (dataset_<date>.<extension>).
+
+    :param file_path: the dataset file
+    :type file_path: PurePath
+    :return: the day's date
+    :rtype: datetime.date
+    """
+    return datetime.date.fromisoformat(
+        Path(file_path).name.split(".", 1)[0].split("_", 1)[1]
+    )
@@ -1,20 +1,37 @@
-import random
-
+import numpy as np
 from numpy import random as np_random
-from typing import Generator
+from typing import Dict, Generator
 
-from .utils import gen_fake_cpu_work, gen_random_files
+from .utils import FileCatalog, gen_random_files
 
 
 class GenFunction(object):
 
-    def __init__(self):
+    """Base class of the dataset generator functions.
+
+    The file catalog is created in `__init__` drawing only from the `rng`
+    passed by the Generator (derived from its seed), so functions created
+    at the same time in different threads do not interfere. The day's
+    requests have to be drawn from `rng`, which the Generator sets to a
+    stream derived from (seed, day index) before each day. Hence, a
+    function must not keep any state between days and the days can be
+    generated in any order, also in different processes.
+    """
+
+    def __init__(self, rng: 'np.random.Generator' = None):
+        """Initialize the function.
+
+        :param rng: the random generator of the file catalog, defaults to
+            None (a new one)
+        :type rng: np.random.Generator, optional
+        """
         self._day_idx = -1
         self._num_req_x_day = -1
+        self._rng = rng if rng is not None else np_random.default_rng()
 
     @property
     def day_idx(self):
-        return self.day_idx
+        return self._day_idx
 
     @day_idx.setter
     def day_idx(self, value: int):
@@ -31,9 +48,22 @@ class GenFunction(object):
         self._day_idx = value
         return self
 
+    @property
+    def rng(self) -> 'np.random.Generator':
+        return self._rng
+
+    @rng.setter
+    def rng(self, value: 'np.random.Generator'):
+        """Set the random generator of the current day.
+
+        :param value: the day's random generator
+        :type value: np.random.Generator
+        """
+        self._rng = value
+
     @property
     def num_req_x_day(self):
-        return self.num_req_x_day
+        return self._num_req_x_day
 
     @num_req_x_day.setter
     def num_req_x_day(self, value: int):
@@ -50,12 +80,71 @@ class GenFunction(object):
     def gen_day_elements(self, max_num: int = -1) -> Generator[int, None, None]:
         """Generates all the day's entries.
 
+        The default implementation iterates over the columns returned by
+        `gen_day_columns`.
+
         :param max_num: maximum number of requests, defaults to -1
         :type max_num: int, optional
         :yield: the percentage of work done
         :rtype: Generator[int, None, None]
         """
-        raise NotImplementedError
+        if type(self).gen_day_columns is GenFunction.gen_day_columns:
+            raise NotImplementedError
+
+        columns = self.gen_day_columns(max_num)
+        num_rows = len(columns['Filename'])
+        for idx in range(num_rows):
+            yield {
+                key: column[idx] for key, column in columns.items()
+            }, float(idx / num_rows) * 100.
+
+    def gen_day_columns(self, max_num: int = -1) -> Dict[str, 'np.ndarray']:
+        """Generates all the day's entries as columns.
+
+        The default implementation collects the rows yielded by
+        `gen_day_elements`, derived classes should override it to build
+        the arrays directly.
+
+        :param max_num: maximum number of requests, defaults to -1
+        :type max_num: int, optional
+        :return: the day's columns (Filename, Size, Protocol, ...)
+        :rtype: Dict[str, np.ndarray]
+        """
+        if type(self).gen_day_elements is GenFunction.gen_day_elements:
+            raise NotImplementedError
+
+        rows = [elm for elm, _ in self.gen_day_elements(max_num)]
+        if not rows:
+            return {
+                'Filename': np.array([], dtype=np.int64),
+                'Size': np.array([], dtype=np.float64),
+                'Protocol': np.array([], dtype=np.int64),
+            }
+        return {
+            key: np.array([row[key] for row in rows])
+            for key in rows[0]
+        }
+
+    def get_state(self) -> Dict[str, 'np.ndarray']:
+        """Returns the state shared by all the days, e.g. the file catalog.
+
+        It is stored when a generation can be resumed, so the remaining
+        days are generated with exactly the same state.
+
+        :return: the state arrays
+        :rtype: Dict[str, np.ndarray]
+        """
+        return {}
+
+    def set_state(self, state: Dict[str, 'np.ndarray']):
+        """Restores the state returned by `get_state`.
+
+        :param state: the state arrays
+        :type state: Dict[str, np.ndarray]
+        :return: self
+        :rtype: GenFunction
+        """
+        return self
 
     @property
     def name(self):
@@ -65,7 +154,8 @@ class GenFunction(object):
 class RandomGenerator(GenFunction):
 
     def __init__(self, num_files: int, min_file_size: int, max_file_size: int,
-                 size_generator_function: str):
+                 size_generator_function: str,
+                 rng: 'np.random.Generator' = None):
         """Initialize the random function parameters.
 
         :param num_files: total number of files
@@ -76,36 +166,42 @@ class RandomGenerator(GenFunction):
         :type max_file_size: int
         :param size_generator_function: name of the size generator function
         :type size_generator_function: str
+        :param rng: the random generator of the file catalog, defaults to
+            None (a new one)
+        :type rng: np.random.Generator, optional
         """
-        super().__init__()
+        super().__init__(rng)
         self._num_files: int = num_files
         self._min_file_size: int = min_file_size
         self._max_file_size: int = max_file_size
         self._size_generator_function: str = size_generator_function
 
-        self._files = gen_random_files(
-            num_files, min_file_size, max_file_size, size_generator_function
+        self._files: FileCatalog = gen_random_files(
+            num_files, min_file_size, max_file_size, size_generator_function,
+            rng=self._rng,
         )
 
     def __repr__(self):
         return "Random Generator"
 
-    def gen_day_elements(self, max_num: int = -1) -> Generator[int, None, None]:
-        """Generates all the day's entries.
+    def get_state(self) -> Dict[str, 'np.ndarray']:
+        return self._files.to_dict()
+
+    def set_state(self, state: Dict[str, 'np.ndarray']):
+        self._files = FileCatalog.from_dict(state)
+        return self
+
+    def gen_day_columns(self, max_num: int = -1) -> Dict[str, 'np.ndarray']:
+        """Generates all the day's entries as columns.
 
         :param max_num: maximum number of requests, defaults to -1
         :type max_num: int, optional
-        :yield: the percentage of work done
-        :rtype: Generator[int, None, None]
+        :return: the day's columns
+        :rtype: Dict[str, np.ndarray]
         """
-        filenames: list = list(self._files.keys())
-        for _ in range(max_num):
-            cur_file = random.choice(filenames)
-            yield {
-                'Filename': cur_file,
-                'Size': self._files[cur_file]['Size'],
-                'Protocol': self._files[cur_file]['Protocol'],
-            }, None
+        return self._files.take(
+            self._rng.integers(len(self._files), size=max(max_num, 0))
+        )
 
 
 class HighFrequencyDataset(GenFunction):
@@ -115,7 +211,8 @@ class HighFrequencyDataset(GenFunction):
     def __init__(self, num_files: int, min_file_size: int, max_file_size: int,
                  lambda_less_req_files: float, lambda_more_req_files: float,
                  perc_more_req_files: float, perc_files_x_day: float,
-                 size_generator_function: str):
+                 size_generator_function: str,
+                 rng: 'np.random.Generator' = None):
         """Initialize the frequency function parameters.
 
         :param num_files: total number of files
@@ -134,8 +231,11 @@ class HighFrequencyDataset(GenFunction):
         :type perc_files_x_day: float
         :param size_generator_function: name of the size generator function
         :type size_generator_function: str
+        :param rng: the random generator of the file catalog, defaults to
+            None (a new one)
+        :type rng: np.random.Generator, optional
         """
-        super().__init__()
+        super().__init__(rng)
         self._num_files: int = num_files
         self._min_file_size: int = min_file_size
         self._max_file_size: int = max_file_size
@@ -149,79 +249,66 @@ class HighFrequencyDataset(GenFunction):
             (num_files / 100.) * perc_more_req_files)
         self._num_less_req_files = num_files - self._num_more_req_files
 
-        self._more_req_files = gen_random_files(
+        more_req_files = gen_random_files(
             self._num_more_req_files, min_file_size, max_file_size,
-            size_generator_function
+            size_generator_function,
+            popularity=1,
+            rng=self._rng,
         )
-        self._less_req_files = gen_random_files(
+        less_req_files = gen_random_files(
             self._num_less_req_files, min_file_size, max_file_size,
             size_generator_function,
             start_from=self._num_more_req_files,
+            rng=self._rng,
+        )
+        self._files: FileCatalog = FileCatalog.concat(
+            [more_req_files, less_req_files]
         )
 
-        assert len(set(self._more_req_files.keys()) &
-                   set(self._less_req_files.keys())) == 0
-
-        self._more_req_files_freq = {
-            filename: freq
-            for filename, freq in enumerate(
-                np_random.poisson(
-                    lam=self._lambda_more_req_files,
-                    size=self._num_more_req_files,
-                )
-            )
-        }
-
-        self._less_req_files_freq = {
-            filename: freq
-            for filename, freq in enumerate(
-                np_random.poisson(
-                    lam=self._lambda_less_req_files,
-                    size=self._num_less_req_files,
-                ),
-                self._num_more_req_files
-            )
-        }
+        # Max. number of daily requests of each file, by catalog position
+        self._files_freq = np.concatenate([
+            self._rng.poisson(
+                lam=self._lambda_more_req_files,
+                size=self._num_more_req_files,
+            ),
+            self._rng.poisson(
+                lam=self._lambda_less_req_files,
+                size=self._num_less_req_files,
+            ),
+        ])
 
     def __repr__(self):
         return "High Frequency Dataset"
 
-    def gen_day_elements(self, max_num: int = -1) -> Generator:
-        """Generates all the day's entries.
+    def get_state(self) -> Dict[str, 'np.ndarray']:
+        return {**self._files.to_dict(), 'files_freq': self._files_freq}
+
+    def set_state(self, state: Dict[str, 'np.ndarray']):
+        self._files = FileCatalog.from_dict(state)
+        self._files_freq = state['files_freq']
+        return self
+
+    def gen_day_columns(self, max_num: int = -1) -> Dict[str, 'np.ndarray']:
+        """Generates all the day's entries as columns.
 
         :param max_num: maximum number of requests, defaults to -1
         :type max_num: int, optional
-        :yield: the percentage of work done
-        :rtype: Generator[int, None, None]
+        :return: the day's columns
+        :rtype: Dict[str, np.ndarray]
         """
-
         file_perc_x_day = self._perc_files_x_day / 100.
-        filenames = list(self._more_req_files.keys()) + \
-            list(self._less_req_files.keys())
-        num_visible_files = int(len(filenames) * file_perc_x_day)
-
-        random.shuffle(filenames)
-        filenames = filenames[:num_visible_files]
-
-        all_requests = []
+        num_visible_files = int(len(self._files) * file_perc_x_day)
 
-        for cur_file in filenames:
-            if cur_file in self._more_req_files_freq:
-                max_num_req = self._more_req_files_freq[cur_file]
-                file_info = self._more_req_files[cur_file]
-            elif cur_file in self._less_req_files_freq:
-                max_num_req = self._less_req_files_freq[cur_file]
-                file_info = self._less_req_files[cur_file]
-            for _ in range(random.randint(0, max_num_req)):
-                all_requests.append({
-                    'Filename': cur_file,
-                    **file_info.copy(),
-                })
+        files = self._rng.permutation(len(self._files))[:num_visible_files]
 
-        random.shuffle(all_requests)
+        # Random number of requests between 0 and the file max frequency
+        num_requests = self._rng.integers(
+            0, self._files_freq[files], endpoint=True
+        )
+        requests = np.repeat(files, num_requests)
+        requests = requests[self._rng.permutation(len(requests))]
 
-        for num, elm in enumerate(all_requests):
-            yield elm, float(num / len(all_requests)) * 100.
+        return self._files.take(requests)
 
 
 class RecencyFocusedDataset(GenFunction):
@@ -229,7 +316,8 @@ class RecencyFocusedDataset(GenFunction):
     """Dataset to test the recency aspect."""
 
     def __init__(self, num_files: int, min_file_size: int, max_file_size: int,
-                 perc_files_x_day: float, size_generator_function: str):
+                 perc_files_x_day: float, size_generator_function: str,
+                 rng: 'np.random.Generator' = None):
         """Initialize the recency function parameters.
 
         :param num_files: total number of files
@@ -242,54 +330,63 @@ class RecencyFocusedDataset(GenFunction):
         :type perc_files_x_day: float
         :param size_generator_function: name of the size generator function
         :type size_generator_function: str
+        :param rng: the random generator of the file catalog, defaults to
+            None (a new one)
+        :type rng: np.random.Generator, optional
         """
-        super().__init__()
+        super().__init__(rng)
         self._num_files: int = num_files
         self._min_file_size: int = min_file_size
         self._max_file_size: int = max_file_size
         self._perc_files_x_day: float = perc_files_x_day
         self._size_generator_function: str = size_generator_function
 
-        self._files = gen_random_files(
+        self._files: FileCatalog = gen_random_files(
             num_files, min_file_size, max_file_size,
-            size_generator_function
+            size_generator_function,
+            rng=self._rng,
         )
 
     def __repr__(self):
         return "Recency Focused Dataset"
 
-    def gen_day_elements(self, max_num: int = -1) -> Generator:
-        """Generates all the day's entries.
+    def get_state(self) -> Dict[str, 'np.ndarray']:
+        return self._files.to_dict()
+
+    def set_state(self, state: Dict[str, 'np.ndarray']):
+        self._files = FileCatalog.from_dict(state)
+        return self
+
+    def gen_day_columns(self, max_num: int = -1) -> Dict[str, 'np.ndarray']:
+        """Generates all the day's entries as columns.
 
         :param max_num: maximum number of requests, defaults to -1
         :type max_num: int, optional
-        :yield: the percentage of work done
-        :rtype: Generator[int, None, None]
+        :return: the day's columns
+        :rtype: Dict[str, np.ndarray]
         """
-        all_requests = []
         file_perc_x_day = self._perc_files_x_day / 100.
-
-        filenames = list(self._files.keys())
         num_visible_files = int(len(self._files) * file_perc_x_day)
 
-        random.shuffle(filenames)
-        filenames = filenames[:num_visible_files]
+        files = self._rng.permutation(len(self._files))[:num_visible_files]
+        if len(files) == 0 or max_num <= 0:
+            return self._files.take(files[:0])
 
-        while len(all_requests) < max_num:
-            for cur_file in filenames:
-                file_info = self._files[cur_file]
-                all_requests.append({
-                    'Filename': cur_file,
-                    **file_info.copy(),
-                })
-                if len(all_requests) == max_num:
-                    break
+        # Each pass requests all the files, after a pass the sequence
+        # is reversed with a 50% probability
+        num_passes = -(-max_num // len(files))
+        flips = self._rng.random(num_passes) > 0.5
+        reversed_passes = np.cumsum(
+            np.concatenate([[False], flips[:-1]])
+        ) % 2 == 1
 
-            if random.random() > 0.5:
-                filenames = list(reversed(filenames))
+        requests = np.where(
+            reversed_passes[:, np.newaxis],
+            files[np.newaxis, ::-1],
+            files[np.newaxis, :],
+        ).ravel()[:max_num]
 
-        for num, elm in enumerate(all_requests):
-            yield elm, float(num / len(all_requests)) * 100.
+        return self._files.take(requests)
 
 
 class SizeFocusedDataset(GenFunction):
@@ -299,7 +396,8 @@ class SizeFocusedDataset(GenFunction):
     def __init__(self, num_files: int, min_file_size: int, max_file_size: int,
                  noise_min_file_size: int, noise_max_file_size: int,
                  perc_noise: float, perc_files_x_day: float,
-                 size_generator_function: str):
+                 size_generator_function: str,
+                 rng: 'np.random.Generator' = None):
         """Initialize the size function parameters.
 
         :param num_files: total number of files
@@ -318,8 +416,11 @@ class SizeFocusedDataset(GenFunction):
         :type perc_files_x_day: float
         :param size_generator_function: name of the size generator function
         :type size_generator_function: str
+        :param rng: the random generator of the file catalog, defaults to
+            None (a new one)
+        :type rng: np.random.Generator, optional
         """
-        super().__init__()
+        super().__init__(rng)
         self._num_files: int = num_files
         self._min_file_size: int = min_file_size
         self._max_file_size: int = max_file_size
@@ -332,47 +433,49 @@ class SizeFocusedDataset(GenFunction):
         num_noise_files = int((num_files / 100.) * self._perc_noise)
         num_normal_files = num_files - num_noise_files
 
-        self._files = {
-            **gen_random_files(
+        self._files: FileCatalog = FileCatalog.concat([
+            gen_random_files(
                 num_normal_files, min_file_size, max_file_size,
                 size_generator_function,
+                rng=self._rng,
             ),
-            **gen_random_files(
+            gen_random_files(
                 num_noise_files, noise_min_file_size, noise_max_file_size,
                 size_generator_function,
-                start_from=num_normal_files
+                start_from=num_normal_files,
+                rng=self._rng,
             )
-        }
+        ])
 
     def __repr__(self):
         return "Size Focused Dataset"
 
-    def gen_day_elements(self, max_num: int = -1) -> Generator:
-        """Generates all the day's entries.
+    def get_state(self) -> Dict[str, 'np.ndarray']:
+        return self._files.to_dict()
+
+    def set_state(self, state: Dict[str, 'np.ndarray']):
+        self._files = FileCatalog.from_dict(state)
+        return self
+
+    def gen_day_columns(self, max_num: int = -1) -> Dict[str, 'np.ndarray']:
+        """Generates all the day's entries as columns.
 
         :param max_num: maximum number of requests, defaults to -1
         :type max_num: int, optional
-        :yield: the percentage of work done
-        :rtype: Generator[int, None, None]
+        :return: the day's columns
+        :rtype: Dict[str, np.ndarray]
         """
-        all_requests = []
         file_perc_x_day = self._perc_files_x_day / 100.
-
-        filenames = list(self._files.keys())
         num_visible_files = int(len(self._files) * file_perc_x_day)
 
-        random.shuffle(filenames)
-        filenames = filenames[:num_visible_files]
-
-        while len(all_requests) < max_num:
-            random.shuffle(filenames)
-            for cur_file in filenames:
-                all_requests.append({
-                    'Filename': cur_file,
-                    **self._files[cur_file].copy(),
-                })
-                if len(all_requests) == max_num:
-                    break
-
-        for num, elm in enumerate(all_requests):
-            yield elm, float(num / len(all_requests)) * 100.
+        files = self._rng.permutation(len(self._files))[:num_visible_files]
+        if len(files) == 0 or max_num <= 0:
+            return self._files.take(files[:0])
+
+        # Each pass requests all the files in a new random order
+        num_passes = -(-max_num // len(files))
+        requests = self._rng.permuted(
+            np.tile(files, (num_passes, 1)), axis=1
+        ).ravel()[:max_num]
+
+        return self._files.take(requests)
@@ -1,18 +1,34 @@
 import datetime
 import importlib
-import random
-import shutil
+import os
+import threading
 import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path, PurePath
-from typing import List, Tuple, Generator
+from typing import Callable, Dict, List, Tuple, Generator
 
 import numpy as np
 import pandas as pd
 
-from . import functions
-from .utils import COLUMNS, gen_fake_cpu_work
+from . import functions, profiler
+from .cache import dataset_key
+from .stats import DatasetStats, DayStats
+from .manifest import Manifest, config_hash
+from .progress import ProgressInfo, ProgressReporter
+from .shard import shard_days
+from .formats import (OutputFormat, dataset_file_date, dataset_files,
+                      format_of, get_format)
+from .trace import TRACE_COLUMNS, write_trace
+from .view import DatasetView
+from .writer import DayWriter
+from .utils import COLUMNS, gen_fake_cpu_work_batch
 
 _DEFAULT_SEED = 42
+# Job columns generated by gen_fake_cpu_work_batch, in the same order
+_CPU_WORK_COLUMNS = ('NumCPU', 'WrapWC', 'WrapCPU', 'CPUTime', 'IOTime')
+# Generator function and settings of the current worker process
+_WORKER_STATE = {}
 
 
 def _make_empty_df() -> 'pd.DataFrame':
@@ -29,34 +45,232 @@ def _make_empty_df() -> 'pd.DataFrame':
     return df
 
 
+def _function_rng(seed: int) -> 'np.random.Generator':
+    """Returns the random generator of a function's file catalog.
+
+    It is owned by the function, so the catalog does not depend on the
+    global random state or on other generators running in other threads.
+
+    :param seed: the generator seed
+    :type seed: int
+    :return: the catalog random generator
+    :rtype: np.random.Generator
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed))
+
+
+def _day_rng(seed: int, day_idx: int) -> 'np.random.Generator':
+    """Returns the random generator of a specific day.
+
+    The stream is derived from (seed, day_idx) as the day_idx-th child
+    of `np.random.SeedSequence(seed).spawn`, so it does not depend on the
+    order or on the process in which the days are generated.
+
+    :param seed: the generator seed
+    :type seed: int
+    :param day_idx: index of the day
+    :type day_idx: int
+    :return: the day's random generator
+    :rtype: np.random.Generator
+    """
+    return np.random.default_rng(
+        np.random.SeedSequence(seed, spawn_key=(day_idx,))
+    )
+
+
+def _gen_day(gen_obj: 'functions.GenFunction', day_idx: int,
+             date: 'datetime.date', seed: int, num_req_x_day: int,
+             cpu_work: dict) -> 'Day':
+    """Generates a single day with the given generator function.
+
+    :param gen_obj: the generator function
+    :type gen_obj: functions.GenFunction
+    :param day_idx: index of the day
+    :type day_idx: int
+    :param date: date of the day
+    :type date: datetime.date
+    :param seed: the generator seed
+    :type seed: int
+    :param num_req_x_day: number of requests per day
+    :type num_req_x_day: int
+    :param cpu_work: arguments of `gen_fake_cpu_work_batch`
+    :type cpu_work: dict
+    :return: the new day
+    :rtype: Day
+    """
+    rng = _day_rng(seed, day_idx)
+    gen_obj.day_idx = day_idx
+    gen_obj.rng = rng
+
+    cur_day = Day(date, rng=rng)
+    with profiler.stage('generate') as stage:
+        columns = gen_obj.gen_day_columns(num_req_x_day)
+        stage.rows = len(columns['Filename'])
+    cur_day.bulk_append_columns(columns, rng=rng, cpu_work=cpu_work)
+    # Compute the day aggregates where the day is generated
+    cur_day.stats
+    return cur_day.reset_index()
+
+
+def _init_worker(gen_obj: 'functions.GenFunction', seed: int,
+                 num_req_x_day: int, cpu_work: dict,
+                 profile_memory: bool = None):
+    """Stores the generator function in a worker process.
+
+    :param gen_obj: the generator function
+    :type gen_obj: functions.GenFunction
+    :param seed: the generator seed
+    :type seed: int
+    :param num_req_x_day: number of requests per day
+    :type num_req_x_day: int
+    :param cpu_work: arguments of `gen_fake_cpu_work_batch`
+    :type cpu_work: dict
+    :param profile_memory: enable the profiler (tracing also the memory
+        if True), defaults to None (disabled)
+    :type profile_memory: bool, optional
+    """
+    if profile_memory is not None:
+        profiler.Profiler(profile_memory).start()
+    _WORKER_STATE['gen_obj'] = gen_obj
+    _WORKER_STATE['seed'] = seed
+    _WORKER_STATE['num_req_x_day'] = num_req_x_day
+    _WORKER_STATE['cpu_work'] = cpu_work
+
+
+def _worker_gen_day(day_idx: int,
+                    date: 'datetime.date') -> Tuple['Day', List[dict]]:
+    """Generates a single day in a worker process.
+
+    :param day_idx: index of the day
+    :type day_idx: int
+    :param date: date of the day
+    :type date: datetime.date
+    :return: the new day and the profiler records of the worker
+    :rtype: Tuple[Day, List[dict]]
+    """
+    cur_day = _gen_day(
+        _WORKER_STATE['gen_obj'], day_idx, date,
+        _WORKER_STATE['seed'], _WORKER_STATE['num_req_x_day'],
+        _WORKER_STATE['cpu_work'],
+    )
+    cur_profiler = profiler.current()
+    return cur_day, cur_profiler.drain() if cur_profiler is not None else []
+
+
 class Day(object):
 
-    def __init__(self, date: 'datetime.date', df: 'pd.DataFrame' = None):
+    """A dataset day.
+
+    The appended rows are collected as typed column chunks and the
+    dataframe is built only once, when `df` is accessed.
+    """
+
+    def __init__(self, date: 'datetime.date', df: 'pd.DataFrame' = None,
+                 rng: 'np.random.Generator' = None):
         """Initialize current day basic information.
 
         :param date: The current date of the Day object
         :type date: datetime.date
+        :param df: the day's dataframe, defaults to None (empty)
+        :type df: pd.DataFrame, optional
+        :param rng: random generator of the day's fake cpu work, defaults
+            to None (derived from the default seed and the date)
+        :type rng: np.random.Generator, optional
         """
         self._date = date
-        if df is not None:
-            self._df = df
-        else:
-            self._df = _make_empty_df()
+        self._df = df
+        self._chunks = []
+        self._stats = None
+        self._rng = rng
 
     def __repr__(self):
-        return f"{self._date}=>{self._df.to_string()}"
+        return f"{self._date}=>{self.df.to_string()}"
+
+    def __len__(self):
+        num_rows = len(self._df) if self._df is not None else 0
+        return num_rows + sum(
+            len(chunk['Filename']) for chunk in self._chunks
+        )
 
     @property
-    def df(self):
+    def df(self) -> 'pd.DataFrame':
+        """Returns the day's dataframe, building it from the pending chunks.
+
+        :return: the day's dataframe
+        :rtype: pd.DataFrame
+        """
+        if self._chunks:
+            with profiler.stage('dataframe') as stage:
+                new_df = pd.DataFrame(data={
+                    column: np.concatenate(
+                        [chunk[column] for chunk in self._chunks]
+                    )
+                    for column in COLUMNS
+                })
+                stage.rows = len(new_df)
+            self._chunks = []
+            if self._df is None or len(self._df) == 0:
+                self._df = new_df
+            else:
+                self._df = pd.concat([self._df, new_df], ignore_index=True)
+        elif self._df is None:
+            self._df = _make_empty_df()
         return self._df
 
+    @property
+    def date(self) -> 'datetime.date':
+        return self._date
+
+    @property
+    def rng(self) -> 'np.random.Generator':
+        """Returns the random generator of the day's fake cpu work.
+
+        Without an explicit generator, the stream is derived from the
+        default seed and the date, so the same appended rows get always
+        the same cpu work.
+
+        :return: the day's random generator
+        :rtype: np.random.Generator
+        """
+        if self._rng is None:
+            self._rng = _day_rng(_DEFAULT_SEED, self._date.toordinal())
+        return self._rng
+
+    @property
+    def stats(self) -> 'DayStats':
+        """Returns the partial aggregates of the day.
+
+        :return: the day aggregates or None if the day was loaded without
+            the Filename or Size columns
+        :rtype: DayStats
+        """
+        if self._stats is None:
+            if self._df is not None and not {'Filename', 'Size'} <= set(
+                    self._df.columns):
+                return None
+            if self._chunks and self._df is None:
+                filenames = np.concatenate(
+                    [chunk['Filename'] for chunk in self._chunks])
+                sizes = np.concatenate(
+                    [chunk['Size'] for chunk in self._chunks])
+            else:
+                filenames = self.df['Filename'].to_numpy()
+                sizes = self.df['Size'].to_numpy()
+            self._stats = DayStats.from_columns(
+                int(time.mktime(self._date.timetuple())), filenames, sizes
+            )
+        return self._stats
+
     def reset_index(self):
         """Reset the dataframe index inplace.
 
+        The dataframe built from the pending chunks has already a new index.
+
         :return: self
         :rtype: Day
         """
-        self._df.reset_index(drop=True, inplace=True)
+        if self._df is not None and not self._chunks:
+            self._df.reset_index(drop=True, inplace=True)
         return self
 
     def bulk_append(self, rows: List[dict]):
@@ -70,7 +284,7 @@ class Day(object):
             - FileType = 0
 
         Also, if there is no information about the job this function generates
-        a random fake information on cpu work using `gen_fake_cpu_work`:
+        a random fake information on cpu work using `gen_fake_cpu_work_batch`:
             - NumCPU
             - WrapWC
             - WrapCPU
@@ -82,37 +296,63 @@ class Day(object):
         :return: self
         :rtype: Day
         """
-        cur_req_time = int(time.mktime(self._date.timetuple()))
-        for row in rows:
-            row['reqDay'] = cur_req_time
-            row['JobSuccess'] = True
-            row['SiteName'] = 0
-            row['DataType'] = 0
-            row['FileType'] = 0
-            for key in row:
-                if key not in [
-                    'NumCPU',
-                    'WrapWC',
-                    'WrapCPU',
-                    'CPUTime',
-                    'IOTime',
-                ]:
-                    num_cpus, wall_time, cpu_time, single_cpu_time, io_time = gen_fake_cpu_work()
-                    row['NumCPU'] = num_cpus
-                    row['WrapWC'] = wall_time
-                    row['WrapCPU'] = cpu_time
-                    row['CPUTime'] = single_cpu_time
-                    row['IOTime'] = io_time
-                    break
-
-        keys = list(rows[0].keys())
-        new_df = pd.DataFrame(data={
-            key: [elm[key] for elm in rows]
-            for key in keys
+        return self.bulk_append_columns({
+            key: np.array([row[key] for row in rows])
+            for key in rows[0]
         })
-        new_df.Size *= 1024**2
 
-        self._df = self._df.append(new_df, ignore_index=True)
+    def bulk_append_columns(self, columns: Dict[str, 'np.ndarray'],
+                            rng: 'np.random.Generator' = None,
+                            cpu_work: dict = None):
+        """Insert a whole batch of requests given as columns.
+
+        The new rows are stored as a chunk of typed arrays, without
+        creating a dict for each request, and they are added to the
+        dataframe on the first access to `df`. It sets the same default
+        values of `bulk_append` and, if the job columns are missing, it
+        generates the fake cpu work using `gen_fake_cpu_work_batch`. All the
+        other columns in COLUMNS that are not given are filled with 0.
+
+        :param columns: the columns of the new rows (Filename, Size, ...)
+        :type columns: Dict[str, np.ndarray]
+        :param rng: random generator for the cpu work, defaults to None
+            (the day's generator, see `rng`)
+        :type rng: np.random.Generator, optional
+        :param cpu_work: arguments of `gen_fake_cpu_work_batch`, defaults to None
+        :type cpu_work: dict, optional
+        :return: self
+        :rtype: Day
+        """
+        num_rows = len(columns['Filename'])
+        data = dict(columns)
+
+        data['reqDay'] = np.full(
+            num_rows, int(time.mktime(self._date.timetuple()))
+        )
+        data['JobSuccess'] = np.full(num_rows, True)
+        data['SiteName'] = np.zeros(num_rows)
+        data['DataType'] = np.zeros(num_rows)
+        data['FileType'] = np.zeros(num_rows)
+        data['Size'] = np.asarray(data['Size'], dtype=np.float64) * 1024**2
+
+        if not all(key in data for key in _CPU_WORK_COLUMNS):
+            with profiler.stage('cpu_work', num_rows):
+                data.update(zip(
+                    _CPU_WORK_COLUMNS,
+                    gen_fake_cpu_work_batch(
+                        num_rows, rng=rng if rng is not None else self.rng,
+                        **(cpu_work or {})
+                    )
+                ))
+
+        self._stats = None
+        self._chunks.append({
+            column: (
+                np.asarray(data[column], dtype=type_)
+                if column in data else np.zeros(num_rows, dtype=type_)
+            )
+            for column, type_ in COLUMNS.items()
+        })
         return self
 
     def append(self, row: dict):
@@ -126,7 +366,7 @@ class Day(object):
             - FileType = 0
 
         If there is no information about the job this function generates
-        a random fake information on cpu work using `gen_fake_cpu_work`:
+        a random fake information on cpu work using `gen_fake_cpu_work_batch`:
             - NumCPU
             - WrapWC
             - WrapCPU
@@ -138,48 +378,52 @@ class Day(object):
         :return: self
         :rtype: Day
         """
-        row['reqDay'] = int(time.mktime(self._date.timetuple()))
-        row['JobSuccess'] = True
-        row['SiteName'] = 0
-        row['DataType'] = 0
-        row['FileType'] = 0
-        row['Size'] = row['Size'] * 1024**2  # Convert to bytes
-
-        for key in row:
-            if key not in [
-                'NumCPU',
-                'WrapWC',
-                'WrapCPU',
-                'CPUTime',
-                'IOTime',
-            ]:
-                num_cpus, wall_time, cpu_time, single_cpu_time, io_time = gen_fake_cpu_work()
-                row['NumCPU'] = num_cpus
-                row['WrapWC'] = wall_time
-                row['WrapCPU'] = cpu_time
-                row['CPUTime'] = single_cpu_time
-                row['IOTime'] = io_time
-                break
-
-        self._df = self._df.append(
-            pd.Series(
-                [row[key] if key in row else None for key in COLUMNS],
-                index=COLUMNS.keys()
-            ),
-            ignore_index=True
+        return self.bulk_append([row])
+
+    def file_path(self, dest_folder: 'PurePath' = Path("."),
+                  output_format: 'OutputFormat' = None) -> 'Path':
+        """Returns the path of the day's file.
+
+        :param dest_folder: the destination directory, defaults to Path(".")
+        :type dest_folder: PurePath, optional
+        :param output_format: the file format, defaults to None (zipped csv)
+        :type output_format: OutputFormat, optional
+        :return: the file path
+        :rtype: Path
+        """
+        if output_format is None:
+            output_format = get_format()
+        return Path(dest_folder).joinpath(
+            f"dataset_{self._date}.{output_format.extension}"
         )
-        return self
 
-    def save(self, dest_folder: 'PurePath' = Path(".")):
-        """Export the current day dataframe in a zipped csv format.
+    def save(self, dest_folder: 'PurePath' = Path("."),
+             output_format: 'OutputFormat' = None):
+        """Export the current day dataframe.
+
+        The file is written atomically: the data goes into a temporary
+        file in the same folder that is then renamed.
 
         :param dest_folder: the destination directory, defaults to Path(".")
         :type dest_folder: PurePath, optional
+        :param output_format: the file format, defaults to None (zipped csv)
+        :type output_format: OutputFormat, optional
         :return: self
         :rtype: Day
         """
-        file_path = dest_folder.joinpath(f"dataset_{self._date}.csv.gz")
-        self._df.to_csv(file_path, index=False)
+        if output_format is None:
+            output_format = get_format()
+        file_path = self.file_path(dest_folder, output_format)
+        tmp_path = file_path.with_name(
+            f".{file_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        try:
+            output_format.write(self.df, tmp_path)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if tmp_path.exists():
+                tmp_path.unlink()
+            raise
         return self
 
 
@@ -197,7 +441,11 @@ class Generator(object):
                  ):
         """Initialize the generator.
 
-        :param config: A dictionary with the configuration to use, defaults to {}
+        :param config: A dictionary with the configuration to use, defaults to {}.
+            The optional "cpu_work" key contains the arguments passed to
+            `gen_fake_cpu_work_batch` (e.g. num_cpus and num_cpus_prob),
+            while "output_format" and "compression" select the file format
+            of the saved days (see `formats.FORMATS`)
         :type config: dict, optional
         :param num_days: number of days to generate, defaults to -1
         :type num_days: int, optional
@@ -212,7 +460,13 @@ class Generator(object):
         """
         self._start_date = start_date
         self._days = []
+        self._day_stats = []
+        self._stats = None
+        self._version = 0
         self._seed = seed
+        self._cpu_work = {}
+        self._output_format = "csv"
+        self._compression = None
 
         for key, val in config.items():
             setattr(self, f"_{key}", val)
@@ -223,7 +477,6 @@ class Generator(object):
             self._num_req_x_day = num_req_x_day
 
         self._dest_folder = dest_folder
-        self.__update_seeds()
 
     @property
     def seed(self):
@@ -238,78 +491,123 @@ class Generator(object):
         """
         assert isinstance(value, int), "ERROR: value in not an integer"
         self._seed = value
-        self.__update_seeds()
-
-    def __update_seeds(self):
-        """Initialize the random generator seeds.
-
-        Internal Python random generator seed and NumPy random seed.
-        """
-        random.seed(self._seed)
-        np.random.seed(self._seed)
 
     @property
     def df(self) -> 'pd.DataFrame':
         """Returns a new dataframes that contains all the days' dataframes.
 
+        It creates a full copy of the dataset, use `view` to access the
+        days lazily.
+
         :return: the concatenated dataframe
         :rtype: pd.DataFrame
         """
         if not self._days:
             return None
 
-        all_df = pd.concat([day.df for day in self._days])
-        all_df['Date'] = pd.to_datetime(all_df.reqDay, unit='s')
-        return all_df
+        return self.view().to_df()
+
+    def view(self, columns: List[str] = None,
+             start_date: 'datetime.date' = None,
+             end_date: 'datetime.date' = None) -> 'DatasetView':
+        """Returns a lazy view over the days in memory.
+
+        Use `DatasetView.from_folder` for a dataset on disk.
+
+        :param columns: the columns to read, defaults to None (all)
+        :type columns: List[str], optional
+        :param start_date: first day of the view, defaults to None
+        :type start_date: datetime.date, optional
+        :param end_date: last day of the view (included), defaults to None
+        :type end_date: datetime.date, optional
+        :return: the dataset view
+        :rtype: DatasetView
+        """
+        return DatasetView.from_days(
+            self._days, columns=columns,
+            start_date=start_date, end_date=end_date,
+        )
 
     @property
     def df_stats(self) -> Tuple['pd.DataFrame']:
         """Returns the concat days' dataframes and some useful stats
 
+        Deprecated: use `stats`, that does not concatenate the days. The
+        concatenated dataframe is a new copy at each call.
+
         :return: a tuple with several DataFrames
         :rtype: Tuple[pd.DataFrame]
         """
-        if not self._days:
+        warnings.warn(
+            "Generator.df_stats is deprecated, use Generator.stats "
+            "(and Generator.view for the requests)",
+            DeprecationWarning, stacklevel=2,
+        )
+        if not self._day_stats:
             return (None, None, None, None, None, None)
 
-        df = self.df
+        return (self.df, *self.stats.to_tuple())
 
-        file_frequencies = df.Filename.value_counts().reset_index()
-        file_frequencies.rename(
-            columns={'Filename': "# requests", 'index': "Filename"},
-            inplace=True
-        )
+    @property
+    def stats(self) -> 'DatasetStats':
+        """Returns the dataset statistics.
 
-        all_day_file_size = {'day': [], 'Size': []}
-        for idx, group in df.groupby('reqDay')[['Filename', 'Size']]:
-            all_day_file_size['day'].append(pd.to_datetime(idx, unit="s"))
-            all_day_file_size['Size'].append(
-                group.drop_duplicates('Filename').Size.sum() / 1024**2
-            )
-        all_day_file_size = pd.DataFrame(data=all_day_file_size)
-
-        num_files = df.groupby('reqDay').Filename.nunique()
-        num_files = num_files.reset_index()
-        num_files['day'] = pd.to_datetime(num_files.reqDay, unit="s")
-        num_files.rename(
-            columns={'Filename': "numFiles"},
-            inplace=True
-        )
+        They are merged from the days' partial aggregates, computed when
+        the days are generated or loaded, and cached until the dataset
+        changes. They are available also after a `stream` generation.
 
-        num_req = df.groupby('reqDay').size()
-        num_req = num_req.reset_index()
-        num_req.rename(
-            columns={0: 'numReq'},
-            inplace=True
-        )
-        num_req['day'] = pd.to_datetime(num_req.reqDay, unit="s")
+        :return: the merged statistics or None if there are no days
+        :rtype: DatasetStats
+        """
+        if not self._day_stats:
+            return None
+        if self._stats is None:
+            self._stats = DatasetStats(self._day_stats)
+        return self._stats
+
+    def _add_day(self, day: 'Day', keep: bool = True):
+        """Adds a day to the dataset and its aggregates to the stats.
 
-        file_sizes = df[['Filename', 'Size']].copy()
-        file_sizes.drop_duplicates("Filename", inplace=True)
-        file_sizes.Size /= 1024**2
+        :param day: the new day
+        :type day: Day
+        :param keep: keep the day in memory, defaults to True
+        :type keep: bool, optional
+        """
+        if keep:
+            self._days.append(day)
+        if day.stats is not None:
+            self._day_stats.append(day.stats)
+        self._changed()
+
+    def _changed(self):
+        """Drops the cached stats and bumps the dataset version."""
+        self._stats = None
+        self._version += 1
+
+    def reset_stats(self):
+        """Drops the cached statistics.
 
-        return (df, file_frequencies, all_day_file_size,
-                file_sizes, num_files, num_req)
+        The next `stats` merges again the days' aggregates, the days and
+        the dataset version do not change.
+
+        :return: self
+        :rtype: Generator
+        """
+        self._stats = None
+        return self
+
+    @property
+    def version(self) -> int:
+        """Returns the dataset version.
+
+        It changes every time the days change (`prepare`, `clean`,
+        `open_data` and `stream`), so it can be used as a key to cache
+        the results computed from the dataset.
+
+        :return: the dataset version
+        :rtype: int
+        """
+        return self._version
 
     @property
     def days(self) -> List['pd.DataFrame']:
@@ -354,6 +652,35 @@ class Generator(object):
             value, int), "ERROR: num days needs an integer value"
         self._num_days = value
 
+    @property
+    def output_format(self) -> 'OutputFormat':
+        return get_format(self._output_format, self._compression)
+
+    @output_format.setter
+    def output_format(self, value: str):
+        """Set the file format of the saved days.
+
+        :param value: name of the format (csv, parquet or feather)
+        :type value: str
+        """
+        get_format(value)
+        self._output_format = value
+        self._compression = None
+
+    @property
+    def compression(self) -> str:
+        return self.output_format.compression
+
+    @compression.setter
+    def compression(self, value: str):
+        """Set the compression of the saved days.
+
+        :param value: compression supported by the current output format
+        :type value: str
+        """
+        get_format(self._output_format, value)
+        self._compression = value
+
     @property
     def dest_folder(self) -> PurePath:
         return self._dest_folder
@@ -373,15 +700,23 @@ class Generator(object):
                 "ERROR: destination folder is not a PurePath object...")
 
     def clean(self):
-        """Delete all day dataframes.
+        """Delete all day dataframes and their stats.
         """
         del self._days[:]
+        del self._day_stats[:]
+        self._changed()
 
     def prepare(self, function_name: str, kwargs: dict,
-                max_buf_len: int = 1024) -> Generator[int, None, None]:
+                max_buf_len: int = 1024,
+                workers: int = 1,
+                progress: Callable[['ProgressInfo'], None] = None
+                ) -> Generator[int, None, None]:
         """Prepare the dataset.
 
-        This method recall the function generators.
+        This method recall the function generators. Each day is generated
+        as a batch of columns through `GenFunction.gen_day_columns`, with a
+        random stream derived from (seed, day index). Hence, the result
+        does not depend on the number of workers.
 
         :param function_name: The function to use during the preparation
         :type function_name: str
@@ -389,96 +724,438 @@ class Generator(object):
         :type kwargs: dict
         :param max_buf_len: size of row buffer, defaults to 1024
         :type max_buf_len: int, optional
-        :yield: status percentage of the preparation
+        :param workers: number of processes used to generate the days,
+            -1 to use all the CPUs, defaults to 1
+        :type workers: int, optional
+        :param progress: called after each day with a `ProgressInfo`,
+            see `progress.Throttle` to limit the updates, defaults to None
+        :type progress: Callable[[ProgressInfo], None], optional
+        :yield: status percentage of the preparation, once per day
         :rtype: int
         """
+        reporter = ProgressReporter(progress, self._num_days, "prepare")
+        cur_gen_obj = self._make_function(function_name, kwargs)
+        for cur_day in self._gen_days(
+            cur_gen_obj, range(self._num_days), workers
+        ):
+            self._add_day(cur_day)
+            yield reporter.update().percent
+
+        yield 100
+
+    def _make_function(self, function_name: str,
+                       kwargs: dict) -> 'functions.GenFunction':
+        """Creates the generator function object.
+
+        The function file catalog is drawn from its own random generator,
+        derived from the seed, so it is always the same for the same seed.
+
+        :param function_name: The function to use during the preparation
+        :type function_name: str
+        :param kwargs: arguments of generator function
+        :type kwargs: dict
+        :return: the generator function
+        :rtype: functions.GenFunction
+        """
         if function_name not in dir(functions):
             importlib.reload(functions)
 
-        cur_gen_obj = getattr(functions, function_name)(**kwargs)
+        with profiler.stage('function_init'):
+            cur_gen_obj = getattr(functions, function_name)(
+                **kwargs, rng=_function_rng(self._seed))
         cur_gen_obj.num_req_x_day = self._num_req_x_day
+        return cur_gen_obj
 
-        delta = datetime.timedelta(days=1)
-        cur_date = self._start_date
-
-        buffer = []
+    def _run_config(self, function_name: str, kwargs: dict) -> dict:
+        """Returns the settings that determine the generated days.
 
-        for n_day in range(self._num_days):
-            cur_day = Day(cur_date)
-            cur_gen_obj.day_idx = n_day
-
-            for n_req, (elm, percentage) in enumerate(
-                cur_gen_obj.gen_day_elements(self._num_req_x_day)
-            ):
-                # Old method with low performaces
-                # cur_day.append(elm)
-
-                buffer.append(elm)
-
-                if len(buffer) == 100:
-                    cur_day.bulk_append(buffer)
-                    del buffer[:]
-                    buffer = []
-
-                if percentage is None:
-                    yield int(
-                        float(
-                            (n_day * self._num_req_x_day + n_req) /
-                            self.tot_num_requests
-                        ) * 100.)
-                else:
-                    yield int(
-                        (percentage + (n_day * 100.)) /
-                        (self._num_days * 100.) * 100.
-                    )
-            else:
-                if len(buffer) != 0:
-                    cur_day.bulk_append(buffer)
+        The number of days is not included, so a dataset can be extended.
 
-            cur_day.reset_index()
+        :param function_name: The function to use during the generation
+        :type function_name: str
+        :param kwargs: arguments of generator function
+        :type kwargs: dict
+        :return: the resolved configuration
+        :rtype: dict
+        """
+        return {
+            'function': function_name,
+            'kwargs': kwargs,
+            'seed': self._seed,
+            'num_req_x_day': self._num_req_x_day,
+            'start_date': str(self._start_date),
+            'cpu_work': self._cpu_work,
+            'output_format': self.output_format.name,
+            'compression': self.compression,
+        }
+
+    def dataset_key(self, function_name: str, kwargs: dict) -> str:
+        """Returns the key of the dataset in a `cache.DatasetCache`.
+
+        It depends on the configuration, the seed, the number of days and
+        the source code of the generator functions.
+
+        :param function_name: The function to use during the generation
+        :type function_name: str
+        :param kwargs: arguments of generator function
+        :type kwargs: dict
+        :return: the dataset key
+        :rtype: str
+        """
+        return dataset_key({
+            **self._run_config(function_name, kwargs),
+            'num_days': self._num_days,
+        })
 
-            self._days.append(
-                cur_day
-            )
-            cur_date = cur_date + delta
+    def _gen_days(self, gen_obj: 'functions.GenFunction',
+                  day_idxs: List[int],
+                  workers: int = 1,
+                  window: int = -1) -> Generator['Day', None, None]:
+        """Generates the given dataset days in order.
+
+        :param gen_obj: the generator function
+        :type gen_obj: functions.GenFunction
+        :param day_idxs: the indexes of the days to generate
+        :type day_idxs: List[int]
+        :param workers: number of processes used to generate the days,
+            -1 to use all the CPUs, defaults to 1
+        :type workers: int, optional
+        :param window: maximum number of days in flight when using more
+            workers, -1 means 2 days per worker, defaults to -1
+        :type window: int, optional
+        :yield: the generated days
+        :rtype: Day
+        """
+        dates = [
+            (n_day, self._start_date + datetime.timedelta(days=n_day))
+            for n_day in day_idxs
+        ]
 
-        yield 100
+        if workers == -1:
+            workers = os.cpu_count()
+
+        if workers <= 1:
+            for n_day, cur_date in dates:
+                yield _gen_day(
+                    gen_obj, n_day, cur_date, self._seed,
+                    self._num_req_x_day, self._cpu_work,
+                )
+            return
+
+        cur_profiler = profiler.current()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(gen_obj, self._seed,
+                      self._num_req_x_day, self._cpu_work,
+                      cur_profiler.memory if cur_profiler else None),
+        ) as executor:
+            # Keep a bounded number of days in flight
+            max_pending = window if window > 0 else 2 * workers
+            pending = []
+            for n_day, cur_date in dates:
+                pending.append(
+                    executor.submit(_worker_gen_day, n_day, cur_date)
+                )
+                if len(pending) >= max_pending:
+                    yield self._worker_result(pending.pop(0))
+            for future in pending:
+                yield self._worker_result(future)
+
+    @staticmethod
+    def _worker_result(future) -> 'Day':
+        """Returns the day generated by a worker process.
+
+        The profiler records of the worker are added to the active profiler.
+
+        :param future: the worker task
+        :type future: concurrent.futures.Future
+        :return: the generated day
+        :rtype: Day
+        """
+        cur_day, records = future.result()
+        if records and profiler.current() is not None:
+            profiler.current().extend(records)
+        return cur_day
 
-    def _open_dataset_file(self, filename: 'str') -> 'Day':
+    def _open_dataset_file(self, filename: 'str',
+                           columns: List[str] = None) -> 'Day':
         """Open a single dataset day.
 
+        :param filename: the day file
+        :type filename: str
+        :param columns: the columns to read, defaults to None (all)
+        :type columns: List[str], optional
         :return: the current day data
         :rtype: Day
         """
-        cur_date = [
-            int(elm)
-            for elm in filename.as_posix().rsplit(
-                "_", 1)[1].split(
-                    ".", 1)[0].split(
-                        "-")
-        ]
-        cur_date = datetime.date(*cur_date)
-        df = pd.read_csv(Path(filename))
-        return Day(cur_date, df)
-
-    def open_data(self, folder: str):
+        filename = Path(filename)
+        df = format_of(filename).read(filename, columns=columns)
+        cur_day = Day(dataset_file_date(filename), df)
+        # Compute the day aggregates in the loader thread
+        cur_day.stats
+        return cur_day
+
+    def open_data(self, folder: str,
+                  start_date: 'datetime.date' = None,
+                  end_date: 'datetime.date' = None,
+                  columns: List[str] = None,
+                  workers: int = -1):
         """Open dataset from a folder.
 
+        The days are loaded concurrently in a thread pool, with the column
+        types in COLUMNS, and they are sorted by date. Only the files in
+        the date range and the selected columns are read.
+
         :param folder: the dataset folder
         :type folder: str
+        :param start_date: first day to load, defaults to None
+        :type start_date: datetime.date, optional
+        :param end_date: last day to load (included), defaults to None
+        :type end_date: datetime.date, optional
+        :param columns: the columns to read, defaults to None (all)
+        :type columns: List[str], optional
+        :param workers: number of loader threads, -1 to use as many
+            threads as the CPUs, defaults to -1
+        :type workers: int, optional
         """
-        del self._days[:]
-        self._days = []
-        for file_ in Path(folder).resolve().glob("*.csv*"):
-            self._days.append(
-                self._open_dataset_file(file_)
+        self.clean()
+        files = [
+            file_ for date, file_ in dataset_files(folder)
+            if (start_date is None or date >= start_date) and
+            (end_date is None or date <= end_date)
+        ]
+        if workers == -1:
+            workers = os.cpu_count()
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            for cur_day in executor.map(
+                lambda file_: self._open_dataset_file(file_, columns),
+                files
+            ):
+                self._add_day(cur_day)
+
+    def export_trace(self, file_path: 'PurePath',
+                     columns: Tuple[str] = TRACE_COLUMNS) -> 'Path':
+        """Exports all days' requests as a binary trace.
+
+        See `trace.open_trace` to read the trace as a memory-mapped array.
+
+        :param file_path: the trace file path
+        :type file_path: PurePath
+        :param columns: the record columns, defaults to TRACE_COLUMNS
+        :type columns: Tuple[str], optional
+        :return: the trace header path
+        :rtype: Path
+        """
+        return write_trace(
+            ((day.date, day.df) for day in self._days),
+            file_path, columns
+        )
+
+    def stream(self, function_name: str, kwargs: dict, workers: int = 1,
+               window: int = -1, write_workers: int = -1,
+               resume: bool = False,
+               progress: Callable[['ProgressInfo'], None] = None,
+               shard: Tuple[int, int] = None
+               ) -> Generator[int, None, None]:
+        """Generates the dataset and saves each day as soon as it is ready.
+
+        The days are not kept in memory, so the memory used is bounded by
+        the days in flight (one day being generated and one being written
+        with a single worker, otherwise the window size) and not by the
+        number of days of the dataset.
+
+        A manifest (see `manifest.Manifest`) is updated after each written
+        day with the day's checksum. With `resume`, the days of a previous
+        run with the same configuration whose file is still valid are
+        skipped, and only the missing ones are generated: since each day
+        has its own random stream, the result is the same of a single run.
+
+        With `shard`, only the days of the shard are generated (see
+        `shard.shard_days`) and recorded in the manifest, so the shards
+        can be generated on different machines and joined with
+        `shard.merge_shards`.
+
+        :param function_name: The function to use during the generation
+        :type function_name: str
+        :param kwargs: arguments of generator function
+        :type kwargs: dict
+        :param workers: number of processes used to generate the days,
+            -1 to use all the CPUs, defaults to 1
+        :type workers: int, optional
+        :param window: maximum number of days in flight when using more
+            workers, -1 means 2 days per worker, defaults to -1
+        :type window: int, optional
+        :param write_workers: number of writer threads, defaults to -1
+            (as many as the CPUs)
+        :type write_workers: int, optional
+        :param resume: continue a previous interrupted generation in the
+            destination folder, defaults to False
+        :type resume: bool, optional
+        :param progress: called after each saved day with a `ProgressInfo`,
+            defaults to None
+        :type progress: Callable[[ProgressInfo], None], optional
+        :param shard: shard index (from 1) and number of shards, defaults
+            to None (all the days)
+        :type shard: Tuple[int, int], optional
+        :raises Exception: the folder contains a dataset generated with a
+            different configuration or a different shard
+        :yield: status percentage of the generation
+        :rtype: int
+        """
+        self._make_dest_folder()
+        self.clean()
+
+        config = self._run_config(function_name, kwargs)
+        manifest = Manifest.load(self._dest_folder) if resume else None
+        if manifest is not None and manifest.config_hash != config_hash(
+                config):
+            raise Exception(
+                "ERROR: the dataset folder was generated with a different "
+                "configuration...")
+        if manifest is not None and manifest.shard != (
+                tuple(shard) if shard is not None else None):
+            raise Exception(
+                "ERROR: the dataset folder contains a different shard...")
+        if manifest is None:
+            manifest = Manifest(config, self._num_days)
+        manifest.num_days = self._num_days
+        manifest.shard = shard
+        day_range = range(self._num_days) if shard is None else shard_days(
+            self._num_days, *shard)
+
+        cur_gen_obj = self._make_function(function_name, kwargs)
+        state = manifest.load_state(self._dest_folder)
+        if state is not None:
+            cur_gen_obj.set_state(state)
+        else:
+            manifest.save_state(self._dest_folder, cur_gen_obj.get_state())
+
+        done = {
+            day_idx: file_
+            for day_idx, file_ in manifest.valid_days(self._dest_folder).items()
+            if day_idx in day_range
+        }
+        manifest.retain(set(done)).save(self._dest_folder)
+        for file_ in done.values():
+            self._add_day(
+                self._open_dataset_file(file_, ['Filename', 'Size']),
+                keep=False
             )
 
-    def save(self):
-        """Exports all days' DataFrames in dest_folder."""
-        if self._dest_folder.exists():
-            shutil.rmtree(self._dest_folder)
-        Path.mkdir(self._dest_folder, parents=True)
-        for idx, day in enumerate(self._days, 1):
-            day.save(self._dest_folder)
-            yield int(float(idx / len(self._days) * 100.))
+        day_idxs = [n_day for n_day in day_range if n_day not in done]
+        reporter = ProgressReporter(progress, len(day_range), "stream")
+        if done:
+            reporter.update(len(done))
+        day_info = {}
+        with DayWriter(self._dest_folder, self.output_format,
+                       write_workers,
+                       window if window > 0 else max(workers, 1),
+                       checksum=True) as writer:
+            for cur_day in self._gen_days(
+                cur_gen_obj, day_idxs, workers, window
+            ):
+                self._add_day(cur_day, keep=False)
+                day_info[cur_day.file_path(
+                    self._dest_folder, self.output_format)] = (
+                    cur_day.date, (cur_day.date - self._start_date).days,
+                    len(cur_day)
+                )
+                written = writer.submit(cur_day)
+                del cur_day
+                self._checkpoint(manifest, writer, written, day_info)
+                if written:
+                    reporter.update(len(written))
+                yield reporter.percent
+            written = writer.close()
+            self._checkpoint(manifest, writer, written, day_info)
+            if written:
+                reporter.update(len(written))
+
+        # Keep the stats in date order also when some days were skipped
+        self._day_stats.sort(key=lambda day_stats: day_stats.req_day)
+        self._remove_stale_days(list(done.values()) + writer.written)
+
+        yield 100
+
+    def _checkpoint(self, manifest: 'Manifest', writer: 'DayWriter',
+                    written: List['Path'], day_info: dict):
+        """Records the written days in the manifest and saves it.
+
+        :param manifest: the dataset manifest
+        :type manifest: Manifest
+        :param writer: the day writer
+        :type writer: DayWriter
+        :param written: the files written since the last checkpoint
+        :type written: List[Path]
+        :param day_info: date, index and number of requests of the
+            submitted days by file
+        :type day_info: dict
+        """
+        if not written:
+            return
+        for file_ in written:
+            date, day_idx, num_requests = day_info.pop(file_)
+            manifest.add_day(date, day_idx, file_,
+                             writer.checksums[file_], num_requests)
+        manifest.save(self._dest_folder)
+
+    def _make_dest_folder(self):
+        """Creates the destination folder if it does not exist."""
+        Path.mkdir(self._dest_folder, parents=True, exist_ok=True)
+
+    def _remove_stale_days(self, written: List['Path']):
+        """Removes the day files that do not belong to the saved dataset.
+
+        It is called after the new days are written, so the folder always
+        contains a complete dataset. The paths are resolved because
+        `dataset_files` returns absolute paths, while the written ones
+        are relative to a relative destination folder.
+
+        :param written: the files of the saved dataset
+        :type written: List[Path]
+        """
+        written = set(Path(file_).resolve() for file_ in written)
+        for _, file_ in dataset_files(self._dest_folder):
+            if file_ not in written:
+                file_.unlink()
+
+    def save(self, workers: int = -1,
+             max_pending: int = -1,
+             progress: Callable[['ProgressInfo'], None] = None
+             ) -> Generator[int, None, None]:
+        """Exports all days' DataFrames in dest_folder.
+
+        The days are serialized and compressed concurrently. The existing
+        files are replaced atomically, and the days of a previous dataset
+        that are not in the current one are removed only at the end.
+
+        :param workers: number of writer threads, -1 to use as many
+            threads as the CPUs, defaults to -1
+        :type workers: int, optional
+        :param max_pending: maximum number of days waiting to be written,
+            -1 means 2 days per thread, defaults to -1
+        :type max_pending: int, optional
+        :param progress: called after each saved day with a `ProgressInfo`,
+            defaults to None
+        :type progress: Callable[[ProgressInfo], None], optional
+        :raises Exception: there are no days in memory, the dataset in the
+            destination folder is left untouched
+        :yield: status percentage of the save, once per day
+        :rtype: int
+        """
+        if not self._days:
+            raise Exception(
+                "ERROR: there are no days to save, prepare or open a dataset first...")
+        self._make_dest_folder()
+        reporter = ProgressReporter(progress, len(self._days), "save")
+        with DayWriter(self._dest_folder, self.output_format,
+                       workers, max_pending) as writer:
+            for day in self._days:
+                for _ in writer.submit(day):
+                    yield reporter.update().percent
+            for _ in writer.close():
+                yield reporter.update().percent
+        if writer.written:
+            self._remove_stale_days(writer.written)
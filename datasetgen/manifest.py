@@ -0,0 +1,280 @@
+import hashlib
+import json
+import os
+from pathlib import Path, PurePath
+from typing import Dict, Tuple
+
+import numpy as np
+
+_MANIFEST_VERSION = 1
+
+# Files stored next to the dataset days
+MANIFEST_NAME = "manifest.json"
+STATE_NAME = "function_state.npz"
+
+
+def file_sha256(file_path: 'PurePath', chunk_size: int = 1024**2) -> str:
+    """Returns the sha256 checksum of a file.
+
+    :param file_path: the file to hash
+    :type file_path: PurePath
+    :param chunk_size: size of the read chunks, defaults to 1024**2
+    :type chunk_size: int, optional
+    :return: the hex digest
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as cur_file:
+        for chunk in iter(lambda: cur_file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def config_hash(config: dict) -> str:
+    """Returns the sha256 checksum of a configuration.
+
+    :param config: the resolved configuration
+    :type config: dict
+    :return: the hex digest
+    :rtype: str
+    """
+    return hashlib.sha256(
+        json.dumps(config, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def state_hash(state: Dict[str, 'np.ndarray']) -> str:
+    """Returns the sha256 checksum of a generator function state.
+
+    :param state: the state arrays
+    :type state: Dict[str, np.ndarray]
+    :return: the hex digest
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    for key in sorted(state):
+        array = np.ascontiguousarray(state[key])
+        digest.update(key.encode())
+        digest.update(array.dtype.str.encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+class Manifest(object):
+
+    """The description of a dataset folder.
+
+    It records the configuration of the generation, the position in the
+    seed stream (the index of the next day to generate), the checksum of
+    the generator function state and the checksum of each written day.
+    """
+
+    def __init__(self, config: dict, num_days: int):
+        """Initialize an empty manifest.
+
+        :param config: the resolved configuration (without num_days)
+        :type config: dict
+        :param num_days: number of days of the dataset
+        :type num_days: int
+        """
+        self._data = {
+            'version': _MANIFEST_VERSION,
+            'config': config,
+            'config_hash': config_hash(config),
+            'num_days': num_days,
+            'next_day': 0,
+            'function_state': None,
+            'shard': None,
+            'days': {},
+        }
+
+    @classmethod
+    def load(cls, folder: 'PurePath') -> 'Manifest':
+        """Loads the manifest of a dataset folder.
+
+        :param folder: the dataset folder
+        :type folder: PurePath
+        :raises Exception: the manifest version is not supported
+        :return: the manifest or None if it does not exist
+        :rtype: Manifest
+        """
+        manifest_path = Path(folder).joinpath(MANIFEST_NAME)
+        if not manifest_path.exists():
+            return None
+        with open(manifest_path) as manifest_file:
+            data = json.load(manifest_file)
+        if data['version'] != _MANIFEST_VERSION:
+            raise Exception(
+                f"ERROR: manifest version {data['version']} is not supported...")
+        manifest = cls(data['config'], data['num_days'])
+        manifest._data = data
+        return manifest
+
+    def save(self, folder: 'PurePath'):
+        """Writes the manifest atomically in a dataset folder.
+
+        :param folder: the dataset folder
+        :type folder: PurePath
+        :return: self
+        :rtype: Manifest
+        """
+        manifest_path = Path(folder).joinpath(MANIFEST_NAME)
+        tmp_path = manifest_path.with_name(f".{MANIFEST_NAME}.tmp")
+        with open(tmp_path, "w") as manifest_file:
+            json.dump(self._data, manifest_file, indent=2, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+        return self
+
+    @property
+    def config(self) -> dict:
+        return self._data['config']
+
+    @property
+    def config_hash(self) -> str:
+        return self._data['config_hash']
+
+    @property
+    def num_days(self) -> int:
+        return self._data['num_days']
+
+    @num_days.setter
+    def num_days(self, value: int):
+        self._data['num_days'] = value
+
+    @property
+    def shard(self) -> Tuple[int, int]:
+        """Returns the shard of the dataset (see `shard.shard_days`).
+
+        :return: shard index and number of shards, None for a full dataset
+        :rtype: Tuple[int, int]
+        """
+        shard = self._data.get('shard')
+        if shard is None:
+            return None
+        return shard['index'], shard['count']
+
+    @shard.setter
+    def shard(self, value: Tuple[int, int]):
+        if value is None:
+            self._data['shard'] = None
+        else:
+            index, count = value
+            self._data['shard'] = {'index': int(index), 'count': int(count)}
+
+    @property
+    def next_day(self) -> int:
+        return self._data['next_day']
+
+    @property
+    def days(self) -> Dict[str, dict]:
+        return self._data['days']
+
+    @property
+    def data(self) -> dict:
+        return self._data
+
+    def save_state(self, folder: 'PurePath',
+                   state: Dict[str, 'np.ndarray']):
+        """Stores the generator function state next to the manifest.
+
+        :param folder: the dataset folder
+        :type folder: PurePath
+        :param state: the state arrays
+        :type state: Dict[str, np.ndarray]
+        :return: self
+        :rtype: Manifest
+        """
+        state_path = Path(folder).joinpath(STATE_NAME)
+        tmp_path = state_path.with_name(f".{STATE_NAME}.tmp")
+        with open(tmp_path, "wb") as state_file:
+            np.savez(state_file, **state)
+        os.replace(tmp_path, state_path)
+        self._data['function_state'] = {
+            'file': STATE_NAME,
+            'sha256': state_hash(state),
+        }
+        return self
+
+    def load_state(self, folder: 'PurePath') -> Dict[str, 'np.ndarray']:
+        """Loads the generator function state and checks its checksum.
+
+        :param folder: the dataset folder
+        :type folder: PurePath
+        :return: the state arrays or None if the state is missing or corrupted
+        :rtype: Dict[str, np.ndarray]
+        """
+        info = self._data['function_state']
+        if info is None:
+            return None
+        state_path = Path(folder).joinpath(info['file'])
+        if not state_path.exists():
+            return None
+        with np.load(state_path) as state_file:
+            state = {key: state_file[key] for key in state_file.files}
+        if state_hash(state) != info['sha256']:
+            return None
+        return state
+
+    def add_day(self, date: str, day_idx: int, file_path: 'PurePath',
+                sha256: str, num_requests: int):
+        """Records a written day.
+
+        :param date: the day's date
+        :type date: str
+        :param day_idx: the day index (position in the seed stream)
+        :type day_idx: int
+        :param file_path: the day's file
+        :type file_path: PurePath
+        :param sha256: the checksum of the day's file
+        :type sha256: str
+        :param num_requests: number of requests of the day
+        :type num_requests: int
+        :return: self
+        :rtype: Manifest
+        """
+        self._data['days'][str(date)] = {
+            'day_idx': int(day_idx),
+            'file': Path(file_path).name,
+            'sha256': sha256,
+            'num_requests': int(num_requests),
+        }
+        self._update_next_day()
+        return self
+
+    def _update_next_day(self):
+        """Updates the index of the first day not written yet."""
+        done = {day['day_idx'] for day in self._data['days'].values()}
+        next_day = 0
+        while next_day in done:
+            next_day += 1
+        self._data['next_day'] = next_day
+
+    def retain(self, day_idxs: set):
+        """Forgets the recorded days that are not in the given set.
+
+        :param day_idxs: the indexes of the days to keep
+        :type day_idxs: set
+        :return: self
+        :rtype: Manifest
+        """
+        self._data['days'] = {
+            date: day for date, day in self._data['days'].items()
+            if day['day_idx'] in day_idxs
+        }
+        self._update_next_day()
+        return self
+
+    def valid_days(self, folder: 'PurePath') -> Dict[int, 'Path']:
+        """Returns the recorded days whose file exists and matches its checksum.
+
+        :param folder: the dataset folder
+        :type folder: PurePath
+        :return: the file of each valid day, by day index
+        :rtype: Dict[int, Path]
+        """
+        valid = {}
+        for day in self._data['days'].values():
+            file_path = Path(folder).joinpath(day['file'])
+            if file_path.exists() and file_sha256(file_path) == day['sha256']:
+                valid[day['day_idx']] = file_path
+        return valid
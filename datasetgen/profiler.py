@@ -0,0 +1,275 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path, PurePath
+from typing import Dict, List
+
+# Pipeline stages in execution order
+STAGES = ('function_init', 'generate', 'cpu_work', 'dataframe',
+          'serialize', 'compress')
+
+# The profiler of the current process, None when profiling is disabled
+_PROFILER = None
+
+
+class StageRecord(object):
+
+    """The measures of a single run of a stage."""
+
+    __slots__ = ('name', 'start', 'wall', 'cpu', 'rows', 'peak', 'pid', 'tid')
+
+    def __init__(self, name: str, rows: int = 0):
+        self.name = name
+        self.start = time.perf_counter()
+        self.wall = 0.
+        self.cpu = 0.
+        self.rows = rows
+        self.peak = -1
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'StageRecord':
+        record = cls(data['name'])
+        for key in cls.__slots__:
+            setattr(record, key, data[key])
+        return record
+
+
+class Profiler(object):
+
+    """Collects the wall time, CPU time, rows and peak memory of the stages.
+
+    The CPU time is the one of the thread that runs the stage. The peak
+    memory is traced with `tracemalloc` and it is the highest traced
+    memory during the stage over the memory at its start: when stages run
+    concurrently in more threads the peaks are approximated.
+    """
+
+    def __init__(self, memory: bool = True):
+        """Initialize the profiler.
+
+        :param memory: trace the peak memory, defaults to True
+        :type memory: bool, optional
+        """
+        self._memory = memory
+        self._records = []
+        self._start = time.perf_counter()
+
+    @property
+    def memory(self) -> bool:
+        return self._memory
+
+    @property
+    def records(self) -> List['StageRecord']:
+        return self._records
+
+    def start(self):
+        """Enables the profiler in the current process.
+
+        :return: self
+        :rtype: Profiler
+        """
+        global _PROFILER
+        if self._memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _PROFILER = self
+        return self
+
+    def stop(self):
+        """Disables the profiler in the current process.
+
+        :return: self
+        :rtype: Profiler
+        """
+        global _PROFILER
+        if self._memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        _PROFILER = None
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *_):
+        self.stop()
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 0):
+        """Measures a stage.
+
+        :param name: the stage name (see STAGES)
+        :type name: str
+        :param rows: rows produced by the stage, defaults to 0, it can be
+            changed through the yielded record
+        :type rows: int, optional
+        :yield: the stage record
+        :rtype: StageRecord
+        """
+        record = StageRecord(name, rows)
+        tracing = self._memory and tracemalloc.is_tracing()
+        if tracing:
+            mem_start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        cpu_start = time.thread_time()
+        try:
+            yield record
+        finally:
+            record.cpu = time.thread_time() - cpu_start
+            record.wall = time.perf_counter() - record.start
+            if tracing:
+                _, peak = tracemalloc.get_traced_memory()
+                record.peak = max(peak - mem_start, 0)
+            self._records.append(record)
+
+    def drain(self) -> List[dict]:
+        """Returns and forgets the collected records.
+
+        It is used to send the records of a worker process to the main one.
+
+        :return: the records
+        :rtype: List[dict]
+        """
+        records, self._records = self._records, []
+        return [record.to_dict() for record in records]
+
+    def extend(self, records: List[dict]):
+        """Adds the records collected by another process.
+
+        :param records: the records returned by `drain`
+        :type records: List[dict]
+        :return: self
+        :rtype: Profiler
+        """
+        self._records += [StageRecord.from_dict(cur) for cur in records]
+        return self
+
+    def summary(self) -> List[Dict]:
+        """Returns the totals of each stage.
+
+        :return: stage name, number of runs, wall time, CPU time, rows and
+            the highest peak memory of each stage, in STAGES order
+        :rtype: List[Dict]
+        """
+        totals = {}
+        for record in self._records:
+            cur = totals.setdefault(record.name, {
+                'stage': record.name, 'calls': 0, 'wall': 0., 'cpu': 0.,
+                'rows': 0, 'peak': -1,
+            })
+            cur['calls'] += 1
+            cur['wall'] += record.wall
+            cur['cpu'] += record.cpu
+            cur['rows'] += record.rows
+            cur['peak'] = max(cur['peak'], record.peak)
+        order = {name: idx for idx, name in enumerate(STAGES)}
+        return sorted(
+            totals.values(),
+            key=lambda cur: (order.get(cur['stage'], len(order)), cur['stage'])
+        )
+
+    def format_table(self) -> str:
+        """Returns the stage totals as a text table.
+
+        :return: the summary table
+        :rtype: str
+        """
+        lines = [
+            f"{'stage':<15} {'calls':>7} {'wall (s)':>10} {'cpu (s)':>10} "
+            f"{'rows':>12} {'rows/s':>12} {'peak (MB)':>10}"
+        ]
+        for cur in self.summary():
+            rows_x_sec = cur['rows'] / cur['wall'] if cur['wall'] > 0 else 0.
+            peak = cur['peak'] / 1024**2 if cur['peak'] >= 0 else -1
+            lines.append(
+                f"{cur['stage']:<15} {cur['calls']:>7} {cur['wall']:>10.3f} "
+                f"{cur['cpu']:>10.3f} {cur['rows']:>12} {rows_x_sec:>12.0f} "
+                f"{peak:>10.1f}"
+            )
+        return "\n".join(lines)
+
+    def save_json(self, file_path: 'PurePath') -> 'Path':
+        """Writes the stage totals and all the records as JSON.
+
+        :param file_path: the output file
+        :type file_path: PurePath
+        :return: the output file
+        :rtype: Path
+        """
+        file_path = Path(file_path)
+        with open(file_path, "w") as out_file:
+            json.dump({
+                'summary': self.summary(),
+                'records': [
+                    {**record.to_dict(), 'start': record.start - self._start}
+                    for record in self._records
+                ],
+            }, out_file, indent=2)
+        return file_path
+
+    def save_chrome_trace(self, file_path: 'PurePath') -> 'Path':
+        """Writes the records in the Chrome trace event format.
+
+        The file can be opened with chrome://tracing or Perfetto.
+
+        :param file_path: the output file
+        :type file_path: PurePath
+        :return: the output file
+        :rtype: Path
+        """
+        file_path = Path(file_path)
+        with open(file_path, "w") as out_file:
+            json.dump({
+                'traceEvents': [
+                    {
+                        'name': record.name,
+                        'ph': "X",
+                        'ts': (record.start - self._start) * 1e6,
+                        'dur': record.wall * 1e6,
+                        'pid': record.pid,
+                        'tid': record.tid,
+                        'args': {
+                            'cpu': record.cpu,
+                            'rows': record.rows,
+                            'peak': record.peak,
+                        },
+                    }
+                    for record in self._records
+                ],
+                'displayTimeUnit': "ms",
+            }, out_file)
+        return file_path
+
+
+def current() -> 'Profiler':
+    """Returns the active profiler of the current process.
+
+    :return: the profiler or None if profiling is disabled
+    :rtype: Profiler
+    """
+    return _PROFILER
+
+
+@contextmanager
+def stage(name: str, rows: int = 0):
+    """Measures a stage with the active profiler, if any.
+
+    :param name: the stage name (see STAGES)
+    :type name: str
+    :param rows: rows produced by the stage, defaults to 0
+    :type rows: int, optional
+    :yield: the stage record (a placeholder when profiling is disabled)
+    :rtype: StageRecord
+    """
+    profiler = _PROFILER
+    if profiler is None:
+        yield StageRecord(name, rows)
+        return
+    with profiler.stage(name, rows) as record:
+        yield record
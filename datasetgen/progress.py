@@ -0,0 +1,115 @@
+import time
+from typing import Callable, NamedTuple
+
+
+class ProgressInfo(NamedTuple):
+
+    """The state of a running task, passed to the progress callbacks."""
+
+    stage: str
+    done: int
+    total: int
+    elapsed: float
+
+    @property
+    def percent(self) -> int:
+        if self.total <= 0:
+            return 100
+        return int(float(self.done / self.total) * 100.)
+
+
+class Throttle(object):
+
+    """A progress callback that forwards only some of the updates.
+
+    An update is forwarded when at least `interval` seconds or `days` days
+    are passed since the last forwarded one. The first and the last update
+    of a stage are always forwarded.
+    """
+
+    def __init__(self, callback: Callable[['ProgressInfo'], None],
+                 interval: float = 0.5, days: int = 0):
+        """Initialize the throttled callback.
+
+        :param callback: the callback to throttle
+        :type callback: Callable[[ProgressInfo], None]
+        :param interval: minimum time between two updates in seconds,
+            0 to disable, defaults to 0.5
+        :type interval: float, optional
+        :param days: minimum number of days between two updates, 0 to
+            disable, defaults to 0
+        :type days: int, optional
+        """
+        self._callback = callback
+        self._interval = interval
+        self._days = days
+        self._stage = None
+        self._last_time = 0.
+        self._last_done = 0
+
+    def __call__(self, info: 'ProgressInfo'):
+        now = time.perf_counter()
+        if info.stage != self._stage:
+            self._stage = info.stage
+        elif info.done < info.total and not (
+            (self._interval > 0 and now - self._last_time >= self._interval) or
+            (self._days > 0 and info.done - self._last_done >= self._days)
+        ):
+            return
+        self._last_time = now
+        self._last_done = info.done
+        self._callback(info)
+
+
+class ProgressReporter(object):
+
+    """Counts the completed days of a task and notifies a callback."""
+
+    def __init__(self, callback: Callable[['ProgressInfo'], None],
+                 total: int, stage: str = ""):
+        """Initialize the reporter and notify the start of the task.
+
+        :param callback: the progress callback or None
+        :type callback: Callable[[ProgressInfo], None]
+        :param total: number of days of the task
+        :type total: int
+        :param stage: name of the task, defaults to ""
+        :type stage: str, optional
+        """
+        self._callback = callback
+        self._total = total
+        self._stage = stage
+        self._done = 0
+        self._start = time.perf_counter()
+        self._notify()
+
+    @property
+    def done(self) -> int:
+        return self._done
+
+    @property
+    def percent(self) -> int:
+        return self.info.percent
+
+    @property
+    def info(self) -> 'ProgressInfo':
+        return ProgressInfo(
+            self._stage, self._done, self._total,
+            time.perf_counter() - self._start,
+        )
+
+    def _notify(self):
+        if self._callback is not None:
+            self._callback(self.info)
+
+    def update(self, num: int = 1):
+        """Adds completed days.
+
+        :param num: number of completed days, defaults to 1
+        :type num: int, optional
+        :return: self
+        :rtype: ProgressReporter
+        """
+        self._done += num
+        self._notify()
+        return self
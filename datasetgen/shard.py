@@ -0,0 +1,127 @@
+from pathlib import Path, PurePath
+from typing import List, Tuple
+
+from .cache import link_or_copy
+from .formats import dataset_files
+from .manifest import Manifest
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parses a shard written as i/N (e.g. 2/4 is the second of 4 shards).
+
+    :param value: the shard string
+    :type value: str
+    :raises Exception: the shard is not valid
+    :return: shard index (from 1) and number of shards
+    :rtype: Tuple[int, int]
+    """
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise Exception(
+            f"ERROR: shard {value} is not in the i/N format...")
+    if not 1 <= index <= count:
+        raise Exception(
+            f"ERROR: shard index {index} is not between 1 and {count}...")
+    return index, count
+
+
+def shard_days(num_days: int, index: int, count: int) -> range:
+    """Returns the day indexes of a shard.
+
+    The days are split in contiguous ranges of (almost) the same size,
+    the first shard starts from day 0.
+
+    :param num_days: number of days of the whole dataset
+    :type num_days: int
+    :param index: shard index, from 1
+    :type index: int
+    :param count: number of shards
+    :type count: int
+    :return: the day indexes of the shard
+    :rtype: range
+    """
+    return range((index - 1) * num_days // count, index * num_days // count)
+
+
+def merge_shards(shard_folders: List['PurePath'],
+                 dest_folder: 'PurePath') -> 'Manifest':
+    """Merges the folders of a sharded generation into a single dataset.
+
+    The shards have to be complete streamed generations (see
+    `Generator.stream`) of the same configuration, one for each shard
+    index, and all their day files have to match the manifest checksums.
+    The day files are hard-linked (or copied) in the destination folder
+    and the manifest is the one of a single generation of all the days.
+
+    :param shard_folders: the shard folders, in any order
+    :type shard_folders: List[PurePath]
+    :param dest_folder: the folder of the merged dataset
+    :type dest_folder: PurePath
+    :raises Exception: the shards are missing, incomplete or from
+        different configurations
+    :return: the manifest of the merged dataset
+    :rtype: Manifest
+    """
+    shards = {}
+    for folder in shard_folders:
+        folder = Path(folder)
+        manifest = Manifest.load(folder)
+        if manifest is None or manifest.shard is None:
+            raise Exception(
+                f"ERROR: {folder} does not contain a shard manifest...")
+        index, count = manifest.shard
+        if index in shards:
+            raise Exception(
+                f"ERROR: shard {index}/{count} is in {shards[index][0]} and in {folder}...")
+        shards[index] = (folder, manifest)
+
+    first_folder, first = shards[min(shards)]
+    _, count = first.shard
+    missing = sorted(set(range(1, count + 1)) - set(shards))
+    if missing:
+        raise Exception(
+            f"ERROR: missing shards {', '.join(f'{cur}/{count}' for cur in missing)}...")
+
+    first_state = first.data['function_state']
+    day_files = {}
+    for index in sorted(shards):
+        folder, manifest = shards[index]
+        if manifest.shard[1] != count or \
+                manifest.config_hash != first.config_hash or \
+                manifest.num_days != first.num_days:
+            raise Exception(
+                f"ERROR: shard {folder} was generated with a different configuration...")
+        if manifest.data['function_state'] != first_state:
+            raise Exception(
+                f"ERROR: shard {folder} has a different generator function state...")
+        valid = manifest.valid_days(folder)
+        expected = set(shard_days(manifest.num_days, index, count))
+        if set(valid) != expected:
+            raise Exception(
+                f"ERROR: shard {folder} is incomplete or corrupted "
+                f"({len(expected - set(valid))} days missing or not valid)...")
+        for day_idx, file_ in valid.items():
+            day_files[day_idx] = file_
+
+    dest_folder = Path(dest_folder)
+    Path.mkdir(dest_folder, parents=True, exist_ok=True)
+    merged = Manifest(first.config, first.num_days)
+    if first_state is not None:
+        link_or_copy(first_folder.joinpath(first_state['file']),
+                      dest_folder.joinpath(first_state['file']))
+        merged.data['function_state'] = dict(first_state)
+    for index in sorted(shards):
+        _, manifest = shards[index]
+        for date, day in manifest.days.items():
+            file_ = dest_folder.joinpath(day['file'])
+            link_or_copy(day_files[day['day_idx']], file_)
+            merged.add_day(date, day['day_idx'], file_, day['sha256'],
+                           day['num_requests'])
+
+    # Remove the days of a previous dataset in the destination folder
+    merged_files = {day['file'] for day in merged.days.values()}
+    for _, file_ in dataset_files(dest_folder):
+        if file_.name not in merged_files:
+            file_.unlink()
+    return merged.save(dest_folder)
@@ -0,0 +1,238 @@
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class DayStats(object):
+
+    """Partial aggregates of a single dataset day.
+
+    They are computed once, when the day is generated or loaded, and they
+    are small compared to the day: one entry per requested file.
+    """
+
+    def __init__(self, req_day: int, num_requests: int,
+                 files: 'np.ndarray', counts: 'np.ndarray',
+                 sizes: 'np.ndarray'):
+        """Initialize the day aggregates.
+
+        :param req_day: the day timestamp (reqDay column)
+        :type req_day: int
+        :param num_requests: number of requests of the day
+        :type num_requests: int
+        :param files: the requested files, sorted
+        :type files: np.ndarray
+        :param counts: number of requests of each file
+        :type counts: np.ndarray
+        :param sizes: size in bytes of each file
+        :type sizes: np.ndarray
+        """
+        self._req_day = int(req_day)
+        self._num_requests = int(num_requests)
+        self._files = files
+        self._counts = counts
+        self._sizes = sizes
+
+    @classmethod
+    def from_columns(cls, req_day: int, filenames: 'np.ndarray',
+                     sizes: 'np.ndarray') -> 'DayStats':
+        """Computes the aggregates of a day from its columns.
+
+        :param req_day: the day timestamp (reqDay column)
+        :type req_day: int
+        :param filenames: the Filename column
+        :type filenames: np.ndarray
+        :param sizes: the Size column
+        :type sizes: np.ndarray
+        :return: the day aggregates
+        :rtype: DayStats
+        """
+        files, first_idx, counts = np.unique(
+            filenames, return_index=True, return_counts=True
+        )
+        return cls(
+            req_day, len(filenames), files, counts,
+            np.asarray(sizes, dtype=np.float64)[first_idx],
+        )
+
+    @property
+    def req_day(self) -> int:
+        return self._req_day
+
+    @property
+    def num_requests(self) -> int:
+        return self._num_requests
+
+    @property
+    def num_files(self) -> int:
+        return len(self._files)
+
+    @property
+    def size(self) -> float:
+        """Total size in bytes of the files requested during the day."""
+        return float(self._sizes.sum())
+
+    @property
+    def files(self) -> 'np.ndarray':
+        return self._files
+
+    @property
+    def counts(self) -> 'np.ndarray':
+        return self._counts
+
+    @property
+    def sizes(self) -> 'np.ndarray':
+        return self._sizes
+
+
+class DatasetStats(object):
+
+    """Dataset statistics merged from the days' partial aggregates."""
+
+    def __init__(self, days: List['DayStats']):
+        """Merge the days' aggregates.
+
+        :param days: the aggregates of each day
+        :type days: List[DayStats]
+        """
+        days = list(days)
+
+        all_files = np.concatenate([day.files for day in days])
+        files, first_idx, inverse = np.unique(
+            all_files, return_index=True, return_inverse=True
+        )
+        requests = np.bincount(
+            inverse.ravel(),
+            weights=np.concatenate([day.counts for day in days]),
+            minlength=len(files),
+        ).astype(np.int64)
+        sizes = np.concatenate([day.sizes for day in days])[first_idx]
+        # Request size distribution: each file size weighted by its requests
+        self._size_order = np.argsort(sizes, kind="stable")
+        self._req_sizes = sizes[self._size_order]
+        self._req_weights = requests[self._size_order]
+
+        order = np.argsort(-requests, kind="stable")
+        self._file_frequencies = pd.DataFrame(data={
+            'Filename': files[order],
+            '# requests': requests[order],
+        })
+
+        days_ts = pd.to_datetime(
+            np.array([day.req_day for day in days], dtype=np.int64),
+            unit="s"
+        )
+        self._all_day_file_size = pd.DataFrame(data={
+            'day': days_ts,
+            'Size': [day.size / 1024**2 for day in days],
+        })
+        self._file_sizes = pd.DataFrame(data={
+            'Filename': files,
+            'Size': sizes / 1024**2,
+        })
+        self._num_files = pd.DataFrame(data={
+            'reqDay': [day.req_day for day in days],
+            'numFiles': [day.num_files for day in days],
+            'day': days_ts,
+        })
+        self._num_req = pd.DataFrame(data={
+            'reqDay': [day.req_day for day in days],
+            'numReq': [day.num_requests for day in days],
+            'day': days_ts,
+        })
+
+    @property
+    def file_frequencies(self) -> 'pd.DataFrame':
+        return self._file_frequencies
+
+    @property
+    def all_day_file_size(self) -> 'pd.DataFrame':
+        return self._all_day_file_size
+
+    @property
+    def file_sizes(self) -> 'pd.DataFrame':
+        return self._file_sizes
+
+    @property
+    def num_files(self) -> 'pd.DataFrame':
+        return self._num_files
+
+    @property
+    def num_req(self) -> 'pd.DataFrame':
+        return self._num_req
+
+    def size_histogram(self, bins: int = 50) -> 'pd.DataFrame':
+        """Returns the histogram of the requested sizes.
+
+        It is computed from the per-file aggregates, so it does not need
+        the requests.
+
+        :param bins: number of bins, defaults to 50
+        :type bins: int, optional
+        :return: left edge, right edge and number of requests of each bin,
+            sizes in MB
+        :rtype: pd.DataFrame
+        """
+        counts, edges = np.histogram(
+            self._req_sizes / 1024**2, bins=bins, weights=self._req_weights
+        )
+        return pd.DataFrame(data={
+            'left': edges[:-1],
+            'right': edges[1:],
+            'count': counts.astype(np.int64),
+        })
+
+    def size_quantiles(self, quantiles: List[float] = (
+            0., .01, .05, .25, .5, .75, .95, .99, 1.)) -> 'pd.DataFrame':
+        """Returns the quantiles of the requested sizes.
+
+        :param quantiles: the quantiles to compute, defaults to
+            (0., .01, .05, .25, .5, .75, .95, .99, 1.)
+        :type quantiles: List[float], optional
+        :return: quantile and size in MB
+        :rtype: pd.DataFrame
+        """
+        cum_weights = np.cumsum(self._req_weights)
+        quantiles = np.asarray(quantiles, dtype=np.float64)
+        if len(cum_weights) == 0 or cum_weights[-1] == 0:
+            values = np.full(len(quantiles), np.nan)
+        else:
+            positions = np.searchsorted(
+                cum_weights, quantiles * cum_weights[-1], side="left"
+            ).clip(0, len(cum_weights) - 1)
+            values = self._req_sizes[positions] / 1024**2
+        return pd.DataFrame(data={
+            'quantile': quantiles,
+            'Size': values,
+        })
+
+    def summary(self) -> dict:
+        """Returns the main dataset figures.
+
+        :return: number of days, requests and files, size of the files
+            and mean daily requested size in MB and the size quantiles
+        :rtype: dict
+        """
+        return {
+            'num_days': len(self._num_req),
+            'num_requests': int(self._num_req.numReq.sum()),
+            'num_files': len(self._file_sizes),
+            'files_size': float(self._file_sizes.Size.sum()),
+            'mean_day_size': float(self._all_day_file_size.Size.mean()),
+            'size_quantiles': {
+                f"{quantile:.0%}": float(size)
+                for quantile, size in self.size_quantiles().itertuples(
+                    index=False)
+            },
+        }
+
+    def to_tuple(self) -> Tuple['pd.DataFrame']:
+        """Returns the statistics in the `Generator.df_stats` order.
+
+        :return: file frequencies, day sizes, file sizes, number of files
+            and number of requests per day
+        :rtype: Tuple[pd.DataFrame]
+        """
+        return (self._file_frequencies, self._all_day_file_size,
+                self._file_sizes, self._num_files, self._num_req)
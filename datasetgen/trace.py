@@ -0,0 +1,177 @@
+import json
+from pathlib import Path, PurePath
+from typing import Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .utils import COLUMNS
+
+_TRACE_VERSION = 1
+
+# Default columns of a trace record, in request order
+TRACE_COLUMNS = (
+    'Filename', 'Size', 'reqDay', 'Protocol',
+    'NumCPU', 'WrapWC', 'WrapCPU', 'CPUTime', 'IOTime',
+)
+
+
+def trace_dtype(columns: Tuple[str] = TRACE_COLUMNS) -> 'np.dtype':
+    """Returns the record type of a trace with the given columns.
+
+    The fields are little endian and use the COLUMNS types.
+
+    :param columns: the record columns, defaults to TRACE_COLUMNS
+    :type columns: Tuple[str], optional
+    :return: the structured record type
+    :rtype: np.dtype
+    """
+    return np.dtype([
+        (column, np.dtype(COLUMNS[column]).newbyteorder('<'))
+        for column in columns
+    ])
+
+
+def _header_path(file_path: 'PurePath') -> 'Path':
+    # The header is the trace file name plus .json (trace.bin.json), so
+    # it never replaces the trace whatever its extension is
+    file_path = Path(file_path)
+    if file_path.suffix == ".json":
+        return file_path
+    return file_path.with_name(file_path.name + ".json")
+
+
+class TraceWriter(object):
+
+    """Writes dataset days into a flat binary trace file.
+
+    The trace is a sequence of fixed-width records (a NumPy structured
+    array on disk) with a JSON header next to it that describes the record
+    type and the days' offsets.
+    """
+
+    def __init__(self, file_path: 'PurePath',
+                 columns: Tuple[str] = TRACE_COLUMNS):
+        """Initialize the trace writer.
+
+        :param file_path: the trace file path (e.g. trace.bin)
+        :type file_path: PurePath
+        :param columns: the record columns, defaults to TRACE_COLUMNS
+        :type columns: Tuple[str], optional
+        :raises Exception: the trace file has the .json extension
+        """
+        self._file_path = Path(file_path)
+        if self._file_path.suffix == ".json":
+            raise Exception(
+                f"ERROR: trace file {file_path} cannot have the .json extension of its header...")
+        self._columns = tuple(columns)
+        self._dtype = trace_dtype(self._columns)
+        self._days = []
+        self._num_records = 0
+        self._file = open(self._file_path, "wb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def write(self, df: 'pd.DataFrame', date: str = ""):
+        """Appends the requests of a day to the trace.
+
+        :param df: the day's dataframe
+        :type df: pd.DataFrame
+        :param date: the day's date, defaults to ""
+        :type date: str, optional
+        :return: self
+        :rtype: TraceWriter
+        """
+        records = np.empty(len(df), dtype=self._dtype)
+        for column in self._columns:
+            records[column] = df[column].to_numpy()
+        records.tofile(self._file)
+
+        self._days.append({
+            'date': str(date),
+            'offset': self._num_records,
+            'count': len(records),
+        })
+        self._num_records += len(records)
+        return self
+
+    def close(self):
+        """Closes the trace file and writes the header."""
+        if self._file.closed:
+            return
+        self._file.close()
+        with open(_header_path(self._file_path), "w") as header_file:
+            json.dump({
+                'version': _TRACE_VERSION,
+                'file': self._file_path.name,
+                'columns': list(self._columns),
+                'dtype': np.lib.format.dtype_to_descr(self._dtype),
+                'num_records': self._num_records,
+                'days': self._days,
+            }, header_file, indent=2)
+
+
+def write_trace(days: Iterable[Tuple[str, 'pd.DataFrame']],
+                file_path: 'PurePath',
+                columns: Tuple[str] = TRACE_COLUMNS) -> 'Path':
+    """Writes a binary trace from a sequence of days.
+
+    :param days: the (date, dataframe) pairs in request order
+    :type days: Iterable[Tuple[str, pd.DataFrame]]
+    :param file_path: the trace file path
+    :type file_path: PurePath
+    :param columns: the record columns, defaults to TRACE_COLUMNS
+    :type columns: Tuple[str], optional
+    :return: the header file path
+    :rtype: Path
+    """
+    with TraceWriter(file_path, columns) as writer:
+        for date, df in days:
+            writer.write(df, date)
+    return _header_path(file_path)
+
+
+def read_trace_header(file_path: 'PurePath') -> dict:
+    """Reads the JSON header of a binary trace.
+
+    :param file_path: the trace file or its header
+    :type file_path: PurePath
+    :raises Exception: the trace version is not supported
+    :return: the trace header
+    :rtype: dict
+    """
+    with open(_header_path(file_path)) as header_file:
+        header = json.load(header_file)
+    if header['version'] != _TRACE_VERSION:
+        raise Exception(
+            f"ERROR: trace version {header['version']} is not supported...")
+    return header
+
+
+def open_trace(file_path: 'PurePath') -> 'np.memmap':
+    """Opens a binary trace as a read-only memory-mapped array.
+
+    The records are not loaded in memory: the returned array can be sliced
+    or iterated in chunks, and each field is accessible by column name
+    (e.g. trace['Filename']).
+
+    :param file_path: the trace file or its header
+    :type file_path: PurePath
+    :return: the structured array of the requests
+    :rtype: np.memmap
+    """
+    header = read_trace_header(file_path)
+    dtype = np.lib.format.descr_to_dtype(
+        [tuple(field) for field in header['dtype']]
+    )
+    trace_path = _header_path(file_path).with_name(header['file'])
+    if header['num_records'] == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(
+        trace_path, dtype=dtype, mode="r",
+        shape=(header['num_records'],),
+    )
@@ -1,23 +1,27 @@
 
+import uuid
 from pathlib import Path
 
 import dash
 import dash_bootstrap_components as dbc
 import dash_core_components as dcc
 import dash_html_components as html
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import flask
 from dash.dependencies import Input, Output, State
-from plotly.graph_objs import Layout
 
+from ..export import EXPORTS, iter_export
 from ..generator import Generator
+from ..view import DatasetView
 from . import functions
+from .figures import FIGURES, FigureCache
+from .jobs import CANCELLED, DONE, JobManager
+from .sessions import IDLE_TIMEOUT, MAX_SESSIONS, SessionPool
 from .utils import get_functions
 
 _EXTERNAL_STYLESHEETS = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
-_PROGRESS = 100
 _DEFAULT_SEED = 42
+# Label suffix of a setting not changed because a job is running
+_JOB_RUNNING = " (not changed, a job is running)"
 
 
 def _create_layout(app, dest_folder: 'Path', function_UIs: dict):
@@ -33,11 +37,24 @@ def _create_layout(app, dest_folder: 'Path', function_UIs: dict):
     :rtype: dash.Dash
     """
 
-    app.layout = html.Div(children=[
+    content = html.Div(children=[
         dcc.Interval(id='progress-interval', n_intervals=0, interval=750),
+        # The running background job and the last one already notified
+        dcc.Store(id='current-job'),
+        dcc.Store(id='notified-job'),
         # For empty output callbacks
         html.Div(id='hidden-div', style={'display': "none"}),
         html.Div(children=[
+            dbc.Toast(
+                "",
+                id="job-info-alert",
+                header="Background job",
+                icon="info",
+                is_open=False,
+                duration=2000,
+                style={"position": "fixed", "top": 8,
+                       "right": 8, "width": 480},
+            ),
             dbc.Toast(
                 "",
                 id="dataset-prepare-info-alert",
@@ -183,31 +200,76 @@ def _create_layout(app, dest_folder: 'Path', function_UIs: dict):
                    color="info", block=True),
         dbc.Button("Save", id='save-dataset',
                    color="success", block=True),
+        dbc.Button("Cancel", id='cancel-job',
+                   color="danger", block=True),
+        html.Hr(),
+        dbc.Row([
+            dbc.Col(
+                html.H5(children="Download"),
+                width={'size': "auto", 'offset': 1}
+            ),
+            dbc.Col(dcc.Dropdown(
+                id='download-kind',
+                options=[
+                    {'label': "zip of csv files", 'value': "zip"},
+                    {'label': "tar.gz of csv files", 'value': "tar"},
+                    {'label': "single Parquet file", 'value': "parquet"},
+                ],
+                value="zip",
+                clearable=False,
+            ), width=3),
+            dbc.Col(
+                html.A(dbc.Button("Download", color="secondary"),
+                       id='download-link', href="", target="_blank"),
+                width="auto"
+            ),
+        ]),
         html.Hr(),
         dbc.Progress(
-            id='create-dataset-progress', value=_PROGRESS,
+            id='create-dataset-progress', value=100,
             className="mb-3"
         ),
         html.Hr(),
         dbc.Spinner(html.Div(id='inspect-output')),
     ], style={'padding': "1em"})
+
+    def layout():
+        # A new page gets a new session id, kept by the browser tab
+        return html.Div([
+            dcc.Store(id='session-id', storage_type='session',
+                      data=uuid.uuid4().hex),
+            content,
+        ])
+
+    app.layout = layout
     return app
 
 
-def _prepare_callbacks(app, generator, dest_folder, function_UIs: dict):
+def _prepare_callbacks(app, sessions: 'SessionPool', dest_folder,
+                       function_UIs: dict, jobs: 'JobManager',
+                       figures: 'FigureCache'):
     """Function to prepare the UI callbacks.
 
     In this function are called also all the personalized UI callbacks present
-    in the function generator UIs.
+    in the function generator UIs. The dataset preparation and save run as
+    background jobs: the callbacks only submit them and poll their state.
+    Each browser session uses its own generator, taken from the session pool
+    with the session id, and its jobs are keyed by the session id. Also the
+    dataset loading is a job, and the settings of the generator are not
+    changed while a job of the session is pending or running.
 
     :param app: the current Dash application
     :type app: dash.Dash
-    :param generator: the generator object
-    :type generator: Generator
+    :param sessions: the pool of the session generators
+    :type sessions: SessionPool
     :param dest_folder: the destination folder for the datasets
     :type dest_folder: PurePath
     :param function_UIs: the dataset generator UIs
     :type function_UIs: dict
+    :param jobs: the background job manager
+    :type jobs: JobManager
+    :param figures: the cache of the inspect figures
+    :type figures: FigureCache
     :return: the Dash app with the updated callbacks
     :rtype: dash.Dash
     """
@@ -217,11 +279,13 @@ def _prepare_callbacks(app, generator, dest_folder, function_UIs: dict):
 
     @app.callback([Output('dest-folder', 'value'),
                    Output('dest-folder-load', 'children')],
-                  [Input('load-files', 'n_clicks')],)
-    def open_folder(n_clicks):
+                  [Input('load-files', 'n_clicks')],
+                  [State('session-id', 'data')])
+    def open_folder(n_clicks, session_id):
+        generator = sessions.get(session_id).generator
         if n_clicks:
-            generator.open_data(generator.dest_folder.name)
-            return generator.dest_folder.name, "All data loaded..."
+            # The data is loaded by a job (see submit_job)
+            return generator.dest_folder.name, "Loading data..."
         return generator.dest_folder.name, "No data loaded..."
 
     @app.callback(
@@ -244,168 +308,279 @@ def _prepare_callbacks(app, generator, dest_folder, function_UIs: dict):
     @app.callback(
         Output("hidden-div", "children"),
         [Input("dest-folder", "value")],
+        [State('session-id', 'data')],
     )
-    def change_dest_folder(new_dest_folder):
-        generator.dest_folder = Path(
-            dest_folder).parent.joinpath(new_dest_folder)
+    def change_dest_folder(new_dest_folder, session_id):
+        generator = sessions.get(session_id).generator
+        jobs.when_idle(session_id, lambda: setattr(
+            generator, 'dest_folder',
+            Path(dest_folder).parent.joinpath(new_dest_folder)
+        ))
         return ""
 
     @app.callback(
         Output("seed-val", "children"),
         [Input("seed", "value")],
+        [State('session-id', 'data')],
     )
-    def change_seed(value):
-        generator.seed = value
+    def change_seed(value, session_id):
+        generator = sessions.get(session_id).generator
+        if not jobs.when_idle(session_id,
+                              lambda: setattr(generator, 'seed', value)):
+            return f"Seed: {generator.seed}{_JOB_RUNNING}"
         return f"Seed: {value}"
 
     @app.callback(
         Output('num-day-val', 'children'),
-        [Input('num-days', 'value')])
-    def update_num_days(value):
-        generator.clean()
-        generator.num_days = value
+        [Input('num-days', 'value')],
+        [State('session-id', 'data')])
+    def update_num_days(value, session_id):
+        generator = sessions.get(session_id).generator
+
+        def change():
+            generator.clean()
+            generator.num_days = value
+        if not jobs.when_idle(session_id, change):
+            return f"Num. Days: {generator.num_days}{_JOB_RUNNING}"
         return f"Num. Days: {value}"
 
     @app.callback(
         Output('num-req-x-day-val', 'children'),
-        [Input('num-req-x-day', 'value')])
-    def update_num_req_x_day(value):
-        generator.num_req_x_day = value
+        [Input('num-req-x-day', 'value')],
+        [State('session-id', 'data')])
+    def update_num_req_x_day(value, session_id):
+        generator = sessions.get(session_id).generator
+        if not jobs.when_idle(session_id, lambda: setattr(
+                generator, 'num_req_x_day', value)):
+            return f"Num. Req. x Day: {generator.num_req_x_day}{_JOB_RUNNING}"
         return f"Num. Req. x Day: {value}"
 
+    def prepare_task(generator, selected_function, fun_kwargs):
+        def task(job):
+            generator.clean()
+            if not job.run_steps(generator.prepare(
+                selected_function, fun_kwargs, progress=job.update
+            )):
+                generator.clean()
+            return "Done"
+        return task
+
+    def open_task(generator):
+        def task(job):
+            generator.open_data(generator.dest_folder.name)
+            return "All data loaded..."
+        return task
+
+    def save_task(generator):
+        def task(job):
+            job.run_steps(generator.save(progress=job.update))
+            return "Done! Dataset saved in the output folder..."
+        return task
+
     @app.callback(
-        [Output('dataset-prepare-info-alert', 'is_open'),
-         Output('dataset-prepare-info-alert', 'icon'),
-         Output('dataset-prepare-info-alert', 'children')],
-        [Input('prepare-dataset', 'n_clicks')],
-        [State("functions", "value")]
+        [Output('current-job', 'data'),
+         Output('job-info-alert', 'is_open'),
+         Output('job-info-alert', 'icon'),
+         Output('job-info-alert', 'children')],
+        [Input('prepare-dataset', 'n_clicks'),
+         Input('save-dataset', 'n_clicks'),
+         Input('load-files', 'n_clicks'),
+         Input('cancel-job', 'n_clicks')],
+        [State("functions", "value"),
+         State('current-job', 'data'),
+         State('session-id', 'data')]
     )
-    def prepare_dataset(n_clicks, selected_function):
-        if n_clicks:
-            global _PROGRESS
-            _PROGRESS = 0
+    def submit_job(prepare_clicks, save_clicks, load_clicks, cancel_clicks,
+                   selected_function, current_job, session_id):
+        triggered = dash.callback_context.triggered
+        if not triggered or not triggered[0]['value']:
+            return dash.no_update, False, "primary", ""
+        button = triggered[0]['prop_id'].split(".")[0]
+        generator = sessions.get(session_id).generator
+
+        if button == 'cancel-job':
+            job = jobs.get(current_job) if current_job else None
+            if job is not None and job.key == session_id and \
+                    jobs.cancel(current_job):
+                return dash.no_update, True, "warning", "Cancelling the job..."
+            return dash.no_update, True, "info", "No job to cancel..."
+
+        if button == 'prepare-dataset':
             try:
-                fun_kwargs = function_UIs[selected_function].to_dict()
+                fun_kwargs = function_UIs[selected_function].parameters(
+                    session_id)
             except KeyError:
-                return True, "danger", "Impossible to get function parameters..."
-            if selected_function and fun_kwargs:
-                generator.clean()
-                for day in generator.prepare(
-                    selected_function, fun_kwargs
-                ):
-                    _PROGRESS = day
-                return True, "success", "Done"
-            else:
-                return True, "warning", "Nothing to do..."
+                return dash.no_update, True, "danger", "Impossible to get function parameters..."
+            if not (selected_function and fun_kwargs):
+                return dash.no_update, True, "warning", "Nothing to do..."
+            job = jobs.submit(
+                "prepare", prepare_task(generator, selected_function,
+                                        fun_kwargs),
+                key=session_id
+            )
+        elif button == 'load-files':
+            job = jobs.submit("open", open_task(generator), key=session_id)
         else:
-            return False, "primary", "No message from prepare dataset..."
+            job = jobs.submit("save", save_task(generator), key=session_id)
+        return job.id, True, "info", f"Job {job.name} started..."
 
     @app.callback(
         [Output('inspect-output', 'children'),
          Output('dataset-inspect-info-alert', 'is_open'),
          Output('dataset-inspect-info-alert', 'children')],
-        [Input('inspect-dataset', 'n_clicks')]
+        [Input('inspect-dataset', 'n_clicks')],
+        [State('session-id', 'data')]
     )
-    def inspect_dataset(n_clicks):
+    def inspect_dataset(n_clicks, session_id):
         if n_clicks:
-            (df, file_frequencies, all_day_file_size, file_sizes,
-             num_files, num_req) = generator.df_stats
-
-            if df is None:
+            generator = sessions.get(session_id).generator
+            if generator.stats is None:
                 return "", True, "No data in dataset..."
 
-            layout = Layout(
-                paper_bgcolor='rgb(255,255,255)',
-                plot_bgcolor='rgb(255,255,255)',
-                yaxis={'gridcolor': 'black'},
-                xaxis={'gridcolor': 'black'},
-            )
-
-            daily_stats = go.Figure(data=[
-                go.Bar(name='Files', x=num_files.day,
-                       y=num_files.numFiles),
-                go.Bar(name='Requests', x=num_req.day,
-                       y=num_req.numReq),
-            ], layout=layout)
-            daily_stats.update_layout(title="# files and requests x day")
-
-            day_file_size = px.bar(
-                all_day_file_size, x="day",
-                y="Size", title="Day size"
-            )
-            file_freq_fig = px.bar(
-                file_frequencies, x="Filename",
-                y="# requests", title="File requests"
-            )
-            file_size_fig = px.bar(
-                file_sizes, x="Filename",
-                y="Size", title="File sizes"
-            )
-            size_hist_fig = px.histogram(
-                df, x="Size", title="Size distribution"
-            )
-            size_scatter_fit = px.scatter(
-                df, y='Size', size='Size',
-                title="Sizes during days"
-            )
-            filename_scatter_fig = px.scatter(
-                df, y='Filename', color="Filename",
-                title="Files during days"
-            )
-
-            file_freq_fig.update_layout(layout)
-            file_size_fig.update_layout(layout)
-            size_hist_fig.update_layout(layout)
-            size_scatter_fit.update_layout(layout)
-            filename_scatter_fig.update_layout(layout)
-
+            # Each figure is built only when its tab is shown
             return [
-                dcc.Graph(figure=daily_stats),
-                dcc.Graph(figure=day_file_size),
-                dcc.Graph(figure=file_freq_fig),
-                dcc.Graph(figure=file_size_fig),
-                dcc.Graph(figure=size_hist_fig),
-                dcc.Graph(figure=size_scatter_fit),
-                dcc.Graph(figure=filename_scatter_fig),
+                dcc.Tabs(id='inspect-tabs', value=next(iter(FIGURES)),
+                         children=[
+                             dcc.Tab(label=name.replace("-", " ").capitalize(),
+                                     value=name)
+                             for name in FIGURES
+                ]),
+                dbc.Spinner(html.Div(id='inspect-figure')),
             ], True, "Inspection done. Result plots are ready!"
         return "", False, ""
 
     @app.callback(
-        [Output('dataset-generator-info-alert', 'is_open'),
-         Output('dataset-generator-info-alert', 'children')],
-        [Input('save-dataset', 'n_clicks')]
+        Output('inspect-figure', 'children'),
+        [Input('inspect-tabs', 'value')],
+        [State('session-id', 'data')]
     )
-    def save_dataset(n_clicks):
-        if n_clicks:
-            global _PROGRESS
-            _PROGRESS = 0
-            for day in generator.save():
-                _PROGRESS = day
-            return True, "Done! Dataset saved in the output folder..."
-        else:
-            return False, "No message from save dataset..."
+    def show_figure(name, session_id):
+        generator = sessions.get(session_id).generator
+        if name not in FIGURES or generator.stats is None:
+            return "No data in dataset..."
+        return dcc.Graph(figure=figures.figure(name, generator))
+
+    @app.callback(
+        Output('download-link', 'href'),
+        [Input('download-kind', 'value'),
+         Input('session-id', 'data')]
+    )
+    def update_download_link(kind, session_id):
+        return f"/download/{session_id}/{kind}"
 
     @app.callback(
-        Output("create-dataset-progress", "value"),
+        [Output("create-dataset-progress", "value"),
+         Output("create-dataset-progress", "children"),
+         Output('notified-job', 'data'),
+         Output('dataset-prepare-info-alert', 'is_open'),
+         Output('dataset-prepare-info-alert', 'icon'),
+         Output('dataset-prepare-info-alert', 'children'),
+         Output('dataset-generator-info-alert', 'is_open'),
+         Output('dataset-generator-info-alert', 'icon'),
+         Output('dataset-generator-info-alert', 'children')],
         [Input("progress-interval", "n_intervals")],
+        [State('current-job', 'data'),
+         State('notified-job', 'data'),
+         State('session-id', 'data')]
     )
-    def update_progress(n):
-        global _PROGRESS
-        return _PROGRESS
+    def update_progress(n, job_id, notified_job, session_id):
+        # The polling keeps the session of an open page alive
+        sessions.get(session_id)
+        no_alert = (dash.no_update,) * 3
+        job = jobs.get(job_id) if job_id else None
+        if job is None:
+            return (100, "", dash.no_update, *no_alert, *no_alert)
+
+        label = f"{job.name} {job.progress}%"
+        if not job.finished or job.id == notified_job:
+            return (job.progress, label, dash.no_update, *no_alert, *no_alert)
+
+        if job.status == DONE:
+            alert = (True, "success", job.result)
+        elif job.status == CANCELLED:
+            alert = (True, "warning", "Cancelled...")
+        else:
+            alert = (True, "danger", f"Error: {job.error}")
+        if job.name == "prepare":
+            return (job.progress, label, job.id, *alert, *no_alert)
+        return (job.progress, label, job.id, *no_alert, *alert)
 
     return app
 
 
-def start_app(debug: bool = True, dest_folder: 'Path' = Path(__file__).parent):
+def _prepare_routes(app, sessions: 'SessionPool'):
+    """Adds the download endpoint to the Dash server.
+
+    `/download/<session_id>/<kind>` streams the dataset of a session, the
+    days in memory or the files in its destination folder, as an archive
+    or as a single file (see `export.EXPORTS`). The data is serialized and
+    compressed in chunks while it is sent.
+
+    The session id (a random uuid4 sent to the browser) is the only
+    credential of the endpoint: whoever knows it can download the dataset
+    of that session, so the links must not be shared and the UI should not
+    be exposed outside a trusted network.
+
+    :param app: the current Dash application
+    :type app: dash.Dash
+    :param sessions: the pool of the session generators
+    :type sessions: SessionPool
+    :return: the Dash app with the new route
+    :rtype: dash.Dash
+    """
+
+    @app.server.route("/download/<session_id>/<kind>")
+    def download(session_id, kind):
+        if session_id not in sessions or kind not in EXPORTS:
+            flask.abort(404)
+        generator = sessions.get(session_id).generator
+        if generator.days:
+            view = generator.view()
+        else:
+            view = DatasetView.from_folder(generator.dest_folder)
+        if len(view) == 0:
+            flask.abort(404)
+
+        _, extension, media_type = EXPORTS[kind]
+        filename = f"{generator.dest_folder.name}.{extension}"
+        return flask.Response(
+            flask.stream_with_context(iter_export(view, kind)),
+            mimetype=media_type,
+            headers={
+                'Content-Disposition': f'attachment; filename="{filename}"',
+            },
+        )
+
+    return app
+
+
+def start_app(debug: bool = True, dest_folder: 'Path' = Path(__file__).parent,
+              max_sessions: int = MAX_SESSIONS,
+              idle_timeout: float = IDLE_TIMEOUT):
     """Start the generator UI app.
 
     :param debug: if start in debug mode or not, defaults to True
     :type debug: bool, optional
     :param dest_folder: the destination folder for the dataset generator, defaults to Path(__file__).parent
     :type dest_folder: PurePath, optional
+    :param max_sessions: maximum number of browser sessions kept in memory,
+        defaults to MAX_SESSIONS
+    :type max_sessions: int, optional
+    :param idle_timeout: seconds after which an idle session is removed,
+        defaults to IDLE_TIMEOUT
+    :type idle_timeout: float, optional
     """
-    generator = Generator(
-        dest_folder=dest_folder,
+    jobs = JobManager()
+    figures = FigureCache()
+
+    def drop_session(session):
+        jobs.discard(session.id)
+        figures.discard(session.generator)
+
+    sessions = SessionPool(
+        lambda: Generator(dest_folder=dest_folder),
+        max_sessions=max_sessions, idle_timeout=idle_timeout,
+        on_evict=drop_session,
     )
 
     app = dash.Dash(__name__, external_stylesheets=[
@@ -418,9 +593,11 @@ def start_app(debug: bool = True, dest_folder: 'Path' = Path(__file__).parent):
         if type(cur_elm) == type and \
             cur_elm is not functions.FunctionUI and \
                 issubclass(cur_elm, functions.FunctionUI):
-            function_UIs[elm] = cur_elm(app)
+            function_UIs[elm] = cur_elm(app, sessions)
 
     app = _create_layout(app, dest_folder, function_UIs)
-    app = _prepare_callbacks(app, generator, dest_folder, function_UIs)
+    app = _prepare_callbacks(app, sessions, dest_folder, function_UIs,
+                             jobs, figures)
+    app = _prepare_routes(app, sessions)
 
     app.run_server(debug=debug)
@@ -0,0 +1,343 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, Tuple
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.graph_objs import Layout
+
+# Maximum number of points sent to the browser for each figure
+POINT_BUDGET = 5000
+# Maximum memory used by the cached figures (serialized size)
+CACHE_SIZE = 64 * 1024**2
+
+_LAYOUT = Layout(
+    paper_bgcolor='rgb(255,255,255)',
+    plot_bgcolor='rgb(255,255,255)',
+    yaxis={'gridcolor': 'black'},
+    xaxis={'gridcolor': 'black'},
+)
+
+
+def lttb(x: 'np.ndarray', y: 'np.ndarray', num_points: int) -> 'np.ndarray':
+    """Downsamples a series with the Largest-Triangle-Three-Buckets method.
+
+    The first and the last points are always kept. For each bucket, it
+    selects the point that forms the largest triangle with the previous
+    selected point and the average of the next bucket, so the peaks of
+    the series are preserved.
+
+    :param x: the x values, sorted
+    :type x: np.ndarray
+    :param y: the y values
+    :type y: np.ndarray
+    :param num_points: the number of points to keep
+    :type num_points: int
+    :return: the indexes of the selected points
+    :rtype: np.ndarray
+    """
+    num_values = len(x)
+    if num_points >= num_values:
+        return np.arange(num_values)
+    if num_points < 3:
+        return np.linspace(0, num_values - 1, max(num_points, 0)).astype(int)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, num_values - 1, num_points - 1).astype(int)
+    selected = np.empty(num_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = num_values - 1
+
+    prev = 0
+    for bucket in range(num_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_end = num_values - 1, num_values
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        areas = np.abs(
+            (x[prev] - avg_x) * (y[start:end] - y[prev]) -
+            (x[prev] - x[start:end]) * (avg_y - y[prev])
+        )
+        prev = start + int(np.argmax(areas)) if end > start else start
+        selected[bucket + 1] = prev
+    return selected
+
+
+def reservoir_sample(chunks: Iterable['np.ndarray'], num_points: int,
+                     rng: 'np.random.Generator' = None) -> Tuple[
+                         'np.ndarray', 'np.ndarray']:
+    """Samples uniformly a fixed number of values from a stream of chunks.
+
+    Each value gets a random key and the values with the largest keys
+    are kept, so only `num_points` values are in memory besides the
+    current chunk.
+
+    :param chunks: the chunks of values in stream order
+    :type chunks: Iterable[np.ndarray]
+    :param num_points: the sample size
+    :type num_points: int
+    :param rng: the random generator, defaults to None (seed 0)
+    :type rng: np.random.Generator, optional
+    :return: the positions in the stream and the values of the sample,
+        in stream order
+    :rtype: Tuple[np.ndarray, np.ndarray]
+    """
+    if rng is None:
+        rng = np.random.default_rng(0)
+    keys = np.empty(0)
+    positions = np.empty(0, dtype=np.int64)
+    values = None
+    offset = 0
+    for chunk in chunks:
+        chunk = np.asarray(chunk)
+        keys = np.concatenate([keys, rng.random(len(chunk))])
+        positions = np.concatenate([
+            positions, np.arange(offset, offset + len(chunk))
+        ])
+        values = chunk if values is None else np.concatenate([values, chunk])
+        offset += len(chunk)
+        if len(keys) > num_points:
+            keep = np.argpartition(keys, -num_points)[-num_points:]
+            keys, positions, values = keys[keep], positions[keep], values[keep]
+    if values is None:
+        return positions, np.empty(0)
+    order = np.argsort(positions)
+    return positions[order], values[order]
+
+
+def _downsampled_line(x: 'np.ndarray', y: 'np.ndarray', name: str,
+                      budget: int) -> 'go.Scattergl':
+    selected = lttb(np.arange(len(y)), y, budget)
+    return go.Scattergl(
+        x=np.asarray(x)[selected], y=np.asarray(y)[selected],
+        mode="lines+markers", name=name,
+    )
+
+
+def daily_stats(generator, budget: int = POINT_BUDGET) -> 'go.Figure':
+    stats = generator.stats
+    figure = go.Figure(data=[
+        go.Bar(name='Files', x=stats.num_files.day,
+               y=stats.num_files.numFiles),
+        go.Bar(name='Requests', x=stats.num_req.day,
+               y=stats.num_req.numReq),
+    ], layout=_LAYOUT)
+    return figure.update_layout(title="# files and requests x day")
+
+
+def day_size(generator, budget: int = POINT_BUDGET) -> 'go.Figure':
+    stats = generator.stats
+    figure = go.Figure(data=[
+        go.Bar(x=stats.all_day_file_size.day, y=stats.all_day_file_size.Size),
+    ], layout=_LAYOUT)
+    return figure.update_layout(title="Day size", yaxis_title="Size (MB)")
+
+
+def file_frequencies(generator, budget: int = POINT_BUDGET) -> 'go.Figure':
+    frequencies = generator.stats.file_frequencies
+    figure = go.Figure(data=[_downsampled_line(
+        np.arange(len(frequencies)), frequencies['# requests'].to_numpy(),
+        "# requests", budget,
+    )], layout=_LAYOUT)
+    return figure.update_layout(
+        title=f"File requests ({len(frequencies)} files)",
+        xaxis_title="File rank", yaxis_title="# requests",
+    )
+
+
+def file_sizes(generator, budget: int = POINT_BUDGET) -> 'go.Figure':
+    sizes = generator.stats.file_sizes
+    figure = go.Figure(data=[_downsampled_line(
+        sizes.Filename.to_numpy(), sizes.Size.to_numpy(), "Size", budget,
+    )], layout=_LAYOUT)
+    return figure.update_layout(
+        title=f"File sizes ({len(sizes)} files)",
+        xaxis_title="Filename", yaxis_title="Size (MB)",
+    )
+
+
+def size_distribution(generator, budget: int = POINT_BUDGET) -> 'go.Figure':
+    histogram = generator.stats.size_histogram(bins=min(budget, 100))
+    figure = go.Figure(data=[go.Bar(
+        x=(histogram.left + histogram.right) / 2.,
+        y=histogram['count'],
+        width=histogram.right - histogram.left,
+    )], layout=_LAYOUT)
+    return figure.update_layout(
+        title="Size distribution",
+        xaxis_title="Size (MB)", yaxis_title="# requests",
+    )
+
+
+def size_quantiles(generator, budget: int = POINT_BUDGET) -> 'go.Figure':
+    quantiles = generator.stats.size_quantiles()
+    figure = go.Figure(data=[go.Bar(
+        x=[f"{quantile:.0%}" for quantile in quantiles['quantile']],
+        y=quantiles.Size,
+    )], layout=_LAYOUT)
+    return figure.update_layout(
+        title="Size quantiles",
+        xaxis_title="Quantile", yaxis_title="Size (MB)",
+    )
+
+
+def sizes_during_days(generator,
+                      budget: int = POINT_BUDGET) -> 'go.Figure':
+    """Request sizes in request order, downsampled day by day with LTTB."""
+    num_days = max(len(generator.days), 1)
+    day_budget = max(budget // num_days, 3)
+    all_x, all_y = [], []
+    offset = 0
+    for _, df in generator.view(columns=['Size']).iter_days():
+        sizes = df.Size.to_numpy() / 1024**2
+        selected = lttb(np.arange(len(sizes)), sizes, day_budget)
+        all_x.append(selected + offset)
+        all_y.append(sizes[selected])
+        offset += len(sizes)
+    figure = go.Figure(data=[go.Scattergl(
+        x=np.concatenate(all_x) if all_x else [],
+        y=np.concatenate(all_y) if all_y else [],
+        mode="markers", marker={'size': 4},
+    )], layout=_LAYOUT)
+    return figure.update_layout(
+        title=f"Sizes during days ({offset} requests)",
+        xaxis_title="Request", yaxis_title="Size (MB)",
+    )
+
+
+def files_during_days(generator,
+                      budget: int = POINT_BUDGET) -> 'go.Figure':
+    """Requested files in request order, sampled with a reservoir."""
+    positions, filenames = reservoir_sample(
+        (df.Filename.to_numpy()
+         for _, df in generator.view(columns=['Filename']).iter_days()),
+        budget,
+    )
+    figure = go.Figure(data=[go.Scattergl(
+        x=positions, y=filenames, mode="markers",
+        marker={'size': 4, 'color': filenames, 'colorscale': "Viridis"},
+    )], layout=_LAYOUT)
+    return figure.update_layout(
+        title=f"Files during days ({len(positions)} sampled requests)",
+        xaxis_title="Request", yaxis_title="Filename",
+    )
+
+
+# The inspect figures, by name
+FIGURES = OrderedDict([
+    ('daily-stats', daily_stats),
+    ('day-size', day_size),
+    ('file-frequencies', file_frequencies),
+    ('file-sizes', file_sizes),
+    ('size-distribution', size_distribution),
+    ('size-quantiles', size_quantiles),
+    ('sizes-during-days', sizes_during_days),
+    ('files-during-days', files_during_days),
+])
+
+
+def make_figure(name: str, generator,
+                budget: int = POINT_BUDGET) -> 'go.Figure':
+    """Builds an inspect figure of the generator dataset.
+
+    :param name: the figure name (see FIGURES)
+    :type name: str
+    :param generator: the generator with the dataset
+    :type generator: Generator
+    :param budget: maximum number of points of the figure, defaults to
+        POINT_BUDGET
+    :type budget: int, optional
+    :return: the figure
+    :rtype: go.Figure
+    """
+    builder: Callable = FIGURES[name]
+    return builder(generator, budget)
+
+
+class FigureCache(object):
+
+    """A memory-bounded cache of the inspect figures.
+
+    The figures are keyed by the generator, its dataset version and the
+    figure name, so a figure is built again only when the dataset changes.
+    The size of a figure is its serialized JSON size and the least
+    recently used figures are evicted when the total exceeds the limit.
+    """
+
+    def __init__(self, max_size: int = CACHE_SIZE):
+        """Initialize the cache.
+
+        :param max_size: maximum total size in bytes, defaults to CACHE_SIZE
+        :type max_size: int, optional
+        """
+        self._max_size = max_size
+        self._figures = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._figures)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _get(self, key: Hashable) -> 'go.Figure':
+        with self._lock:
+            if key not in self._figures:
+                return None
+            self._figures.move_to_end(key)
+            return self._figures[key][0]
+
+    def _put(self, key: Hashable, figure: 'go.Figure'):
+        size = len(figure.to_json())
+        with self._lock:
+            if key in self._figures:
+                self._size -= self._figures.pop(key)[1]
+            self._figures[key] = (figure, size)
+            self._size += size
+            while self._size > self._max_size and len(self._figures) > 1:
+                _, (_, old_size) = self._figures.popitem(last=False)
+                self._size -= old_size
+
+    def discard(self, generator) -> int:
+        """Removes the figures of a generator.
+
+        It has to be called when the generator is dropped, because the
+        figures are keyed by its id.
+
+        :param generator: the generator
+        :type generator: Generator
+        :return: the number of removed figures
+        :rtype: int
+        """
+        with self._lock:
+            keys = [key for key in self._figures if key[0] == id(generator)]
+            for key in keys:
+                self._size -= self._figures.pop(key)[1]
+        return len(keys)
+
+    def figure(self, name: str, generator,
+               budget: int = POINT_BUDGET) -> 'go.Figure':
+        """Returns a cached figure or builds it.
+
+        :param name: the figure name (see FIGURES)
+        :type name: str
+        :param generator: the generator with the dataset
+        :type generator: Generator
+        :param budget: maximum number of points of the figure, defaults to
+            POINT_BUDGET
+        :type budget: int, optional
+        :return: the figure
+        :rtype: go.Figure
+        """
+        key = (id(generator), generator.version, name, budget)
+        figure = self._get(key)
+        if figure is None:
+            figure = make_figure(name, generator, budget)
+            self._put(key, figure)
+        return figure
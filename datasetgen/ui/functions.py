@@ -2,16 +2,26 @@ import dash
 import dash_bootstrap_components as dbc
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
+
+from .sessions import SessionPool
 
 
 class FunctionUI(object):
 
-    def __init__(self, app: 'dash.dash.Dash'):
+    """Base class of the function UIs.
+
+    The instance attributes are the default parameters shared by all the
+    sessions, the callbacks store the changed ones in the session of the
+    browser that made the request.
+    """
+
+    def __init__(self, app: 'dash.dash.Dash', sessions: 'SessionPool'):
         assert isinstance(
             app, dash.dash.Dash
         ), "Function UI needs main app reference..."
         self._app = app
+        self._sessions = sessions
 
     def elements(self):
         """Returns the HTML elemets of the UI."""
@@ -22,11 +32,27 @@ class FunctionUI(object):
         raise NotImplementedError
 
     def to_dict(self):
-        """Export the UI parameters as a dict.
+        """Export the default UI parameters as a dict."""
+        raise NotImplementedError
+
+    def parameters(self, session_id: str) -> dict:
+        """Export the UI parameters of a session as a dict.
 
         This method is required to call the generator functions
+
+        :param session_id: the browser session id
+        :type session_id: str
+        :return: the function kwargs
+        :rtype: dict
         """
-        raise NotImplementedError
+        return {
+            **self.to_dict(),
+            **self._sessions.get(session_id).params(self.name_id),
+        }
+
+    def _update(self, session_id: str, **params):
+        """Stores the changed parameters in the session."""
+        self._sessions.get(session_id).params(self.name_id).update(params)
 
     @property
     def name(self):
@@ -39,8 +65,8 @@ class FunctionUI(object):
 
 class RandomGenerator(FunctionUI):
 
-    def __init__(self, app: 'dash.dash.Dash'):
-        super().__init__(app)
+    def __init__(self, app: 'dash.dash.Dash', sessions: 'SessionPool'):
+        super().__init__(app, sessions)
         self._num_files = 100
         self._min_file_size = 100
         self._max_file_size = 24000
@@ -60,25 +86,30 @@ class RandomGenerator(FunctionUI):
     def callbacks(self):
         @self._app.callback(
             Output(f'{self.name_id}-num-file-val', 'children'),
-            [Input(f'{self.name_id}-num-files', 'value')])
-        def change_num_files(value):
-            self._num_files = value
+            [Input(f'{self.name_id}-num-files', 'value')],
+            [State('session-id', 'data')])
+        def change_num_files(value, session_id):
+            self._update(session_id, num_files=value)
             return f"Num. Files: {value}"
 
         @self._app.callback(
             Output(f'{self.name_id}-file-size-val', 'children'),
             [Input(f'{self.name_id}-file-size', 'value')],
+            [State('session-id', 'data')],
         )
-        def change_size(value):
-            self._min_file_size, self._max_file_size = value
-            return f"File Size (MB): {self._min_file_size}-{self._max_file_size}"
+        def change_size(value, session_id):
+            min_file_size, max_file_size = value
+            self._update(session_id, min_file_size=min_file_size,
+                         max_file_size=max_file_size)
+            return f"File Size (MB): {min_file_size}-{max_file_size}"
 
         @self._app.callback(
             Output(f'{self.name_id}-size-function-val', 'children'),
             [Input(f'{self.name_id}-size-function', 'value')],
+            [State('session-id', 'data')],
         )
-        def update_function_ui(value):
-            self._size_function_generator = value
+        def update_function_ui(value, session_id):
+            self._update(session_id, size_generator_function=value)
             if value == "gen_random_sizes":
                 return "File size function generator: [0]"
             elif value == "gen_in_range_random_sizes":
@@ -152,8 +183,8 @@ class HighFrequencyDataset(FunctionUI):
 
     """UI for HighFrequencyDataset generator."""
 
-    def __init__(self, app: 'dash.dash.Dash'):
-        super().__init__(app)
+    def __init__(self, app: 'dash.dash.Dash', sessions: 'SessionPool'):
+        super().__init__(app, sessions)
         self._num_files: int = 100
         self._min_file_size: int = 100
         self._max_file_size: int = 24000
@@ -183,25 +214,30 @@ class HighFrequencyDataset(FunctionUI):
 
         @self._app.callback(
             Output(f'{self.name_id}-num-file-val', 'children'),
-            [Input(f'{self.name_id}-num-files', 'value')])
-        def change_num_files(value):
-            self._num_files = value
+            [Input(f'{self.name_id}-num-files', 'value')],
+            [State('session-id', 'data')])
+        def change_num_files(value, session_id):
+            self._update(session_id, num_files=value)
             return f"Num. Files: {value}"
 
         @self._app.callback(
             Output(f'{self.name_id}-file-size-val', 'children'),
             [Input(f'{self.name_id}-file-size', 'value')],
+            [State('session-id', 'data')],
         )
-        def change_size(value):
-            self._min_file_size, self._max_file_size = value
-            return f"File Size (MB): {self._min_file_size}-{self._max_file_size}"
+        def change_size(value, session_id):
+            min_file_size, max_file_size = value
+            self._update(session_id, min_file_size=min_file_size,
+                         max_file_size=max_file_size)
+            return f"File Size (MB): {min_file_size}-{max_file_size}"
 
         @self._app.callback(
             Output(f'{self.name_id}-size-function-val', 'children'),
             [Input(f'{self.name_id}-size-function', 'value')],
+            [State('session-id', 'data')],
         )
-        def update_function_ui(value):
-            self._size_function_generator = value
+        def update_function_ui(value, session_id):
+            self._update(session_id, size_generator_function=value)
             if value == "gen_random_sizes":
                 return "File size function generator: [0]"
             elif value == "gen_in_range_random_sizes":
@@ -210,31 +246,35 @@ class HighFrequencyDataset(FunctionUI):
         @self._app.callback(
             Output(f'{self.name_id}-hidden-div-lambda-less', 'children'),
             [Input(f'{self.name_id}-lambda-less-req-files', 'value')],
+            [State('session-id', 'data')],
         )
-        def change_lambda_less_req_files(value):
-            self._lambda_less_req_files = value
+        def change_lambda_less_req_files(value, session_id):
+            self._update(session_id, lambda_less_req_files=value)
 
         @self._app.callback(
             Output(f'{self.name_id}-hidden-div-lambda-more', 'children'),
             [Input(f'{self.name_id}-lambda-more-req-files', 'value')],
+            [State('session-id', 'data')],
         )
-        def change_lambda_more_req_files(value):
-            self._lambda_more_req_files = value
+        def change_lambda_more_req_files(value, session_id):
+            self._update(session_id, lambda_more_req_files=value)
 
         @self._app.callback(
             Output(f'{self.name_id}-perc-more-req-files-val', 'children'),
             [Input(f'{self.name_id}-perc-more-req-files', 'value')],
+            [State('session-id', 'data')],
         )
-        def change_percentage_more_req_files(value):
-            self._perc_more_req_files = value
+        def change_percentage_more_req_files(value, session_id):
+            self._update(session_id, perc_more_req_files=value)
             return f"More requested files: {value}%"
 
         @self._app.callback(
             Output(f'{self.name_id}-perc-files-x-day-val', 'children'),
             [Input(f'{self.name_id}-perc-files-x-day', 'value')],
+            [State('session-id', 'data')],
         )
-        def change_percentage_files_x_day(value):
-            self._perc_files_x_day = value
+        def change_percentage_files_x_day(value, session_id):
+            self._update(session_id, perc_files_x_day=value)
             return f"Files x day: {value}%"
 
     def elements(self):
@@ -408,8 +448,8 @@ class RecencyFocusedDataset(FunctionUI):
 
     """UI for RecencyFocusedDataset generator."""
 
-    def __init__(self, app: 'dash.dash.Dash'):
-        super().__init__(app)
+    def __init__(self, app: 'dash.dash.Dash', sessions: 'SessionPool'):
+        super().__init__(app, sessions)
         self._num_files: int = 100
         self._min_file_size: int = 100
         self._max_file_size: int = 24000
@@ -433,25 +473,30 @@ class RecencyFocusedDataset(FunctionUI):
 
         @self._app.callback(
             Output(f'{self.name_id}-num-file-val', 'children'),
-            [Input(f'{self.name_id}-num-files', 'value')])
-        def change_num_files(value):
-            self._num_files = value
+            [Input(f'{self.name_id}-num-files', 'value')],
+            [State('session-id', 'data')])
+        def change_num_files(value, session_id):
+            self._update(session_id, num_files=value)
             return f"Num. Files: {value}"
 
         @self._app.callback(
             Output(f'{self.name_id}-file-size-val', 'children'),
             [Input(f'{self.name_id}-file-size', 'value')],
+            [State('session-id', 'data')],
         )
-        def change_size(value):
-            self._min_file_size, self._max_file_size = value
-            return f"File Size (MB): {self._min_file_size}-{self._max_file_size}"
+        def change_size(value, session_id):
+            min_file_size, max_file_size = value
+            self._update(session_id, min_file_size=min_file_size,
+                         max_file_size=max_file_size)
+            return f"File Size (MB): {min_file_size}-{max_file_size}"
 
         @self._app.callback(
             Output(f'{self.name_id}-size-function-val', 'children'),
             [Input(f'{self.name_id}-size-function', 'value')],
+            [State('session-id', 'data')],
         )
-        def update_function_ui(value):
-            self._size_function_generator = value
+        def update_function_ui(value, session_id):
+            self._update(session_id, size_generator_function=value)
             if value == "gen_random_sizes":
                 return "File size function generator: [0]"
             elif value == "gen_in_range_random_sizes":
@@ -460,9 +505,10 @@ class RecencyFocusedDataset(FunctionUI):
         @self._app.callback(
             Output(f'{self.name_id}-perc-files-x-day-val', 'children'),
             [Input(f'{self.name_id}-perc-files-x-day', 'value')],
+            [State('session-id', 'data')],
         )
-        def change_percentage_files_x_day(value):
-            self._perc_files_x_day = value
+        def change_percentage_files_x_day(value, session_id):
+            self._update(session_id, perc_files_x_day=value)
             return f"Files x day: {value}%"
 
     def elements(self):
@@ -566,8 +612,8 @@ class SizeFocusedDataset(FunctionUI):
 
     """UI for SizeFocusedDataset generator."""
 
-    def __init__(self, app: 'dash.dash.Dash'):
-        super().__init__(app)
+    def __init__(self, app: 'dash.dash.Dash', sessions: 'SessionPool'):
+        super().__init__(app, sessions)
         self._num_files: int = 100
         self._min_file_size: int = 1000
         self._max_file_size: int = 8000
@@ -597,33 +643,41 @@ class SizeFocusedDataset(FunctionUI):
 
         @self._app.callback(
             Output(f'{self.name_id}-num-file-val', 'children'),
-            [Input(f'{self.name_id}-num-files', 'value')])
-        def change_num_files(value):
-            self._num_files = value
+            [Input(f'{self.name_id}-num-files', 'value')],
+            [State('session-id', 'data')])
+        def change_num_files(value, session_id):
+            self._update(session_id, num_files=value)
             return f"Num. Files: {value}"
 
         @self._app.callback(
             Output(f'{self.name_id}-file-size-val', 'children'),
             [Input(f'{self.name_id}-file-size', 'value')],
+            [State('session-id', 'data')],
         )
-        def change_size(value):
-            self._min_file_size, self._max_file_size = value
-            return f"File Size (MB): {self._min_file_size}-{self._max_file_size}"
+        def change_size(value, session_id):
+            min_file_size, max_file_size = value
+            self._update(session_id, min_file_size=min_file_size,
+                         max_file_size=max_file_size)
+            return f"File Size (MB): {min_file_size}-{max_file_size}"
 
         @self._app.callback(
             Output(f'{self.name_id}-noise-file-size-val', 'children'),
             [Input(f'{self.name_id}-noise-file-size', 'value')],
+            [State('session-id', 'data')],
         )
-        def change_size(value):
-            self._noise_min_file_size, self._noise_max_file_size = value
-            return f"Noise File Size (MB): {self._noise_min_file_size}-{self._noise_max_file_size}"
+        def change_size(value, session_id):
+            noise_min_file_size, noise_max_file_size = value
+            self._update(session_id, noise_min_file_size=noise_min_file_size,
+                         noise_max_file_size=noise_max_file_size)
+            return f"Noise File Size (MB): {noise_min_file_size}-{noise_max_file_size}"
 
         @self._app.callback(
             Output(f'{self.name_id}-size-function-val', 'children'),
             [Input(f'{self.name_id}-size-function', 'value')],
+            [State('session-id', 'data')],
         )
-        def update_function_ui(value):
-            self._size_function_generator = value
+        def update_function_ui(value, session_id):
+            self._update(session_id, size_generator_function=value)
             if value == "gen_random_sizes":
                 return "File size function generator: [0]"
             elif value == "gen_in_range_random_sizes":
@@ -632,17 +686,19 @@ class SizeFocusedDataset(FunctionUI):
         @self._app.callback(
             Output(f'{self.name_id}-perc-noise-val', 'children'),
             [Input(f'{self.name_id}-perc-noise', 'value')],
+            [State('session-id', 'data')],
         )
-        def change_percentage_more_req_files(value):
-            self._perc_noise = value
+        def change_percentage_more_req_files(value, session_id):
+            self._update(session_id, perc_noise=value)
             return f"Noise: {value}%"
 
         @self._app.callback(
             Output(f'{self.name_id}-perc-files-x-day-val', 'children'),
             [Input(f'{self.name_id}-perc-files-x-day', 'value')],
+            [State('session-id', 'data')],
         )
-        def change_percentage_files_x_day(value):
-            self._perc_files_x_day = value
+        def change_percentage_files_x_day(value, session_id):
+            self._update(session_id, perc_files_x_day=value)
             return f"Files x day: {value}%"
 
     def elements(self):
@@ -0,0 +1,324 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List
+
+from ..progress import ProgressInfo
+
+# Job states
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+ERROR = "error"
+
+
+class Job(object):
+
+    """A task executed in background by the JobManager."""
+
+    def __init__(self, name: str, key: str = ""):
+        """Initialize the job.
+
+        :param name: the job name (e.g. prepare or save)
+        :type name: str
+        :param key: the jobs with the same key are executed one at a time,
+            defaults to ""
+        :type key: str, optional
+        """
+        self._id = uuid.uuid4().hex
+        self._name = name
+        self._key = key
+        self._status = PENDING
+        self._progress = 0
+        self._stage = ""
+        self._result = None
+        self._error = None
+        self._created = time.time()
+        self._finished = None
+        self._cancel = threading.Event()
+
+    def __repr__(self):
+        return f"Job({self._name}, {self._id}, {self._status}, {self._progress}%)"
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @property
+    def progress(self) -> int:
+        return self._progress
+
+    @property
+    def stage(self) -> str:
+        return self._stage
+
+    @property
+    def result(self):
+        return self._result
+
+    @property
+    def error(self) -> str:
+        return self._error
+
+    @property
+    def finished(self) -> bool:
+        return self._status in (DONE, CANCELLED, ERROR)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        """Asks the job to stop at the next step."""
+        self._cancel.set()
+
+    def update(self, info: 'ProgressInfo'):
+        """Progress callback of the job's task.
+
+        :param info: the task progress
+        :type info: ProgressInfo
+        """
+        self._stage = info.stage
+        self._progress = info.percent
+
+    def run_steps(self, steps: Iterable) -> bool:
+        """Consumes a generator of steps until it ends or the job is cancelled.
+
+        :param steps: the task steps (e.g. `Generator.prepare`)
+        :type steps: Iterable
+        :return: True if all the steps were executed
+        :rtype: bool
+        """
+        steps = iter(steps)
+        try:
+            for _ in steps:
+                if self.cancelled:
+                    return False
+        finally:
+            if hasattr(steps, "close"):
+                steps.close()
+        return True
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self._id,
+            'name': self._name,
+            'status': self._status,
+            'progress': self._progress,
+            'stage': self._stage,
+            'result': self._result,
+            'error': self._error,
+        }
+
+
+class JobManager(object):
+
+    """Runs the UI tasks in a thread pool and keeps track of their state.
+
+    The Dash callbacks only submit the jobs and poll their state, so the
+    server workers are never blocked by a long generation. The tasks with
+    the same key (e.g. the same Generator) are serialized in submission
+    order, and the waiting ones do not take a thread of the pool.
+    """
+
+    def __init__(self, workers: int = 2, max_jobs: int = 64):
+        """Initialize the job manager.
+
+        :param workers: number of threads that run the jobs, defaults to 2
+        :type workers: int, optional
+        :param max_jobs: maximum number of finished jobs kept, defaults to 64
+        :type max_jobs: int, optional
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max(workers, 1))
+        self._max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        # Jobs waiting for the running one of each key, in submission
+        # order. A key is removed when it has no more jobs
+        self._key_queues = {}
+
+    def submit(self, name: str, task: Callable[['Job'], object],
+               key: str = "") -> 'Job':
+        """Submits a new job.
+
+        The task receives the job, to report its progress (`Job.update`)
+        and to check if it was cancelled (`Job.run_steps`). Its return
+        value is the job result.
+
+        :param name: the job name
+        :type name: str
+        :param task: the job's task
+        :type task: Callable[[Job], object]
+        :param key: the jobs with the same key are executed one at a time,
+            defaults to ""
+        :type key: str, optional
+        :return: the new job
+        :rtype: Job
+        """
+        job = Job(name, key)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+            queue = self._key_queues.get(key)
+            if queue is not None:
+                queue.append((job, task))
+                return job
+            self._key_queues[key] = deque()
+        self._executor.submit(self._run, job, task)
+        return job
+
+    def _run(self, job: 'Job', task: Callable[['Job'], object]):
+        try:
+            self._execute(job, task)
+        finally:
+            self._run_next(job.key)
+
+    def _run_next(self, key: str):
+        """Starts the next job of a key, or forgets the key.
+
+        The cancelled jobs are ended here, so they are not submitted when
+        the manager is shutting down.
+
+        :param key: the jobs key
+        :type key: str
+        """
+        while True:
+            with self._lock:
+                queue = self._key_queues[key]
+                if not queue:
+                    del self._key_queues[key]
+                    return
+                job, task = queue.popleft()
+            if not job.cancelled:
+                self._executor.submit(self._run, job, task)
+                return
+            self._execute(job, task)
+
+    def _execute(self, job: 'Job', task: Callable[['Job'], object]):
+        if job.cancelled:
+            job._status = CANCELLED
+            job._finished = time.time()
+            return
+        job._status = RUNNING
+        try:
+            job._result = task(job)
+            job._status = CANCELLED if job.cancelled else DONE
+            if job._status == DONE:
+                job._progress = 100
+        except Exception as err:
+            job._error = str(err)
+            job._status = ERROR
+        finally:
+            job._finished = time.time()
+
+    def _evict(self):
+        """Removes the oldest finished jobs over the limit."""
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job.finished]
+        for job_id in finished[:max(len(self._jobs) - self._max_jobs, 0)]:
+            del self._jobs[job_id]
+
+    def busy(self, key: str) -> bool:
+        """Checks if a job with the key is pending or running.
+
+        :param key: the jobs key
+        :type key: str
+        :return: True if the key has unfinished jobs
+        :rtype: bool
+        """
+        with self._lock:
+            return key in self._key_queues
+
+    def when_idle(self, key: str, action: Callable[[], object]) -> bool:
+        """Runs a short action only if no job with the key is active.
+
+        No job can be submitted while the action runs, so it can change
+        the state used by the jobs of the key (e.g. the session generator).
+
+        :param key: the jobs key
+        :type key: str
+        :param action: the action to run
+        :type action: Callable[[], object]
+        :return: True if the action was executed
+        :rtype: bool
+        """
+        with self._lock:
+            if key in self._key_queues:
+                return False
+            action()
+            return True
+
+    def discard(self, key: str) -> int:
+        """Cancels the jobs of a key that is not used anymore.
+
+        The key is removed when its last job ends.
+
+        :param key: the jobs key
+        :type key: str
+        :return: the number of cancelled jobs
+        :rtype: int
+        """
+        cancelled = 0
+        for job in self.jobs(key):
+            if not job.finished:
+                job.cancel()
+                cancelled += 1
+        return cancelled
+
+    def get(self, job_id: str) -> 'Job':
+        """Returns a job.
+
+        :param job_id: the job id
+        :type job_id: str
+        :return: the job or None if it does not exist
+        :rtype: Job
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancels a job.
+
+        :param job_id: the job id
+        :type job_id: str
+        :return: True if the job exists and it was not finished
+        :rtype: bool
+        """
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel()
+        return True
+
+    def jobs(self, key: str = None) -> List['Job']:
+        """Returns the known jobs in submission order.
+
+        :param key: return only the jobs with this key, defaults to None
+        :type key: str, optional
+        :return: the jobs
+        :rtype: List[Job]
+        """
+        with self._lock:
+            return [job for job in self._jobs.values()
+                    if key is None or job.key == key]
+
+    def shutdown(self):
+        """Cancels all the jobs and stops the threads."""
+        for job in self.jobs():
+            job.cancel()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List
+
+# Maximum number of sessions kept in memory
+MAX_SESSIONS = 16
+# Seconds after which a session without requests is removed
+IDLE_TIMEOUT = 3600.
+
+
+class Session(object):
+
+    """The state of a browser session: its generator and UI parameters."""
+
+    def __init__(self, session_id: str, generator):
+        """Initialize the session.
+
+        :param session_id: the session id
+        :type session_id: str
+        :param generator: the generator of the session
+        :type generator: Generator
+        """
+        self._id = session_id
+        self._generator = generator
+        self._params = {}
+        self._last_used = time.time()
+
+    def __repr__(self):
+        return f"Session({self._id})"
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @property
+    def generator(self):
+        return self._generator
+
+    @property
+    def last_used(self) -> float:
+        return self._last_used
+
+    def touch(self):
+        """Marks the session as used now."""
+        self._last_used = time.time()
+
+    def params(self, name: str) -> dict:
+        """Returns the parameters of a function UI.
+
+        :param name: the function UI name
+        :type name: str
+        :return: the parameters changed in this session
+        :rtype: dict
+        """
+        return self._params.setdefault(name, {})
+
+
+class SessionPool(object):
+
+    """A bounded pool of sessions, each one with its own Generator.
+
+    The sessions are created on demand. When the pool is full the least
+    recently used session is removed, and the sessions without requests
+    for more than `idle_timeout` seconds are removed at each access.
+    """
+
+    def __init__(self, factory: Callable[[], object],
+                 max_sessions: int = MAX_SESSIONS,
+                 idle_timeout: float = IDLE_TIMEOUT,
+                 on_evict: Callable[['Session'], None] = None):
+        """Initialize the pool.
+
+        :param factory: creates the generator of a new session
+        :type factory: Callable[[], Generator]
+        :param max_sessions: maximum number of sessions, defaults to
+            MAX_SESSIONS
+        :type max_sessions: int, optional
+        :param idle_timeout: idle seconds before a session is removed,
+            0 to disable, defaults to IDLE_TIMEOUT
+        :type idle_timeout: float, optional
+        :param on_evict: called with each removed session, defaults to None
+        :type on_evict: Callable[[Session], None], optional
+        """
+        assert max_sessions > 0, "ERROR: the pool needs at least one session"
+        self._factory = factory
+        self._max_sessions = max_sessions
+        self._idle_timeout = idle_timeout
+        self._on_evict = on_evict
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str):
+        return session_id in self._sessions
+
+    @property
+    def sessions(self) -> List['Session']:
+        with self._lock:
+            return list(self._sessions.values())
+
+    def get(self, session_id: str) -> 'Session':
+        """Returns a session, creating it if it does not exist.
+
+        :param session_id: the session id
+        :type session_id: str
+        :return: the session
+        :rtype: Session
+        """
+        with self._lock:
+            evicted = self._evict_idle()
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id, self._factory())
+                self._sessions[session_id] = session
+                while len(self._sessions) > self._max_sessions:
+                    evicted.append(self._sessions.popitem(last=False)[1])
+            else:
+                self._sessions.move_to_end(session_id)
+            session.touch()
+        self._evicted(evicted)
+        return session
+
+    def remove(self, session_id: str) -> bool:
+        """Removes a session.
+
+        :param session_id: the session id
+        :type session_id: str
+        :return: True if the session existed
+        :rtype: bool
+        """
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self._evicted([session])
+        return True
+
+    def _evict_idle(self) -> List['Session']:
+        if self._idle_timeout <= 0:
+            return []
+        deadline = time.time() - self._idle_timeout
+        evicted = []
+        # The sessions are in last use order
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_used >= deadline:
+                break
+            evicted.append(self._sessions.popitem(last=False)[1])
+        return evicted
+
+    def _evicted(self, sessions: List['Session']):
+        if self._on_evict is not None:
+            for session in sessions:
+                self._on_evict(session)
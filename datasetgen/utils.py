@@ -1,5 +1,6 @@
 import random
 from argparse import ArgumentTypeError
+from typing import Sequence, Union
 
 import numpy as np
 
@@ -36,7 +37,8 @@ _SIZE_PROB_DISTRIBUTION = np.array([
 
 
 def gen_random_sizes(num_files: int, min_file_size: int,
-                     max_file_size: int) -> list:
+                     max_file_size: int,
+                     rng: 'np.random.Generator' = None) -> list:
     """Generates a list of sizes for each files using a random distribution.
 
     :param num_files: total number of files
@@ -45,29 +47,34 @@ def gen_random_sizes(num_files: int, min_file_size: int,
     :type min_file_size: int
     :param max_file_size: maximum file size
     :type max_file_size: int
+    :param rng: the random generator to use, defaults to None (a new one)
+    :type rng: np.random.Generator, optional
     :return: list of file sizes
     :rtype: list
     """
+    if rng is None:
+        rng = np.random.default_rng()
     file_sizes = list(range(min_file_size, max_file_size, _FILE_SIZE_STEP))
-    file_size_prob = np.random.randint(2, size=len(file_sizes))
+    file_size_prob = rng.integers(2, size=len(file_sizes))
     for idx, size in enumerate(file_sizes):
         if size >= min_file_size and size <= max_file_size:
             file_size_prob[idx] = (
-                file_size_prob[idx] + random.random() * 100.0) % 100
+                file_size_prob[idx] + rng.random() * 100.0) % 100
         elif size < min_file_size and size > min_file_size - (min_file_size / 2):
             file_size_prob[idx] = (
-                file_size_prob[idx] + random.random() * 10) % 100
+                file_size_prob[idx] + rng.random() * 10) % 100
         elif size > max_file_size and size < max_file_size * 2 - min_file_size:
             file_size_prob[idx] = (
-                file_size_prob[idx] + random.random() * 10) % 100
+                file_size_prob[idx] + rng.random() * 10) % 100
     file_size_prob = file_size_prob.astype(float)
     file_size_prob /= file_size_prob.sum()
-    sizes = np.random.choice(file_sizes, size=num_files, p=file_size_prob)
+    sizes = rng.choice(file_sizes, size=num_files, p=file_size_prob)
     return sizes
 
 
 def gen_in_range_random_sizes(num_files: int, min_file_size: int,
-                              max_file_size: int) -> list:
+                              max_file_size: int,
+                              rng: 'np.random.Generator' = None) -> list:
     """Generates a list of sizes that follows the use case distribution.
 
     :param num_files: total number of files
@@ -76,21 +83,186 @@ def gen_in_range_random_sizes(num_files: int, min_file_size: int,
     :type min_file_size: int
     :param max_file_size: masimum file size
     :type max_file_size: int
+    :param rng: the random generator to use, defaults to None (a new one)
+    :type rng: np.random.Generator, optional
     :return: list of file sizes
     :rtype: list
     """
+    if rng is None:
+        rng = np.random.default_rng()
     bins = np.linspace(
         min_file_size, max_file_size, len(_SIZE_PROB_DISTRIBUTION)
     )
     prob = _SIZE_PROB_DISTRIBUTION / _SIZE_PROB_DISTRIBUTION.sum()
-    sizes = np.random.choice(bins, size=num_files, p=prob)
+    sizes = rng.choice(bins, size=num_files, p=prob)
     return sizes
 
 
+class FileCatalog(object):
+
+    """A catalog of files backed by contiguous NumPy arrays.
+
+    For each file it stores the id (the Filename column), the size in MB,
+    the protocol and a popularity class, ordered by id. The lookups take
+    arrays of ids or positions and use fancy indexing.
+    """
+
+    def __init__(self, ids: 'np.ndarray', sizes: 'np.ndarray',
+                 protocols: 'np.ndarray', popularity: 'np.ndarray' = None):
+        """Initialize the catalog arrays.
+
+        :param ids: file ids, unique and in ascending order
+        :type ids: np.ndarray
+        :param sizes: file sizes in MB
+        :type sizes: np.ndarray
+        :param protocols: file protocols
+        :type protocols: np.ndarray
+        :param popularity: file popularity classes, defaults to None (all 0)
+        :type popularity: np.ndarray, optional
+        """
+        self._ids = np.asarray(ids, dtype=np.int64)
+        self._sizes = np.asarray(sizes, dtype=np.float64)
+        self._protocols = np.asarray(protocols, dtype=np.int8)
+        if popularity is None:
+            self._popularity = np.zeros(len(self._ids), dtype=np.int8)
+        else:
+            self._popularity = np.asarray(popularity, dtype=np.int8)
+
+        assert len(self._ids) == len(self._sizes) == len(self._protocols) \
+            == len(self._popularity), "ERROR: catalog arrays with different lengths"
+        assert np.all(np.diff(self._ids) > 0), \
+            "ERROR: catalog ids are not unique or not sorted"
+
+        # With contiguous ids the position is just an offset
+        self._contiguous = len(self._ids) == 0 or \
+            self._ids[-1] - self._ids[0] == len(self._ids) - 1
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __repr__(self):
+        return f"FileCatalog({len(self)} files)"
+
+    @property
+    def ids(self) -> 'np.ndarray':
+        return self._ids
+
+    @property
+    def sizes(self) -> 'np.ndarray':
+        return self._sizes
+
+    @property
+    def protocols(self) -> 'np.ndarray':
+        return self._protocols
+
+    @property
+    def popularity(self) -> 'np.ndarray':
+        return self._popularity
+
+    @property
+    def nbytes(self) -> int:
+        return self._ids.nbytes + self._sizes.nbytes + \
+            self._protocols.nbytes + self._popularity.nbytes
+
+    def positions(self, ids: 'np.ndarray') -> 'np.ndarray':
+        """Returns the catalog positions of the given file ids.
+
+        :param ids: file ids
+        :type ids: np.ndarray
+        :raises Exception: some ids are not in the catalog
+        :return: positions of the files in the catalog arrays
+        :rtype: np.ndarray
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if self._contiguous:
+            positions = ids - (self._ids[0] if len(self._ids) else 0)
+            found = (positions >= 0) & (positions < len(self._ids))
+        else:
+            # searchsorted returns the insertion point of a missing id
+            positions = np.searchsorted(self._ids, ids)
+            found = positions < len(self._ids)
+            found[found] = self._ids[positions[found]] == ids[found]
+        if not np.all(found):
+            raise Exception(
+                f"ERROR: file ids {np.unique(ids[~found])[:10].tolist()} are not in the catalog...")
+        return positions
+
+    def take(self, positions: 'np.ndarray') -> dict:
+        """Returns the request columns of the files at the given positions.
+
+        :param positions: positions of the files in the catalog arrays
+        :type positions: np.ndarray
+        :return: the Filename, Size and Protocol columns
+        :rtype: dict
+        """
+        return {
+            'Filename': self._ids[positions],
+            'Size': self._sizes[positions],
+            'Protocol': self._protocols[positions],
+        }
+
+    def lookup(self, ids: 'np.ndarray') -> dict:
+        """Returns the request columns of the given file ids.
+
+        :param ids: file ids
+        :type ids: np.ndarray
+        :return: the Filename, Size and Protocol columns
+        :rtype: dict
+        """
+        return self.take(self.positions(ids))
+
+    def to_dict(self) -> dict:
+        """Returns the catalog arrays.
+
+        :return: the ids, sizes, protocols and popularity arrays
+        :rtype: dict
+        """
+        return {
+            'ids': self._ids,
+            'sizes': self._sizes,
+            'protocols': self._protocols,
+            'popularity': self._popularity,
+        }
+
+    @classmethod
+    def from_dict(cls, arrays: dict) -> 'FileCatalog':
+        """Creates a catalog from the arrays returned by `to_dict`.
+
+        :param arrays: the catalog arrays
+        :type arrays: dict
+        :return: the catalog
+        :rtype: FileCatalog
+        """
+        return cls(arrays['ids'], arrays['sizes'],
+                   arrays['protocols'], arrays['popularity'])
+
+    @classmethod
+    def concat(cls, catalogs: list) -> 'FileCatalog':
+        """Merges several catalogs with disjoint ids.
+
+        :param catalogs: the catalogs to merge
+        :type catalogs: list
+        :return: the merged catalog
+        :rtype: FileCatalog
+        """
+        ids = np.concatenate([catalog.ids for catalog in catalogs])
+        order = np.argsort(ids, kind="stable")
+        return cls(
+            ids[order],
+            np.concatenate([catalog.sizes for catalog in catalogs])[order],
+            np.concatenate(
+                [catalog.protocols for catalog in catalogs])[order],
+            np.concatenate(
+                [catalog.popularity for catalog in catalogs])[order],
+        )
+
+
 def gen_random_files(num_files: int, min_file_size: int, max_file_size: int,
                      size_generator_function: str = 'gen_in_range_random_sizes',
-                     start_from: int = 0,) -> dict:
-    """Generates a dict with random files with a random size.
+                     start_from: int = 0,
+                     popularity: int = 0,
+                     rng: 'np.random.Generator' = None) -> 'FileCatalog':
+    """Generates a catalog of random files with a random size.
 
     :param num_files: total number of files
     :type num_files: int
@@ -102,27 +274,32 @@ def gen_random_files(num_files: int, min_file_size: int, max_file_size: int,
     :type size_generator_function: str, optional
     :param start_from: filename reference index, defaults to 0
     :type start_from: int, optional
+    :param popularity: popularity class of the files, defaults to 0
+    :type popularity: int, optional
+    :param rng: the random generator to use, defaults to None (a new one)
+    :type rng: np.random.Generator, optional
     :raises Exception: size generator function not exists
-    :return: dictionary with filenames and their sizes
-    :rtype: dict
+    :return: the catalog with filenames and their sizes
+    :rtype: FileCatalog
     """
+    if rng is None:
+        rng = np.random.default_rng()
     if size_generator_function == 'gen_in_range_random_sizes':
         sizes = gen_in_range_random_sizes(
-            num_files, min_file_size, max_file_size
+            num_files, min_file_size, max_file_size, rng
         )
     elif size_generator_function == 'gen_random_sizes':
-        sizes = gen_random_sizes(num_files, min_file_size, max_file_size)
+        sizes = gen_random_sizes(num_files, min_file_size, max_file_size, rng)
     else:
         raise Exception(
             f"ERROR: Size generator function {size_generator_function} does not exist...")
 
-    return {
-        filename: {
-            'Size': sizes[filename-start_from],
-            'Protocol': random.randint(0, 1)
-        }
-        for filename in range(start_from, start_from+num_files)
-    }
+    return FileCatalog(
+        np.arange(start_from, start_from + num_files, dtype=np.int64),
+        sizes,
+        rng.integers(0, 2, size=num_files),
+        np.full(num_files, popularity, dtype=np.int8),
+    )
 
 
 def gen_fake_cpu_work(num_cpus: int = 1) -> tuple:
@@ -140,6 +317,47 @@ def gen_fake_cpu_work(num_cpus: int = 1) -> tuple:
     return num_cpus, wall_time, cpu_time, single_cpu_time, io_time
 
 
+def gen_fake_cpu_work_batch(num_rows: int,
+                            rng: 'np.random.Generator' = None,
+                            num_cpus: Union[int, Sequence[int]] = 1,
+                            num_cpus_prob: Sequence[float] = None) -> tuple:
+    """Generates fake CPU times for a batch of jobs.
+
+    It is the vectorized version of `gen_fake_cpu_work`: the wall time is
+    an integer between 60 and 600 seconds and the single CPU time is a
+    random fraction of it. The number of CPUs can be a fixed value or a
+    list of values to draw from, optionally with their probabilities.
+
+    :param num_rows: number of jobs to generate
+    :type num_rows: int
+    :param rng: the random generator to use, defaults to None (a new one)
+    :type rng: np.random.Generator, optional
+    :param num_cpus: number of CPUs or list of possible values, defaults to 1
+    :type num_cpus: Union[int, Sequence[int]], optional
+    :param num_cpus_prob: probabilities of the num_cpus values, defaults to None (uniform)
+    :type num_cpus_prob: Sequence[float], optional
+    :return: work statistics arrays -> number of CPUs, wall time, CPU time, single CPU time and io time
+    :rtype: tuple
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    if np.ndim(num_cpus) == 0:
+        cpus = np.full(num_rows, num_cpus, dtype=np.int64)
+    else:
+        cpus = rng.choice(
+            np.asarray(num_cpus, dtype=np.int64), size=num_rows,
+            p=num_cpus_prob
+        )
+
+    wall_time = rng.integers(60, 600, size=num_rows,
+                             endpoint=True).astype(np.float64)
+    single_cpu_time = rng.random(num_rows) * wall_time
+    cpu_time = single_cpu_time * cpus
+    io_time = wall_time - single_cpu_time
+    return cpus, wall_time, cpu_time, single_cpu_time, io_time
+
+
 # Dataset columns with types
 COLUMNS = {
     'Filename': "int64",
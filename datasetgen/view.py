@@ -0,0 +1,167 @@
+import datetime
+from pathlib import PurePath
+from typing import Callable, Generator, List, Tuple
+
+import pandas as pd
+
+from .formats import dataset_files, format_of
+
+
+class DatasetView(object):
+
+    """A lazy view over the days of a dataset.
+
+    The days can be in memory (Day objects) or on disk (dataset files):
+    they are loaded one at a time, only with the selected columns, when
+    the view is iterated. A full concatenated copy is created only by
+    `to_df`.
+    """
+
+    def __init__(self,
+                 sources: List[Tuple['datetime.date', Callable]],
+                 columns: List[str] = None,
+                 start_date: 'datetime.date' = None,
+                 end_date: 'datetime.date' = None):
+        """Initialize the view.
+
+        :param sources: the date and the loader of each day in date order,
+            a loader takes the list of columns (or None) and returns the
+            day's dataframe
+        :type sources: List[Tuple[datetime.date, Callable]]
+        :param columns: the columns to read, defaults to None (all)
+        :type columns: List[str], optional
+        :param start_date: first day of the view, defaults to None
+        :type start_date: datetime.date, optional
+        :param end_date: last day of the view (included), defaults to None
+        :type end_date: datetime.date, optional
+        """
+        self._sources = sources
+        self._columns = list(columns) if columns is not None else None
+        self._start_date = start_date
+        self._end_date = end_date
+
+    @classmethod
+    def from_days(cls, days: list, **kwargs) -> 'DatasetView':
+        """Creates a view over days in memory.
+
+        :param days: the dataset days
+        :type days: List[Day]
+        :return: the dataset view
+        :rtype: DatasetView
+        """
+        def loader(day):
+            def load(columns):
+                return day.df if columns is None else day.df[columns]
+            return load
+
+        return cls([(day.date, loader(day)) for day in days], **kwargs)
+
+    @classmethod
+    def from_folder(cls, folder: 'PurePath', **kwargs) -> 'DatasetView':
+        """Creates a view over the dataset files of a folder.
+
+        :param folder: the dataset folder
+        :type folder: PurePath
+        :return: the dataset view
+        :rtype: DatasetView
+        """
+        def loader(file_path):
+            def load(columns):
+                return format_of(file_path).read(file_path, columns=columns)
+            return load
+
+        return cls([
+            (date, loader(file_path))
+            for date, file_path in dataset_files(folder)
+        ], **kwargs)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __repr__(self):
+        return f"DatasetView({len(self)} days, columns={self._columns})"
+
+    @property
+    def columns(self) -> List[str]:
+        return self._columns
+
+    @property
+    def dates(self) -> List['datetime.date']:
+        return [date for date, _ in self._selected()]
+
+    def select(self, columns: List[str]) -> 'DatasetView':
+        """Returns a new view with only the given columns.
+
+        :param columns: the columns to read
+        :type columns: List[str]
+        :return: the new view
+        :rtype: DatasetView
+        """
+        return DatasetView(
+            self._sources, columns, self._start_date, self._end_date
+        )
+
+    def between(self, start_date: 'datetime.date' = None,
+                end_date: 'datetime.date' = None) -> 'DatasetView':
+        """Returns a new view with only the days in a date range.
+
+        :param start_date: first day, defaults to None (no limit)
+        :type start_date: datetime.date, optional
+        :param end_date: last day (included), defaults to None (no limit)
+        :type end_date: datetime.date, optional
+        :return: the new view
+        :rtype: DatasetView
+        """
+        return DatasetView(
+            self._sources, self._columns, start_date, end_date
+        )
+
+    def _selected(self) -> List[Tuple['datetime.date', Callable]]:
+        return [
+            (date, load) for date, load in self._sources
+            if (self._start_date is None or date >= self._start_date) and
+            (self._end_date is None or date <= self._end_date)
+        ]
+
+    def iter_days(self) -> Generator[Tuple['datetime.date', 'pd.DataFrame'],
+                                     None, None]:
+        """Iterates over the days of the view.
+
+        :yield: the date and the dataframe of each day
+        :rtype: Tuple[datetime.date, pd.DataFrame]
+        """
+        for date, load in self._selected():
+            yield date, load(self._columns)
+
+    def iter_chunks(self, chunk_size: int = 1_000_000) -> Generator[
+            'pd.DataFrame', None, None]:
+        """Iterates over the rows of the view in chunks.
+
+        A chunk never contains rows of different days, so only one day
+        is loaded at a time.
+
+        :param chunk_size: maximum number of rows of a chunk, defaults to 1_000_000
+        :type chunk_size: int, optional
+        :yield: the chunks of rows
+        :rtype: pd.DataFrame
+        """
+        for _, df in self.iter_days():
+            for start in range(0, len(df), chunk_size):
+                yield df.iloc[start:start + chunk_size]
+
+    def to_df(self) -> 'pd.DataFrame':
+        """Returns a new dataframe with all the rows of the view.
+
+        If the reqDay column is selected, it adds also the Date column.
+
+        :return: the concatenated dataframe or None if the view is empty
+        :rtype: pd.DataFrame
+        """
+        all_df = [df for _, df in self.iter_days()]
+        if not all_df:
+            return None
+
+        all_df = pd.concat(all_df)
+        if 'reqDay' in all_df.columns:
+            all_df['Date'] = pd.to_datetime(all_df.reqDay, unit='s')
+        return all_df
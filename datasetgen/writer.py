@@ -0,0 +1,129 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePath
+from typing import Dict, List
+
+from .formats import OutputFormat
+from .manifest import file_sha256
+
+
+class DayWriter(object):
+
+    """Writes dataset days concurrently on a bounded thread pool.
+
+    The days are serialized and compressed by the pool threads. When too
+    many days are waiting to be written, `submit` blocks until the oldest
+    ones are done, so the memory used by the pending days is bounded.
+    """
+
+    def __init__(self, dest_folder: 'PurePath',
+                 output_format: 'OutputFormat',
+                 workers: int = -1, max_pending: int = -1,
+                 checksum: bool = False):
+        """Initialize the writer pool.
+
+        :param dest_folder: the destination folder
+        :type dest_folder: PurePath
+        :param output_format: the file format of the days
+        :type output_format: OutputFormat
+        :param workers: number of writer threads, -1 to use as many
+            threads as the CPUs, defaults to -1
+        :type workers: int, optional
+        :param max_pending: maximum number of days waiting to be written,
+            -1 means 2 days per thread, defaults to -1
+        :type max_pending: int, optional
+        :param checksum: compute the sha256 of the written files in the
+            pool threads, defaults to False
+        :type checksum: bool, optional
+        """
+        if workers == -1:
+            workers = os.cpu_count()
+        workers = max(workers, 1)
+
+        self._dest_folder = Path(dest_folder)
+        self._output_format = output_format
+        self._max_pending = max_pending if max_pending > 0 else 2 * workers
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._checksum = checksum
+        self._pending = deque()
+        self._written = []
+        self._checksums = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        else:
+            self.close()
+
+    @property
+    def written(self) -> List['Path']:
+        """Returns the files written so far, in submission order."""
+        return self._written
+
+    @property
+    def checksums(self) -> Dict['Path', str]:
+        """Returns the sha256 of the written files, if enabled."""
+        return self._checksums
+
+    def submit(self, day) -> List['Path']:
+        """Queues a day to be written.
+
+        :param day: the day to write
+        :type day: Day
+        :return: the files completed in the meantime, in submission order
+        :rtype: List[Path]
+        """
+        file_path = day.file_path(self._dest_folder, self._output_format)
+        self._pending.append((
+            file_path,
+            self._executor.submit(self._write, day, file_path)
+        ))
+        return self._collect(wait=len(self._pending) >= self._max_pending)
+
+    def close(self) -> List['Path']:
+        """Waits for all the pending days and stops the pool.
+
+        :return: the files completed in the meantime, in submission order
+        :rtype: List[Path]
+        """
+        done = []
+        while self._pending:
+            done += self._collect(wait=True)
+        self._executor.shutdown(wait=True)
+        return done
+
+    def _write(self, day, file_path: 'Path') -> str:
+        """Writes a day and computes its checksum if enabled.
+
+        :param day: the day to write
+        :type day: Day
+        :param file_path: the day's file
+        :type file_path: Path
+        :return: the sha256 of the file or None
+        :rtype: str
+        """
+        day.save(self._dest_folder, self._output_format)
+        return file_sha256(file_path) if self._checksum else None
+
+    def _collect(self, wait: bool = False) -> List['Path']:
+        """Collects the completed writes in submission order.
+
+        :param wait: wait at least for the oldest write, defaults to False
+        :type wait: bool, optional
+        :return: the completed files
+        :rtype: List[Path]
+        """
+        done = []
+        while self._pending and (wait or self._pending[0][1].done()):
+            file_path, future = self._pending.popleft()
+            sha256 = future.result()
+            if sha256 is not None:
+                self._checksums[file_path] = sha256
+            done.append(file_path)
+            wait = False
+        self._written += done
+        return done
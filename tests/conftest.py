@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pytest
+
+from datasetgen.formats import dataset_files
+from datasetgen.generator import Generator
+
+# A small dataset configuration, generated in a fraction of a second
+CONFIG = {
+    'seed': 42,
+    'num_days': 6,
+    'num_req_x_day': 200,
+    'function': {
+        'function_name': "RecencyFocusedDataset",
+        'kwargs': {
+            'num_files': 500,
+            'min_file_size': 100,
+            'max_file_size': 4000,
+            'perc_files_x_day': 10.0,
+            'size_generator_function': "gen_random_sizes",
+        },
+    },
+}
+
+
+@pytest.fixture
+def config() -> dict:
+    """A copy of the test configuration."""
+    return dict(CONFIG)
+
+
+@pytest.fixture
+def function() -> dict:
+    """The generator function of the test configuration."""
+    return CONFIG['function']
+
+
+@pytest.fixture
+def make_generator(tmp_path):
+    """Returns a factory of generators with the test configuration.
+
+    The keyword arguments replace the configuration keys and the
+    destination folder is a sub folder of the test temporary folder.
+    """
+    def factory(folder: str = "dataset", **config) -> 'Generator':
+        return Generator(config={**CONFIG, **config},
+                         dest_folder=Path(tmp_path).joinpath(folder))
+    return factory
+
+
+@pytest.fixture
+def folder_files():
+    """Returns a function that reads the day files of a dataset folder.
+
+    The function returns the content of each day file, by file name.
+    """
+    def read(folder: 'Path') -> dict:
+        return {
+            file_.name: file_.read_bytes()
+            for _, file_ in dataset_files(folder)
+        }
+    return read
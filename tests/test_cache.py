@@ -0,0 +1,63 @@
+import pytest
+
+from datasetgen.cache import DatasetCache
+from datasetgen.formats import dataset_files
+
+
+@pytest.fixture
+def cached(make_generator, function, tmp_path):
+    generator = make_generator()
+    list(generator.stream(**function))
+    cache = DatasetCache(tmp_path.joinpath("cache"))
+    key = generator.dataset_key(**function)
+    cache.store(key, generator.dest_folder, [
+        file_ for _, file_ in dataset_files(generator.dest_folder)
+    ])
+    return cache, key, generator
+
+
+def test_restore_gives_stored_dataset(make_generator, function, cached,
+                                      folder_files):
+    cache, key, generator = cached
+    # The days of a previous dataset in the folder are removed
+    restored = make_generator("restored", num_days=8)
+    list(restored.stream(**function))
+
+    assert key in cache
+    assert cache.restore(key, restored.dest_folder)
+    assert folder_files(restored.dest_folder) == \
+        folder_files(generator.dest_folder)
+
+
+def test_restore_miss(make_generator, cached):
+    cache, _, _ = cached
+    assert not cache.restore("missing", make_generator("miss").dest_folder)
+
+
+@pytest.mark.parametrize("changes", [
+    {'seed': 7}, {'num_days': 7}, {'num_req_x_day': 100},
+    {'output_format': "parquet"}, {'cpu_work': {'num_cpus': 2}},
+])
+def test_key_depends_on_config(make_generator, function, changes):
+    assert make_generator(**changes).dataset_key(**function) != \
+        make_generator().dataset_key(**function)
+
+
+def test_key_depends_on_function_kwargs(make_generator, function):
+    kwargs = {**function['kwargs'], 'num_files': 501}
+    assert make_generator().dataset_key(function['function_name'], kwargs) != \
+        make_generator().dataset_key(**function)
+
+
+def test_evict_least_recently_used(make_generator, function, cached):
+    cache, key, generator = cached
+    other = make_generator("other", seed=7)
+    list(other.stream(**function))
+    other_key = other.dataset_key(**function)
+    cache = DatasetCache(cache.cache_dir, max_size=cache.size)
+    cache.store(other_key, other.dest_folder, [
+        file_ for _, file_ in dataset_files(other.dest_folder)
+    ])
+
+    assert other_key in cache
+    assert key not in cache
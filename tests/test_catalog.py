@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from datasetgen.utils import FileCatalog, gen_random_files
+
+
+@pytest.fixture
+def sparse():
+    return FileCatalog(np.array([2, 5, 9, 20]), np.array([1., 2., 3., 4.]),
+                       np.array([0, 1, 0, 1]), np.array([0, 0, 1, 1]))
+
+
+@pytest.fixture
+def contiguous():
+    return gen_random_files(10, 1, 100, start_from=100,
+                            rng=np.random.default_rng(0))
+
+
+def test_take(sparse):
+    columns = sparse.take(np.array([3, 0, 0]))
+    np.testing.assert_array_equal(columns['Filename'], [20, 2, 2])
+    np.testing.assert_array_equal(columns['Size'], [4., 1., 1.])
+    np.testing.assert_array_equal(columns['Protocol'], [1, 0, 0])
+
+
+@pytest.mark.parametrize("catalog", ["sparse", "contiguous"])
+def test_lookup(catalog, request):
+    catalog = request.getfixturevalue(catalog)
+    ids = catalog.ids[[2, 0, 3, 2]]
+    columns = catalog.lookup(ids)
+    np.testing.assert_array_equal(columns['Filename'], ids)
+    np.testing.assert_array_equal(columns['Size'], catalog.sizes[[2, 0, 3, 2]])
+
+
+@pytest.mark.parametrize("ids", [[3], [0], [21], [2, 6]])
+def test_lookup_missing_sparse(sparse, ids):
+    with pytest.raises(Exception, match="not in the catalog"):
+        sparse.lookup(np.array(ids))
+
+
+@pytest.mark.parametrize("ids", [[99], [110], [100, 120]])
+def test_lookup_missing_contiguous(contiguous, ids):
+    with pytest.raises(Exception, match="not in the catalog"):
+        contiguous.lookup(np.array(ids))
+
+
+def test_to_dict_round_trip(sparse):
+    catalog = FileCatalog.from_dict(sparse.to_dict())
+    for name, array in sparse.to_dict().items():
+        np.testing.assert_array_equal(catalog.to_dict()[name], array)
+
+
+def test_concat(sparse, contiguous):
+    catalog = FileCatalog.concat([contiguous, sparse])
+
+    assert len(catalog) == len(sparse) + len(contiguous)
+    assert np.all(np.diff(catalog.ids) > 0)
+    np.testing.assert_array_equal(catalog.lookup(sparse.ids)['Size'],
+                                  sparse.sizes)
+    np.testing.assert_array_equal(catalog.lookup(contiguous.ids)['Size'],
+                                  contiguous.sizes)
+    np.testing.assert_array_equal(
+        catalog.popularity[catalog.positions(sparse.ids)], sparse.popularity)
+
+
+def test_concat_overlapping_ids(sparse):
+    with pytest.raises(AssertionError, match="not unique"):
+        FileCatalog.concat([sparse, sparse])
@@ -0,0 +1,36 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from datasetgen.generator import Day
+
+
+def _append_rows(date: 'datetime.date') -> 'pd.DataFrame':
+    day = Day(date)
+    day.append({'Filename': 1, 'Size': 2.})
+    day.bulk_append([{'Filename': 3, 'Size': 1.}] * 10)
+    return day.df
+
+
+def test_appended_cpu_work_is_reproducible():
+    date = datetime.date(2020, 1, 1)
+    pd.testing.assert_frame_equal(_append_rows(date), _append_rows(date))
+
+
+def test_appended_cpu_work_depends_on_date():
+    first = _append_rows(datetime.date(2020, 1, 1))
+    second = _append_rows(datetime.date(2020, 1, 2))
+    assert not np.array_equal(first.WrapWC, second.WrapWC)
+
+
+def test_bulk_append_columns_uses_given_rng():
+    columns = {'Filename': np.arange(10), 'Size': np.ones(10)}
+    first = Day(datetime.date(2020, 1, 1)).bulk_append_columns(
+        columns, rng=np.random.default_rng(1)).df
+    second = Day(datetime.date(2020, 1, 1)).bulk_append_columns(
+        columns, rng=np.random.default_rng(1)).df
+    default = Day(datetime.date(2020, 1, 1)).bulk_append_columns(columns).df
+
+    pd.testing.assert_frame_equal(first, second)
+    assert not first.equals(default)
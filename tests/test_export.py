@@ -0,0 +1,54 @@
+import io
+import tarfile
+import zipfile
+
+import pandas as pd
+import pytest
+
+from datasetgen.export import iter_export
+from datasetgen.formats import cast_columns
+
+
+@pytest.fixture
+def generator(make_generator, function):
+    generator = make_generator()
+    list(generator.prepare(**function))
+    return generator
+
+
+def _check_days(generator, members: dict):
+    assert list(members) == [
+        f"dataset_{day.date}.csv" for day in generator.days
+    ]
+    for day, df in zip(generator.days, members.values()):
+        pd.testing.assert_frame_equal(cast_columns(df), day.df)
+
+
+def test_zip_export(generator):
+    data = b"".join(iter_export(generator.view(), "zip"))
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        _check_days(generator, {
+            name: pd.read_csv(archive.open(name))
+            for name in archive.namelist()
+        })
+
+
+def test_tar_export(generator):
+    data = b"".join(iter_export(generator.view(), "tar"))
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as archive:
+        _check_days(generator, {
+            member.name: pd.read_csv(archive.extractfile(member))
+            for member in archive
+        })
+
+
+def test_parquet_export(generator):
+    data = b"".join(iter_export(generator.view(), "parquet"))
+    pd.testing.assert_frame_equal(
+        cast_columns(pd.read_parquet(io.BytesIO(data))),
+        generator.df.drop(columns="Date").reset_index(drop=True))
+
+
+def test_unknown_export(generator):
+    with pytest.raises(Exception, match="does not exist"):
+        list(iter_export(generator.view(), "rar"))
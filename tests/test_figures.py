@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from datasetgen.ui.figures import (FIGURES, FigureCache, lttb, make_figure,
+                                   reservoir_sample)
+
+
+@pytest.mark.parametrize("num_points", [0, 1, 2, 3, 10, 999])
+def test_lttb_budget(num_points):
+    x = np.arange(1000)
+    y = np.sin(x / 10.)
+    selected = lttb(x, y, num_points)
+
+    assert len(selected) == num_points
+    assert np.all(np.diff(selected) > 0)
+    if num_points >= 2:
+        assert selected[0] == 0 and selected[-1] == len(x) - 1
+
+
+def test_lttb_keeps_peak():
+    y = np.zeros(1000)
+    y[517] = 100.
+    assert 517 in lttb(np.arange(1000), y, 20)
+
+
+def test_lttb_small_series():
+    np.testing.assert_array_equal(lttb(np.arange(5), np.ones(5), 10),
+                                  np.arange(5))
+
+
+@pytest.mark.parametrize("num_points", [1, 50, 1000])
+def test_reservoir_budget(num_points):
+    chunks = [np.arange(start, start + 300) for start in range(0, 3000, 300)]
+    positions, values = reservoir_sample(chunks, num_points)
+
+    assert len(positions) == len(values) == num_points
+    assert np.all(np.diff(positions) > 0)
+    np.testing.assert_array_equal(values, positions)
+
+
+def test_reservoir_keeps_small_streams():
+    positions, values = reservoir_sample([np.arange(10), np.arange(5)], 100)
+    np.testing.assert_array_equal(positions, np.arange(15))
+    np.testing.assert_array_equal(
+        values, np.concatenate([np.arange(10), np.arange(5)]))
+
+
+def test_reservoir_is_uniform():
+    chunks = [np.arange(start, start + 1000)
+              for start in range(0, 10000, 1000)]
+    positions, _ = reservoir_sample(chunks, 2000,
+                                    rng=np.random.default_rng(1))
+    # Each tenth of the stream gets about a tenth of the sample
+    counts = np.bincount(positions // 1000, minlength=10)
+    assert np.all(np.abs(counts - 200) < 60)
+
+
+def test_reservoir_empty_stream():
+    positions, values = reservoir_sample([], 10)
+    assert len(positions) == len(values) == 0
+
+
+@pytest.mark.parametrize("name", list(FIGURES))
+def test_figures_respect_budget(make_generator, function, name):
+    generator = make_generator()
+    list(generator.prepare(**function))
+    budget = 50
+    figure = make_figure(name, generator, budget)
+
+    for trace in figure.data:
+        assert len(trace.x) <= max(budget, 3 * len(generator.days))
+
+
+def test_figure_cache(make_generator, function):
+    generator = make_generator()
+    list(generator.prepare(**function))
+    cache = FigureCache()
+    figure = cache.figure('file-sizes', generator)
+
+    assert cache.figure('file-sizes', generator) is figure
+    generator.clean()
+    list(generator.prepare(**function))
+    assert cache.figure('file-sizes', generator) is not figure
+    assert cache.discard(generator) == 2
+    assert len(cache) == 0
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from datasetgen.formats import FORMATS, dataset_files, format_of, get_format
+from datasetgen.generator import Generator
+
+FORMAT_COMPRESSIONS = [
+    (name, compression)
+    for name, format_ in FORMATS.items()
+    for compression in format_.compressions
+]
+
+
+@pytest.mark.parametrize("name,compression", FORMAT_COMPRESSIONS)
+def test_save_open_round_trip(make_generator, function, name, compression):
+    generator = make_generator(output_format=name, compression=compression)
+    list(generator.prepare(**function))
+    list(generator.save())
+
+    files = dataset_files(generator.dest_folder)
+    assert len(files) == len(generator.days)
+    assert all(repr(format_of(file_)).startswith(name) for _, file_ in files)
+
+    loaded = Generator()
+    loaded.open_data(generator.dest_folder)
+    pd.testing.assert_frame_equal(loaded.df, generator.df)
+
+
+@pytest.mark.parametrize("name", list(FORMATS))
+def test_none_compression(name):
+    assert get_format(name, "none").compression == "none"
+
+
+def test_feather_uncompressed_alias():
+    assert get_format("feather", "uncompressed").compression == "none"
+
+
+def test_unknown_compression():
+    with pytest.raises(Exception, match="not supported"):
+        get_format("csv", "zstd")
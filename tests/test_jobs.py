@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+from datasetgen.ui.jobs import CANCELLED, DONE, ERROR, JobManager
+
+
+@pytest.fixture
+def jobs():
+    manager = JobManager(workers=2)
+    yield manager
+    manager.shutdown()
+
+
+def _wait(job, timeout: float = 5.):
+    deadline = time.time() + timeout
+    while not job.finished:
+        assert time.time() < deadline, f"{job} did not finish"
+        time.sleep(0.001)
+    return job
+
+
+def test_key_removed_when_jobs_end(jobs):
+    release = threading.Event()
+    job = jobs.submit("wait", lambda job: release.wait(5), key="session")
+    assert jobs.busy("session")
+
+    release.set()
+    _wait(job)
+    assert not jobs.busy("session")
+
+
+def test_discard_cancels_key_jobs(jobs):
+    started = threading.Event()
+
+    def steps():
+        while True:
+            time.sleep(0.001)
+            yield
+
+    def task(job):
+        started.set()
+        return job.run_steps(steps())
+    running = jobs.submit("loop", task, key="session")
+    pending = jobs.submit("loop", task, key="session")
+    other = jobs.submit("other", lambda job: "ok", key="other")
+    assert started.wait(5)
+
+    assert jobs.discard("session") == 2
+    assert _wait(running).status == CANCELLED
+    assert _wait(pending).status == CANCELLED
+    assert _wait(other).status == DONE
+    assert not jobs.busy("session")
+
+
+def test_same_key_jobs_run_in_order(jobs):
+    order = []
+
+    def task(name):
+        def run(job):
+            order.append(f"{name} start")
+            time.sleep(0.01)
+            order.append(f"{name} end")
+            return name
+        return run
+    first = jobs.submit("first", task("first"), key="session")
+    second = jobs.submit("second", task("second"), key="session")
+
+    assert _wait(second).result == "second"
+    assert _wait(first).status == DONE and first.progress == 100
+    assert order == ["first start", "first end", "second start", "second end"]
+
+
+def test_cancel_running_job(jobs):
+    started = threading.Event()
+
+    def steps():
+        for step in range(10000):
+            started.set()
+            time.sleep(0.001)
+            yield step
+
+    job = jobs.submit("steps", lambda job: job.run_steps(steps()))
+    assert started.wait(5)
+    assert jobs.cancel(job.id)
+
+    assert _wait(job).status == CANCELLED
+    assert job.result is False
+    assert not jobs.cancel(job.id)
+
+
+def test_error_is_reported(jobs):
+    def fail(job):
+        raise Exception("ERROR: broken task")
+    job = jobs.submit("fail", fail, key="session")
+
+    assert _wait(job).status == ERROR
+    assert job.error == "ERROR: broken task"
+    assert job.to_dict()['status'] == ERROR
+    assert not jobs.busy("session")
+
+
+def test_when_idle(jobs):
+    release = threading.Event()
+    changed = []
+    job = jobs.submit("wait", lambda job: release.wait(5), key="session")
+
+    assert not jobs.when_idle("session", lambda: changed.append("session"))
+    assert jobs.when_idle("other", lambda: changed.append("other"))
+    release.set()
+    _wait(job)
+    assert jobs.when_idle("session", lambda: changed.append("session"))
+    assert changed == ["other", "session"]
@@ -0,0 +1,95 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from datasetgen.formats import CSVFormat
+from datasetgen.generator import Generator
+from datasetgen.utils import COLUMNS
+
+
+@pytest.fixture
+def saved(make_generator, function):
+    generator = make_generator()
+    list(generator.prepare(**function))
+    list(generator.save())
+    return generator
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_days_in_date_order(saved, workers):
+    loaded = Generator()
+    loaded.open_data(saved.dest_folder, workers=workers)
+    assert [day.date for day in loaded.days] == \
+        [day.date for day in saved.days]
+
+
+def test_date_range(saved):
+    start_date = saved.days[1].date
+    end_date = saved.days[3].date
+    loaded = Generator()
+    loaded.open_data(saved.dest_folder, start_date=start_date,
+                     end_date=end_date)
+
+    assert [day.date for day in loaded.days] == \
+        [day.date for day in saved.days[1:4]]
+    for loaded_day, day in zip(loaded.days, saved.days[1:4]):
+        pd.testing.assert_frame_equal(loaded_day.df, day.df)
+
+
+def test_columns(saved):
+    loaded = Generator()
+    loaded.open_data(saved.dest_folder, columns=['Filename', 'Size'])
+
+    for loaded_day, day in zip(loaded.days, saved.days):
+        assert list(loaded_day.df.columns) == ['Filename', 'Size']
+        pd.testing.assert_frame_equal(loaded_day.df,
+                                      day.df[['Filename', 'Size']])
+    assert loaded.stats.summary() == saved.stats.summary()
+
+
+def test_open_replaces_days(saved):
+    loaded = Generator()
+    loaded.open_data(saved.dest_folder, end_date=saved.days[0].date)
+    loaded.open_data(saved.dest_folder, start_date=saved.days[-1].date)
+    assert [day.date for day in loaded.days] == [saved.days[-1].date]
+
+
+def _legacy_csv(tmp_path, **values) -> 'pd.DataFrame':
+    df = pd.DataFrame({column: np.arange(3) for column in COLUMNS})
+    df = df.astype({'JobSuccess': bool, 'Size': float})
+    for column, value in values.items():
+        df[column] = df[column].astype(object)
+        df.loc[1, column] = value
+    file_path = tmp_path.joinpath(f"dataset_{datetime.date(2020, 1, 1)}.csv")
+    df.to_csv(file_path, index=False)
+    return file_path
+
+
+def test_csv_legacy_empty_columns(tmp_path):
+    file_path = _legacy_csv(tmp_path, Region=None)
+    df = CSVFormat("none").read(file_path)
+
+    assert df.Region.isna().sum() == 1
+    assert df.Filename.dtype == np.int64
+    assert df.Size.dtype == np.float64
+
+
+def test_csv_malformed_values_raise(tmp_path):
+    file_path = _legacy_csv(tmp_path, Filename="broken")
+    with pytest.raises(ValueError):
+        CSVFormat("none").read(file_path)
+
+
+def test_csv_malformed_values_with_empty_columns_raise(tmp_path):
+    file_path = _legacy_csv(tmp_path, Filename="broken", Region=None)
+    with pytest.raises(ValueError):
+        CSVFormat("none").read(file_path)
+
+
+def test_csv_unknown_columns_raise(tmp_path):
+    file_path = _legacy_csv(tmp_path)
+    with pytest.raises(ValueError):
+        CSVFormat("none").read(file_path, columns=['Filename', 'Missing'])
+
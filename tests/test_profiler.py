@@ -0,0 +1,73 @@
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+import dataset_generator
+from datasetgen import profiler
+from datasetgen.profiler import STAGES, Profiler
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_gen_profile(config, tmp_path, monkeypatch, workers):
+    monkeypatch.chdir(tmp_path)
+    tmp_path.joinpath("config.json").write_text(
+        json.dumps({**config, 'dest_folder': "dataset"}))
+    result = CliRunner().invoke(dataset_generator.app, [
+        "gen", "config.json", "--workers", str(workers), "--profile",
+        "--profile-json", "profile.json", "--profile-trace", "trace.json",
+    ])
+    assert result.exit_code == 0, result.output
+    assert profiler.current() is None
+
+    num_requests = config['num_days'] * config['num_req_x_day']
+    with open(tmp_path.joinpath("profile.json")) as profile_file:
+        profile = json.load(profile_file)
+    summary = {cur['stage']: cur for cur in profile['summary']}
+    assert list(summary) == list(STAGES)
+    assert summary['function_init']['calls'] == 1
+    for name in ('generate', 'cpu_work', 'serialize', 'compress'):
+        assert summary[name]['rows'] == num_requests
+    assert summary['generate']['calls'] == config['num_days']
+    assert len(profile['records']) == sum(
+        cur['calls'] for cur in profile['summary'])
+    assert "generate" in result.output
+
+    with open(tmp_path.joinpath("trace.json")) as trace_file:
+        trace = json.load(trace_file)
+    events = trace['traceEvents']
+    assert len(events) == len(profile['records'])
+    for event in events:
+        assert event['ph'] == "X"
+        assert event['name'] in STAGES
+        assert event['ts'] >= 0 and event['dur'] >= 0
+        assert set(event['args']) == {'cpu', 'rows', 'peak'}
+    # With more workers the days are generated in other processes
+    generate_pids = {event['pid'] for event in events
+                     if event['name'] == "generate"}
+    init_pids = {event['pid'] for event in events
+                 if event['name'] == "function_init"}
+    assert (generate_pids == init_pids) == (workers == 1)
+
+
+def test_summary_merges_worker_records():
+    main = Profiler(memory=False)
+    worker = Profiler(memory=True).start()
+    try:
+        with worker.stage('generate', 10):
+            pass
+        with worker.stage('generate') as record:
+            record.rows = 5
+    finally:
+        worker.stop()
+    with main.stage('serialize', 15):
+        pass
+    main.extend(worker.drain())
+
+    assert worker.records == []
+    assert [(cur['stage'], cur['calls'], cur['rows'])
+            for cur in main.summary()] == \
+        [('generate', 2, 15), ('serialize', 1, 15)]
+    # Only the worker traced the memory
+    assert main.summary()[0]['peak'] >= 0
+    assert main.summary()[1]['peak'] == -1
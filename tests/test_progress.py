@@ -0,0 +1,89 @@
+import pytest
+
+from datasetgen import progress
+from datasetgen.progress import ProgressInfo, ProgressReporter, Throttle
+
+
+class FakeClock(object):
+
+    """Replaces the time module of the progress module."""
+
+    def __init__(self):
+        self.now = 100.
+
+    def perf_counter(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(progress, "time", fake)
+    return fake
+
+
+def _updates(throttle, clock, total: int, step: float, stage: str = "save"):
+    for done in range(total + 1):
+        throttle(ProgressInfo(stage, done, total, 0.))
+        clock.now += step
+
+
+def test_time_interval(clock):
+    received = []
+    # One update every 0.125 s, forwarded every 0.5 s
+    _updates(Throttle(received.append, interval=0.5), clock, 21, 0.125)
+
+    assert [info.done for info in received] == [0, 4, 8, 12, 16, 20, 21]
+
+
+def test_days(clock):
+    received = []
+    _updates(Throttle(received.append, interval=0, days=3), clock, 10, 1.)
+
+    assert [info.done for info in received] == [0, 3, 6, 9, 10]
+
+
+def test_time_or_days(clock):
+    received = []
+    throttle = Throttle(received.append, interval=2., days=4)
+    _updates(throttle, clock, 5, 0.5)
+    clock.now += 10.
+    _updates(throttle, clock, 6, 5., stage="stream")
+
+    assert [(info.stage, info.done) for info in received] == [
+        ("save", 0), ("save", 4), ("save", 5),
+        ("stream", 0), ("stream", 1), ("stream", 2), ("stream", 3),
+        ("stream", 4), ("stream", 5), ("stream", 6),
+    ]
+
+
+def test_final_update_always_forwarded(clock):
+    received = []
+    throttle = Throttle(received.append, interval=60.)
+    _updates(throttle, clock, 7, 0.01)
+
+    assert [info.done for info in received] == [0, 7]
+    assert received[-1].percent == 100
+
+
+def test_new_stage_forwarded(clock):
+    received = []
+    throttle = Throttle(received.append, interval=60.)
+    throttle(ProgressInfo("prepare", 1, 4, 0.))
+    throttle(ProgressInfo("prepare", 2, 4, 0.))
+    throttle(ProgressInfo("save", 1, 4, 0.))
+
+    assert [(info.stage, info.done) for info in received] == \
+        [("prepare", 1), ("save", 1)]
+
+
+def test_reporter(clock):
+    received = []
+    reporter = ProgressReporter(received.append, 4, "prepare")
+    clock.now += 2.
+    reporter.update().update(3)
+
+    assert [(info.done, info.percent) for info in received] == \
+        [(0, 0), (1, 25), (4, 100)]
+    assert received[-1].elapsed == 2.
+    assert ProgressInfo("empty", 0, 0, 0.).percent == 100
@@ -0,0 +1,92 @@
+from pathlib import Path
+
+import pytest
+
+from datasetgen.formats import dataset_files
+from datasetgen.manifest import MANIFEST_NAME, Manifest
+
+
+@pytest.fixture
+def same_dataset(folder_files):
+    """Checks that a generated dataset is equal to the reference one."""
+    def check(generator, reference):
+        assert folder_files(generator.dest_folder) == \
+            folder_files(reference.dest_folder)
+        manifest = Manifest.load(generator.dest_folder)
+        reference_manifest = Manifest.load(reference.dest_folder)
+        assert manifest.days == reference_manifest.days
+        assert manifest.next_day == reference.num_days
+    return check
+
+
+@pytest.fixture
+def reference(make_generator, function):
+    generator = make_generator("reference")
+    list(generator.stream(**function))
+    return generator
+
+
+def test_resume_interrupted_stream(make_generator, function, reference,
+                                   same_dataset):
+    generator = make_generator()
+    progress = generator.stream(**function, write_workers=1)
+    next(progress)
+    next(progress)
+    progress.close()
+    written = Manifest.load(generator.dest_folder).days
+    assert 0 < len(written) < generator.num_days
+
+    list(make_generator().stream(**function, resume=True))
+    same_dataset(generator, reference)
+
+
+def test_resume_replaces_missing_and_corrupted_days(make_generator, function,
+                                                    reference, same_dataset):
+    generator = make_generator()
+    list(generator.stream(**function))
+    files = [file_ for _, file_ in dataset_files(generator.dest_folder)]
+    files[1].unlink()
+    files[3].write_bytes(b"corrupted")
+
+    resumed = make_generator()
+    list(resumed.stream(**function, resume=True))
+    same_dataset(resumed, reference)
+    assert len(resumed.stats.num_req) == resumed.num_days
+
+
+def test_resume_extends_dataset(make_generator, function, reference,
+                                same_dataset):
+    generator = make_generator(num_days=3)
+    list(generator.stream(**function))
+    list(make_generator().stream(**function, resume=True))
+    same_dataset(generator, reference)
+
+
+def test_resume_rejects_different_config(make_generator, function):
+    list(make_generator().stream(**function))
+    with pytest.raises(Exception, match="different configuration"):
+        list(make_generator(seed=7).stream(**function, resume=True))
+
+
+def test_manifest_is_saved_atomically(make_generator, function):
+    generator = make_generator()
+    list(generator.stream(**function))
+    assert generator.dest_folder.joinpath(MANIFEST_NAME).exists()
+    assert not list(generator.dest_folder.glob(".*.tmp"))
+
+
+def test_stream_and_resume_relative_dest_folder(make_generator, function,
+                                                reference, tmp_path,
+                                                monkeypatch, same_dataset):
+    monkeypatch.chdir(tmp_path)
+    generator = make_generator()
+    generator.dest_folder = Path("relative")
+    list(generator.stream(**function))
+    same_dataset(generator, reference)
+
+    files = [file_ for _, file_ in dataset_files(generator.dest_folder)]
+    files[2].unlink()
+    resumed = make_generator()
+    resumed.dest_folder = Path("relative")
+    list(resumed.stream(**function, resume=True))
+    same_dataset(resumed, reference)
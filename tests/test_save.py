@@ -0,0 +1,42 @@
+from pathlib import Path
+
+import pytest
+
+from datasetgen.formats import dataset_files
+
+
+def test_save_replaces_previous_dataset(make_generator, function):
+    generator = make_generator()
+    list(generator.prepare(**function))
+    list(generator.save())
+
+    shorter = make_generator(num_days=2)
+    list(shorter.prepare(**function))
+    list(shorter.save(workers=2))
+
+    files = dataset_files(shorter.dest_folder)
+    assert [date for date, _ in files] == [day.date for day in shorter.days]
+
+
+def test_save_without_days_keeps_dataset(make_generator, function):
+    generator = make_generator()
+    list(generator.prepare(**function))
+    list(generator.save())
+    files = dataset_files(generator.dest_folder)
+
+    with pytest.raises(Exception, match="no days to save"):
+        list(make_generator().save())
+    assert dataset_files(generator.dest_folder) == files
+
+
+def test_save_relative_dest_folder(make_generator, function, tmp_path,
+                                   monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    generator = make_generator()
+    generator.dest_folder = Path("relative")
+    list(generator.prepare(**function))
+    list(generator.save())
+    list(generator.save())
+
+    files = dataset_files(Path("relative"))
+    assert [date for date, _ in files] == [day.date for day in generator.days]
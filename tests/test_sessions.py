@@ -0,0 +1,66 @@
+import sys
+import threading
+
+import pandas as pd
+
+from datasetgen.ui.sessions import SessionPool
+
+
+def test_sessions_are_isolated(make_generator):
+    pool = SessionPool(make_generator)
+    first, second = pool.get("first"), pool.get("second")
+
+    assert first.generator is not second.generator
+    assert pool.get("first") is first
+    first.params("function")['seed'] = 7
+    assert second.params("function") == {}
+
+
+def test_least_recently_used_session_is_evicted(make_generator):
+    evicted = []
+    pool = SessionPool(make_generator, max_sessions=2,
+                       on_evict=evicted.append)
+    first = pool.get("first")
+    pool.get("second")
+    pool.get("first")
+    pool.get("third")
+
+    assert "second" not in pool
+    assert [session.id for session in evicted] == ["second"]
+    assert pool.get("first") is first
+    assert pool.remove("first")
+    assert not pool.remove("first")
+
+
+def test_idle_sessions_are_evicted(make_generator):
+    pool = SessionPool(make_generator, idle_timeout=1e-9)
+    pool.get("first")
+    pool.get("second")
+    assert "first" not in pool and len(pool) == 1
+
+
+def test_concurrent_prepare(make_generator, function):
+    def prepare(seed: int) -> 'pd.DataFrame':
+        generator = make_generator(f"seed_{seed}", seed=seed)
+        list(generator.prepare(**function))
+        return generator.df
+
+    expected = {seed: prepare(seed) for seed in (1, 2)}
+    results = {}
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [
+            threading.Thread(
+                target=lambda seed=seed: results.update({seed: prepare(seed)}))
+            for seed in expected
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    for seed, df in expected.items():
+        pd.testing.assert_frame_equal(results[seed], df)
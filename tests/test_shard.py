@@ -0,0 +1,72 @@
+import pytest
+
+from datasetgen.formats import dataset_files
+from datasetgen.manifest import MANIFEST_NAME, Manifest
+from datasetgen.shard import merge_shards, parse_shard, shard_days
+
+
+def _stream_shards(make_generator, function, count: int, **config) -> list:
+    folders = []
+    for index in range(1, count + 1):
+        generator = make_generator(f"shard_{index}", **config)
+        list(generator.stream(**function, shard=(index, count)))
+        folders.append(generator.dest_folder)
+    return folders
+
+
+@pytest.mark.parametrize("output_format", ["csv", "parquet"])
+@pytest.mark.parametrize("count", [1, 2, 4])
+def test_merge_equals_single_run(make_generator, function, folder_files,
+                                 tmp_path, output_format, count):
+    single = make_generator("single", output_format=output_format)
+    list(single.stream(**function))
+    folders = _stream_shards(make_generator, function, count,
+                             output_format=output_format)
+
+    merged = merge_shards(reversed(folders), tmp_path.joinpath("merged"))
+
+    assert folder_files(tmp_path.joinpath("merged")) == \
+        folder_files(single.dest_folder)
+    assert merged.days == Manifest.load(single.dest_folder).days
+    assert tmp_path.joinpath("merged", MANIFEST_NAME).read_bytes() == \
+        single.dest_folder.joinpath(MANIFEST_NAME).read_bytes()
+
+
+def test_merge_missing_shard(make_generator, function, tmp_path):
+    folders = _stream_shards(make_generator, function, 3)
+    with pytest.raises(Exception, match="missing shards 2/3"):
+        merge_shards([folders[0], folders[2]], tmp_path.joinpath("merged"))
+
+
+def test_merge_different_config(make_generator, function, tmp_path):
+    folders = _stream_shards(make_generator, function, 2)
+    other = make_generator("other", seed=7)
+    list(other.stream(**function, shard=(2, 2)))
+    with pytest.raises(Exception, match="different configuration"):
+        merge_shards([folders[0], other.dest_folder],
+                     tmp_path.joinpath("merged"))
+
+
+def test_merge_corrupted_shard(make_generator, function, tmp_path):
+    folders = _stream_shards(make_generator, function, 2)
+    _, file_ = dataset_files(folders[1])[0]
+    file_.write_bytes(b"corrupted")
+    with pytest.raises(Exception, match="incomplete or corrupted"):
+        merge_shards(folders, tmp_path.joinpath("merged"))
+
+
+@pytest.mark.parametrize("num_days,count", [(6, 4), (365, 7), (3, 5)])
+def test_shard_days_partition(num_days, count):
+    days = [day for index in range(1, count + 1)
+            for day in shard_days(num_days, index, count)]
+    assert days == list(range(num_days))
+
+
+@pytest.mark.parametrize("value", ["1", "0/2", "3/2", "a/b"])
+def test_parse_shard_errors(value):
+    with pytest.raises(Exception, match="ERROR"):
+        parse_shard(value)
+
+
+def test_parse_shard():
+    assert parse_shard("2/4") == (2, 4)
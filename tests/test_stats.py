@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from datasetgen.generator import Generator
+
+
+def _baseline(df) -> dict:
+    """The statistics computed from the concatenated requests."""
+    by_day = df.groupby('reqDay')
+    return {
+        'file_requests': df.Filename.value_counts().to_dict(),
+        'day_size': by_day.apply(
+            lambda group: group.drop_duplicates('Filename').Size.sum()
+        ).to_numpy() / 1024**2,
+        'file_sizes': df.drop_duplicates('Filename').set_index(
+            'Filename').Size.sort_index() / 1024**2,
+        'num_files': by_day.Filename.nunique().to_numpy(),
+        'num_req': by_day.size().to_numpy(),
+    }
+
+
+def _check_stats(stats, df):
+    expected = _baseline(df)
+    frequencies = stats.file_frequencies
+    assert dict(zip(frequencies.Filename, frequencies['# requests'])) == \
+        expected['file_requests']
+    assert np.all(np.diff(frequencies['# requests']) <= 0)
+    np.testing.assert_allclose(stats.all_day_file_size.Size,
+                               expected['day_size'])
+    file_sizes = stats.file_sizes.set_index('Filename').Size.sort_index()
+    np.testing.assert_array_equal(file_sizes.index,
+                                  expected['file_sizes'].index)
+    np.testing.assert_allclose(file_sizes, expected['file_sizes'])
+    np.testing.assert_array_equal(stats.num_files.numFiles,
+                                  expected['num_files'])
+    np.testing.assert_array_equal(stats.num_req.numReq, expected['num_req'])
+
+
+def test_stats_equal_baseline(make_generator, function):
+    generator = make_generator()
+    list(generator.prepare(**function))
+    _check_stats(generator.stats, generator.df)
+
+
+def test_stats_after_stream_and_open(make_generator, function):
+    generator = make_generator()
+    list(generator.stream(**function))
+    loaded = Generator()
+    loaded.open_data(generator.dest_folder)
+
+    _check_stats(generator.stats, loaded.df)
+    _check_stats(loaded.stats, loaded.df)
+
+
+def test_stats_cached_until_changed(make_generator, function):
+    generator = make_generator()
+    list(generator.prepare(**function))
+    stats = generator.stats
+    assert generator.stats is stats
+    assert generator.reset_stats().stats is not stats
+
+    generator.clean()
+    assert generator.stats is None
+
+
+def test_df_stats_is_deprecated(make_generator, function):
+    generator = make_generator()
+    list(generator.prepare(**function))
+    with pytest.warns(DeprecationWarning):
+        df, *stats = generator.df_stats
+
+    assert len(stats) == 5
+    _check_stats(generator.stats, df)
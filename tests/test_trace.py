@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from datasetgen.trace import (TRACE_COLUMNS, TraceWriter, open_trace,
+                              read_trace_header)
+
+
+def test_trace_round_trip(make_generator, function, tmp_path):
+    generator = make_generator()
+    list(generator.prepare(**function))
+    header_path = generator.export_trace(tmp_path.joinpath("trace.bin"))
+
+    assert header_path == tmp_path.joinpath("trace.bin.json")
+    header = read_trace_header(header_path)
+    assert header['num_records'] == len(generator.df)
+    assert [day['count'] for day in header['days']] == \
+        [len(day) for day in generator.days]
+
+    trace = open_trace(tmp_path.joinpath("trace.bin"))
+    df = generator.df
+    for column in TRACE_COLUMNS:
+        np.testing.assert_array_equal(trace[column], df[column].to_numpy())
+
+
+def test_trace_header_does_not_replace_trace(tmp_path):
+    with TraceWriter(tmp_path.joinpath("trace.data")):
+        pass
+    assert tmp_path.joinpath("trace.data").exists()
+    assert tmp_path.joinpath("trace.data.json").exists()
+    assert len(open_trace(tmp_path.joinpath("trace.data"))) == 0
+
+
+def test_trace_rejects_json_extension(tmp_path):
+    with pytest.raises(Exception, match=".json extension"):
+        TraceWriter(tmp_path.joinpath("trace.json"))
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_prepare_does_not_depend_on_workers(make_generator, function,
+                                            workers):
+    single = make_generator()
+    list(single.prepare(**function, workers=1))
+    parallel = make_generator()
+    list(parallel.prepare(**function, workers=workers))
+
+    assert [day.date for day in parallel.days] == \
+        [day.date for day in single.days]
+    pd.testing.assert_frame_equal(parallel.df, single.df)
+
+
+def test_prepare_depends_on_seed(make_generator, function):
+    first = make_generator()
+    list(first.prepare(**function))
+    second = make_generator(seed=7)
+    list(second.prepare(**function))
+
+    assert not first.df.equals(second.df)
+
+
+def test_stream_does_not_depend_on_workers(make_generator, function):
+    single = make_generator("single")
+    list(single.stream(**function, workers=1))
+    parallel = make_generator("parallel")
+    list(parallel.stream(**function, workers=2, window=3))
+
+    single_files = sorted(single.dest_folder.glob("dataset_*"))
+    parallel_files = sorted(parallel.dest_folder.glob("dataset_*"))
+    assert [file_.name for file_ in parallel_files] == \
+        [file_.name for file_ in single_files]
+    for single_file, parallel_file in zip(single_files, parallel_files):
+        assert parallel_file.read_bytes() == single_file.read_bytes()